@@ -0,0 +1,92 @@
+# date: 17-Oct-2026
+# compare 2 benchmark result files(see run.py) stage by stage
+
+import argparse
+import json
+import sys
+
+# metrics compared besides wall time; higher is better for all of them
+QUALITY_METRICS = ('ari', 'explained_variance')
+
+
+def load_results(filename):
+    with open(filename) as filehandle:
+        return json.load(filehandle)
+
+
+def compare(baseline, candidate, threshold=0.1):
+    """compare wall time and quality metrics of the stages present in both results
+        input:
+            :parameter baseline: results of the reference run
+            :parameter candidate: results of the run being evaluated
+            :parameter threshold: relative slow-down of wall time(or drop of a quality metric) reported as regression
+        output:
+            :returns list of <stage, metric, baseline value, candidate value, ratio, regressed> rows
+            :rtype list"""
+
+    rows = []
+    for stage, metrics in candidate['stages'].items():
+        reference = baseline['stages'].get(stage)
+        if reference is None:
+            continue
+        if 'error' in metrics or 'error' in reference:
+            rows.append((stage, 'error', reference.get('error', "-"), metrics.get('error', "-"), None,
+                         'error' in metrics and 'error' not in reference))
+            continue
+        ratio = metrics['wall_seconds'] / reference['wall_seconds'] if reference['wall_seconds'] else None
+        rows.append((stage, 'wall_seconds', reference['wall_seconds'], metrics['wall_seconds'], ratio,
+                     ratio is not None and ratio > 1 + threshold))
+        for metric in QUALITY_METRICS:
+            if metric in metrics and metric in reference:
+                ratio = metrics[metric] / reference[metric] if reference[metric] else None
+                rows.append((stage, metric, reference[metric], metrics[metric], ratio,
+                             metrics[metric] < reference[metric] - threshold * abs(reference[metric])))
+    return rows
+
+
+def warnings(baseline, candidate):
+    """differences between the runs that make timings incomparable"""
+
+    messages = []
+    if baseline['machine'] != candidate['machine']:
+        messages.append("results come from different machines")
+    if baseline['parameters'] != candidate['parameters']:
+        messages.append("benchmark parameters differ")
+    for name, version in candidate['libraries'].items():
+        if baseline['libraries'].get(name) != version:
+            messages.append("{0} version differs: {1} vs {2}".format(name, baseline['libraries'].get(name), version))
+    return messages
+
+
+def _format(value):
+    if isinstance(value, float):
+        return "{0:.4g}".format(value)
+    return str(value)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="compare benchmark results of 2 runs",
+                                     usage="compare baseline.json candidate.json [--threshold 0.1] [--fail]")
+    parser.add_argument('baseline', help="results file of the reference run")
+    parser.add_argument('candidate', help="results file of the run being evaluated")
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help="relative change reported as regression. default - 0.1(10%%)")
+    parser.add_argument('--fail', action='store_true', default=False,
+                        help="exit with status 1 if any stage regressed")
+    args = parser.parse_args()
+
+    baseline_results, candidate_results = load_results(args.baseline), load_results(args.candidate)
+    print("baseline:  {0} {1}".format(baseline_results['git_commit'], baseline_results['timestamp']))
+    print("candidate: {0} {1}".format(candidate_results['git_commit'], candidate_results['timestamp']))
+    for message in warnings(baseline_results, candidate_results):
+        print("warning: " + message)
+
+    comparison = compare(baseline_results, candidate_results, threshold=args.threshold)
+    print("{0:<28}{1:<20}{2:>12}{3:>12}{4:>9}".format("stage", "metric", "baseline", "candidate", "ratio"))
+    for stage, metric, reference_value, value, ratio, regressed in comparison:
+        print("{0:<28}{1:<20}{2:>12}{3:>12}{4:>9}{5}".format(stage, metric, _format(reference_value)[:12],
+                                                             _format(value)[:12],
+                                                             "-" if ratio is None else "{0:.2f}".format(ratio),
+                                                             "  REGRESSION" if regressed else ""))
+    if args.fail and any(row[-1] for row in comparison):
+        sys.exit(1)
@@ -0,0 +1,248 @@
+# date: 17-Oct-2026
+# deterministic synthetic MEDLINE corpus - PubMed xml or abstract text files - for benchmarks
+
+import argparse
+import gzip
+import os
+from xml.sax.saxutils import escape
+
+import numpy
+
+_SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "sa", "to", "vi", "ze", "bra", "cle", "dro", "fen", "gar", "hyp", "lin",
+              "mor", "nox", "pep", "qua", "sten", "tri", "ul", "xan", "yel", "cyt", "ase", "ine", "ol", "ide"]
+
+# elements of real MEDLINE citations that carry no clustering input: # authors per article, # MeSH headings per article
+# and share of articles with CommentsCorrections(each holding the PMID of another citation, e.g. an erratum)
+AUTHORS = (1, 12)
+MESH_HEADINGS = (5, 15)
+COMMENTS_CORRECTIONS = 0.2
+
+# near-duplicates copy a document among the DUPLICATE_WINDOW documents before them and replace DUPLICATE_EDITS of its
+# abstract words
+DUPLICATE_WINDOW = 1000
+DUPLICATE_EDITS = 0.01
+
+
+class SyntheticCorpus:
+    """generate PubMed-like documents from a fixed seed; the same parameters always produce the same corpus.
+
+    words are drawn from a vocabulary of vocab_size pseudo-words with Zipf(skew) frequencies. every document belongs to
+    1 of num_topics topics; topic_share of its words are drawn from a small set of words specific to that topic, so
+    clustering quality can be measured against the topic labels. abstract lengths(in words) are log-normal with median
+    abstract_length and shape length_sigma; missing_abstracts of the documents have a title only.
+    duplicate_share of the documents are near-duplicates(see DUPLICATE_EDITS) of an earlier document and share its
+    topic; duplicate_of holds the index of the copied document, -1 for original documents"""
+
+    def __init__(self, num_docs=10000, seed=0, vocab_size=20000, skew=1.1, num_topics=20, topic_words=300,
+                 topic_share=0.3, abstract_length=180, length_sigma=0.45, missing_abstracts=0.02, duplicate_share=0.0,
+                 first_pmid=20000000):
+        self.num_docs = num_docs
+        self.seed = seed
+        self.vocab_size = vocab_size
+        self.skew = skew
+        self.num_topics = num_topics
+        self.topic_words = topic_words
+        self.topic_share = topic_share
+        self.abstract_length = abstract_length
+        self.length_sigma = length_sigma
+        self.missing_abstracts = missing_abstracts
+        self.duplicate_share = duplicate_share
+        self.first_pmid = first_pmid
+
+        random_state = numpy.random.RandomState(seed)
+        self.vocabulary = self._make_vocabulary(random_state)
+        weights = 1.0 / numpy.arange(1, vocab_size + 1) ** skew
+        self.word_cdf = numpy.cumsum(weights / weights.sum())
+        self.topic_vocabulary = [random_state.choice(vocab_size, size=topic_words, replace=False)
+                                 for _ in range(num_topics)]
+        self.topics = random_state.randint(num_topics, size=num_docs)
+        self.duplicate_of = numpy.full(num_docs, -1, dtype=numpy.int64)
+        if duplicate_share > 0:
+            duplicates = numpy.flatnonzero(random_state.rand(num_docs) < duplicate_share)
+            duplicates = duplicates[duplicates > 0]
+            distances = random_state.randint(DUPLICATE_WINDOW, size=len(duplicates)) % numpy.minimum(
+                duplicates, DUPLICATE_WINDOW)
+            self.duplicate_of[duplicates] = duplicates - 1 - distances
+            for index in duplicates:
+                self.topics[index] = self.topics[self.duplicate_of[index]]
+
+    @property
+    def parameters(self):
+        return {'num_docs': self.num_docs, 'seed': self.seed, 'vocab_size': self.vocab_size, 'skew': self.skew,
+                'num_topics': self.num_topics, 'topic_words': self.topic_words, 'topic_share': self.topic_share,
+                'abstract_length': self.abstract_length, 'length_sigma': self.length_sigma,
+                'missing_abstracts': self.missing_abstracts, 'duplicate_share': self.duplicate_share}
+
+    def _make_vocabulary(self, random_state):
+        words = set()
+        vocabulary = []
+        while len(vocabulary) < self.vocab_size:
+            word = "".join(random_state.choice(_SYLLABLES, size=random_state.randint(2, 5)))
+            if word not in words:
+                words.add(word)
+                vocabulary.append(word)
+        return numpy.asarray(vocabulary)
+
+    def iter_documents(self, batch_size=1000):
+        """yield <pmid, title, abstract, topic> per document; abstract is None for documents without one"""
+
+        random_state = numpy.random.RandomState(self.seed + 1)
+        edit_state = numpy.random.RandomState(self.seed + 2)
+        # documents that may still be copied by a near-duplicate
+        recent = {}
+        for start in range(0, self.num_docs, batch_size):
+            topics = self.topics[start:start + batch_size]
+            lengths = numpy.maximum(5, random_state.lognormal(numpy.log(self.abstract_length), self.length_sigma,
+                                                              size=len(topics)).astype(int))
+            title_lengths = random_state.randint(6, 16, size=len(topics))
+            missing = random_state.rand(len(topics)) < self.missing_abstracts
+            words = self._draw_words(random_state, numpy.repeat(topics, lengths + title_lengths))
+            position = 0
+            for offset, topic in enumerate(topics):
+                title = words[position:position + title_lengths[offset]]
+                position += title_lengths[offset]
+                abstract = words[position:position + lengths[offset]]
+                position += lengths[offset]
+                index = start + offset
+                document = (" ".join(title).capitalize() + ".",
+                            None if missing[offset] else _sentences(abstract, random_state))
+                if self.duplicate_of[index] >= 0:
+                    source_title, source_abstract = recent[self.duplicate_of[index]]
+                    document = (source_title, self._edit(source_abstract, edit_state))
+                recent[index] = document
+                recent.pop(index - DUPLICATE_WINDOW, None)
+                yield (str(self.first_pmid + index),) + document + (int(topic),)
+
+    def _edit(self, abstract, random_state):
+        """replace DUPLICATE_EDITS of the words of an abstract with random words"""
+
+        if abstract is None:
+            return None
+        words = abstract.split(" ")
+        edits = numpy.flatnonzero(random_state.rand(len(words)) < DUPLICATE_EDITS)
+        for position, word in zip(edits, self.vocabulary[random_state.randint(self.vocab_size, size=len(edits))]):
+            words[position] = word
+        return " ".join(words)
+
+    def _draw_words(self, random_state, topics):
+        """1 word per element of topics; topic words with probability topic_share, background words otherwise"""
+
+        background = numpy.searchsorted(self.word_cdf, random_state.rand(len(topics)))
+        background = numpy.minimum(background, self.vocab_size - 1)
+        topic_vocabulary = numpy.asarray(self.topic_vocabulary)
+        specific = topic_vocabulary[topics, random_state.randint(self.topic_words, size=len(topics))]
+        return self.vocabulary[numpy.where(random_state.rand(len(topics)) < self.topic_share, specific, background)]
+
+    def write_xml(self, filename):
+        """write corpus as a PubMed xml file(PubmedArticleSet); gzip compressed if filename ends with .gz. besides
+        title and abstract, every citation has the elements that make up most of a real MEDLINE file - journal, dates,
+        AuthorList, MeshHeadingList, CommentsCorrectionsList(with the PMIDs of other citations) and PubmedData - so
+        parsers are timed on realistic markup and must tell the citation PMID from the others
+
+            :returns topic of each document
+            :rtype numpy.ndarray"""
+
+        random_state = numpy.random.RandomState(self.seed + 3)
+        with _open_output(filename) as filehandle:
+            filehandle.write('<?xml version="1.0" encoding="utf-8"?>\n<!DOCTYPE PubmedArticleSet>\n'
+                             '<PubmedArticleSet>\n')
+            for pmid, title, abstract, _ in self.iter_documents():
+                filehandle.write('<PubmedArticle>\n<MedlineCitation Status="MEDLINE" Owner="NLM">\n'
+                                 '<PMID Version="1">{0}</PMID>\n'
+                                 '<DateCompleted><Year>2017</Year><Month>02</Month><Day>06</Day></DateCompleted>\n'
+                                 '<Article PubModel="Print">\n<Journal>\n<ISSN IssnType="Print">0000-0000</ISSN>\n'
+                                 '<Title>Journal of {1}</Title>\n<ISOAbbreviation>J {1}</ISOAbbreviation>\n'
+                                 '</Journal>\n<ArticleTitle>{2}</ArticleTitle>\n'
+                                 .format(pmid, self._words(random_state, 2).title(), escape(title)))
+                if abstract is not None:
+                    filehandle.write('<Abstract>\n<AbstractText>{0}</AbstractText>\n</Abstract>\n'
+                                     .format(escape(abstract)))
+                filehandle.write('<AuthorList CompleteYN="Y">\n')
+                for _ in range(random_state.randint(*AUTHORS)):
+                    last_name, fore_name, department = self._words(random_state, 3).title().split(" ")
+                    filehandle.write('<Author ValidYN="Y">\n<LastName>{0}</LastName>\n<ForeName>{1}</ForeName>\n'
+                                     '<Initials>{2}</Initials>\n<AffiliationInfo>\n<Affiliation>Department of {3}, '
+                                     'Synthetic University.</Affiliation>\n</AffiliationInfo>\n</Author>\n'
+                                     .format(last_name, fore_name, fore_name[0], department))
+                filehandle.write('</AuthorList>\n<Language>eng</Language>\n<PublicationTypeList>\n'
+                                 '<PublicationType UI="D016428">Journal Article</PublicationType>\n'
+                                 '</PublicationTypeList>\n</Article>\n<MeshHeadingList>\n')
+                for _ in range(random_state.randint(*MESH_HEADINGS)):
+                    filehandle.write('<MeshHeading>\n<DescriptorName UI="D{0:06d}" MajorTopicYN="N">{1}'
+                                     '</DescriptorName>\n</MeshHeading>\n'
+                                     .format(random_state.randint(10 ** 6), self._words(random_state, 2).title()))
+                filehandle.write('</MeshHeadingList>\n')
+                if random_state.rand() < COMMENTS_CORRECTIONS:
+                    filehandle.write('<CommentsCorrectionsList>\n')
+                    for _ in range(random_state.randint(1, 4)):
+                        filehandle.write('<CommentsCorrections RefType="ErratumIn">\n<RefSource>J Synth. 2018'
+                                         '</RefSource>\n<PMID Version="1">{0}</PMID>\n</CommentsCorrections>\n'
+                                         .format(self.first_pmid + self.num_docs + random_state.randint(10 ** 6)))
+                    filehandle.write('</CommentsCorrectionsList>\n')
+                filehandle.write('</MedlineCitation>\n<PubmedData>\n<PublicationStatus>ppublish</PublicationStatus>\n'
+                                 '<ArticleIdList>\n<ArticleId IdType="pubmed">{0}</ArticleId>\n</ArticleIdList>\n'
+                                 '</PubmedData>\n</PubmedArticle>\n'.format(pmid))
+            filehandle.write('</PubmedArticleSet>\n')
+        return self.topics
+
+    def _words(self, random_state, num_words):
+        return " ".join(self.vocabulary[random_state.randint(self.vocab_size, size=num_words)])
+
+    def write_text(self, filename):
+        """write corpus in the PubMed abstract text format read by AbstractsTextLoader with AbstractsParser - blank line
+        separated sections(title, authors, affiliation, abstract, DOI) ending with a PMID line. every record starts
+        with a blank line and the PMID is repeated in the DOI section, which is where AbstractsParser looks for it;
+        documents without an abstract repeat their title in its place
+
+            :returns topic of each document
+            :rtype numpy.ndarray"""
+
+        with _open_output(filename) as filehandle:
+            for pmid, title, abstract, _ in self.iter_documents():
+                filehandle.write("\n{0}\n\nAuthor A, Author B.\n\nAuthor information: Synthetic Institute.\n\n{1}\n\n"
+                                 "DOI: 10.5555/synth.{2} PMID: {2}\n\nPMID: {2}  [Indexed for MEDLINE]\n\n"
+                                 .format(title, abstract or title, pmid))
+        return self.topics
+
+
+def _sentences(words, random_state):
+    """join words into sentences of 8-24 words"""
+
+    sentences = []
+    position = 0
+    while position < len(words):
+        length = random_state.randint(8, 25)
+        sentences.append(" ".join(words[position:position + length]).capitalize() + ".")
+        position += length
+    return " ".join(sentences)
+
+
+def _open_output(filename):
+    os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+    if filename.endswith(".gz"):
+        return gzip.open(filename, 'wt', encoding='utf-8')
+    return open(filename, 'w', encoding='utf-8')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="generate a synthetic MEDLINE corpus",
+                                     usage="corpus output_file [--docs #] [--seed #] [--format xml|txt]")
+    parser.add_argument('output_file', help="fully qualified name of corpus file; .gz files are compressed")
+    parser.add_argument('--format', default="xml", choices=['xml', 'txt'])
+    parser.add_argument('--docs', type=int, default=10000, help="# of documents")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--vocab-size', type=int, default=20000)
+    parser.add_argument('--skew', type=float, default=1.1, help="Zipf exponent of word frequencies")
+    parser.add_argument('--topics', type=int, default=20)
+    parser.add_argument('--abstract-length', type=int, default=180, help="median # of words per abstract")
+    parser.add_argument('--length-sigma', type=float, default=0.45, help="log-normal shape of abstract lengths")
+    parser.add_argument('--duplicates', type=float, default=0.0, help="share of near-duplicate documents")
+    args = parser.parse_args()
+
+    corpus = SyntheticCorpus(num_docs=args.docs, seed=args.seed, vocab_size=args.vocab_size, skew=args.skew,
+                             num_topics=args.topics, abstract_length=args.abstract_length,
+                             length_sigma=args.length_sigma, duplicate_share=args.duplicates)
+    if args.format == "xml":
+        corpus.write_xml(args.output_file)
+    else:
+        corpus.write_text(args.output_file)
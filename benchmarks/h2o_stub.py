@@ -0,0 +1,59 @@
+# date: 17-Oct-2026
+# in-process stand-in for the H2O server calls made by medline.model.h2o_bridge. exported files are imported and
+# clustered with scikit-learn and predictions are exported as CSV part files, the way an H2O server writes them, so
+# the bulk file handoff can be run and timed without a server
+
+import os
+import re
+
+import numpy
+import pandas
+from scipy import sparse
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.datasets import load_svmlight_file
+
+from medline.model.h2o_bridge import ROW_ID_COLUMN, PREDICTION_COLUMN
+
+
+class StubH2OClient:
+    """same methods as h2o_bridge.H2OClient. frames are dicts of row ids and data; calls are recorded in calls"""
+
+    def __init__(self, parts=4):
+        self.parts = parts
+        self.calls = []
+
+    def connect(self, url):
+        self.calls.append(('connect', url))
+
+    def import_files(self, directory, pattern):
+        self.calls.append(('import_files', directory))
+        matrices, row_ids = [], []
+        for name in sorted(os.listdir(directory)):
+            if re.match(pattern, name):
+                matrix, labels = load_svmlight_file(os.path.join(directory, name), zero_based=False)
+                matrices.append(matrix)
+                row_ids.append(labels.astype(numpy.int64))
+        num_features = max(matrix.shape[1] for matrix in matrices)
+        matrices = [sparse.csr_matrix((matrix.data, matrix.indices, matrix.indptr), shape=(matrix.shape[0],
+                                                                                            num_features))
+                    for matrix in matrices]
+        return {'data': sparse.vstack(matrices, format='csr'), ROW_ID_COLUMN: numpy.concatenate(row_ids)}
+
+    def train_kmeans(self, frame, k, max_iterations):
+        self.calls.append(('train_kmeans', k))
+        return MiniBatchKMeans(n_clusters=k, max_iter=max_iterations, random_state=0).fit(frame['data'])
+
+    def predict(self, model, frame):
+        self.calls.append(('predict', None))
+        return {ROW_ID_COLUMN: frame[ROW_ID_COLUMN], PREDICTION_COLUMN: model.predict(frame['data'])}
+
+    def export(self, frame, directory):
+        self.calls.append(('export', directory))
+        os.makedirs(directory, exist_ok=True)
+        predictions = pandas.DataFrame({ROW_ID_COLUMN: frame[ROW_ID_COLUMN],
+                                        PREDICTION_COLUMN: frame[PREDICTION_COLUMN]})
+        for part, rows in enumerate(numpy.array_split(numpy.arange(len(predictions)), self.parts)):
+            predictions.iloc[rows].to_csv(os.path.join(directory, "part-m-{0:05d}".format(part)), index=False)
+
+    def remove(self, frame):
+        self.calls.append(('remove', None))
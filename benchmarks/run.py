@@ -0,0 +1,161 @@
+# date: 17-Oct-2026
+# run pipeline benchmarks on a synthetic MEDLINE corpus and record the results as JSON
+
+import argparse
+import datetime
+import importlib
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import traceback
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks import stages
+from benchmarks.corpus import SyntheticCorpus
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+LIBRARIES = ('numpy', 'scipy', 'sklearn', 'pandas', 'nltk', 'xlsxwriter', 'pyarrow', 'h2o')
+
+
+def git_commit():
+    """<commit hash, dirty flag> of the repository; <None, None> if git is not available"""
+
+    repo_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=repo_dir, stderr=subprocess.DEVNULL)
+        status = subprocess.check_output(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=repo_dir,
+                                         stderr=subprocess.DEVNULL)
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit.decode().strip(), bool(status.strip())
+
+
+def machine_info():
+    return {'hostname': platform.node(), 'platform': platform.platform(), 'processor': platform.processor(),
+            'machine': platform.machine(), 'cpu_count': os.cpu_count(), 'python': platform.python_version()}
+
+
+def library_versions():
+    versions = {}
+    for name in LIBRARIES:
+        try:
+            versions[name] = getattr(importlib.import_module(name), '__version__', "unknown")
+        except ImportError:
+            versions[name] = None
+    return versions
+
+
+def max_rss_mb():
+    """peak resident set size of this process so far(never decreases)"""
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def run_stage(function, context, repeat):
+    """run a stage repeat times; wall and cpu time are the fastest of the runs, other metrics those of the last run"""
+
+    walls, cpus = [], []
+    for _ in range(repeat):
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        metrics = function(context)
+        walls.append(time.perf_counter() - wall_start)
+        cpus.append(time.process_time() - cpu_start)
+    metrics.update({'wall_seconds': min(walls), 'cpu_seconds': min(cpus), 'max_rss_mb': max_rss_mb()})
+    if repeat > 1:
+        metrics['wall_seconds_all'] = walls
+    return metrics
+
+
+def run(corpus, work_dir, stage_names, repeat=1, overrides=None):
+    """run the selected stages(and the stages they depend on) against corpus
+        input:
+            :parameter corpus: SyntheticCorpus object
+            :parameter work_dir: directory for corpus files, temp files and outputs
+            :parameter stage_names: names of stages to run; see stages.STAGES
+            :parameter repeat: # of times each stage is run
+            :parameter overrides: dict of config key -> value applied to the benchmark config
+        output:
+            :returns benchmark results
+            :rtype dict"""
+
+    context = stages.BenchmarkContext(corpus, work_dir, overrides=overrides)
+    commit, dirty = git_commit()
+    results = {'timestamp': datetime.datetime.now().isoformat(timespec='seconds'), 'git_commit': commit,
+               'git_dirty': dirty, 'machine': machine_info(), 'libraries': library_versions(),
+               'parameters': {'corpus': corpus.parameters, 'config': context.config_values, 'repeat': repeat},
+               'stages': {}}
+    failed = set()
+    for name in stages.resolve(stage_names):
+        function, requires = stages.STAGES[name]
+        if failed.intersection(requires):
+            results['stages'][name] = {'error': "skipped; required stage failed"}
+            failed.add(name)
+            continue
+        print("running {0}".format(name), flush=True)
+        try:
+            results['stages'][name] = run_stage(function, context, 1 if name == 'generate' else repeat)
+        except Exception as error:
+            logging.exception("benchmark stage {0} failed".format(name))
+            traceback.print_exc()
+            results['stages'][name] = {'error': "{0}: {1}".format(type(error).__name__, error)}
+            failed.add(name)
+    return results
+
+
+def _parse_overrides(values):
+    overrides = {}
+    for value in values:
+        key, separator, setting = value.partition("=")
+        if not separator:
+            raise ValueError("invalid config override {0}. expected key=value".format(value))
+        overrides[key.strip()] = setting.strip()
+    return overrides
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="benchmark the PubMed clustering pipeline on a synthetic corpus",
+                                     usage="run [--docs #] [--seed #] [--stages stage,...] [--work-dir dir] "
+                                           "[--output file] [--set key=value ...]")
+    parser.add_argument('--docs', type=int, default=20000, help="# of documents in the synthetic corpus")
+    parser.add_argument('--seed', type=int, default=0, help="random seed of the synthetic corpus")
+    parser.add_argument('--vocab-size', type=int, default=20000)
+    parser.add_argument('--skew', type=float, default=1.1, help="Zipf exponent of word frequencies")
+    parser.add_argument('--topics', type=int, default=20, help="# of topics; also used as clusters.count")
+    parser.add_argument('--abstract-length', type=int, default=180, help="median # of words per abstract")
+    parser.add_argument('--length-sigma', type=float, default=0.45, help="log-normal shape of abstract lengths")
+    parser.add_argument('--duplicates', type=float, default=0.0,
+                        help="share of near-duplicate documents in the corpus, see the dedup stage")
+    parser.add_argument('--stages', default=",".join(stages.STAGES),
+                        help="comma separated stages to run; required stages are added. default - all")
+    parser.add_argument('--repeat', type=int, default=1, help="# of runs per stage; the fastest run is reported")
+    parser.add_argument('--work-dir', default=os.path.join(RESULTS_DIR, "work"),
+                        help="directory for corpus, temp and output files")
+    parser.add_argument('--output', default=None,
+                        help="fully qualified name of JSON results file. default - results/<timestamp>_<commit>.json")
+    parser.add_argument('--set', action='append', default=[], metavar="key=value",
+                        help="override a config value, e.g. --set vectorizer.process.count=4")
+    args = parser.parse_args()
+
+    config_overrides = {'clusters.count': str(args.topics)}
+    config_overrides.update(_parse_overrides(args.set))
+    synthetic_corpus = SyntheticCorpus(num_docs=args.docs, seed=args.seed, vocab_size=args.vocab_size,
+                                       skew=args.skew, num_topics=args.topics, abstract_length=args.abstract_length,
+                                       length_sigma=args.length_sigma, duplicate_share=args.duplicates)
+    benchmark_results = run(synthetic_corpus, args.work_dir, [name.strip() for name in args.stages.split(",")],
+                            repeat=args.repeat, overrides=config_overrides)
+
+    output_file = args.output
+    if not output_file:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output_file = os.path.join(RESULTS_DIR, "{0}_{1}.json".format(
+            benchmark_results['timestamp'].replace(":", ""), (benchmark_results['git_commit'] or "nogit")[:10]))
+    with open(output_file, 'w') as filehandle:
+        json.dump(benchmark_results, filehandle, indent=2)
+    print("results written to {0}".format(output_file))
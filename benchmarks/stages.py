@@ -0,0 +1,460 @@
+# date: 17-Oct-2026
+# benchmark stages of the PubMed clustering pipeline; each stage runs against a shared BenchmarkContext
+
+import configparser
+import glob
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+import numpy
+from sklearn.metrics import adjusted_rand_score
+
+from benchmarks.h2o_stub import StubH2OClient
+from medline.data.extract import features, dedup
+from medline.data.load import loader, shard
+from medline.model import cluster, reduction
+from medline.model.bundle import save_model
+from medline.model.classifier import ClusterClassifier
+from medline.pubmed import PubMed
+from medline.utils import input_parser
+from medline.utils.collate_results import write_collated
+from medline.utils.configuration import Config
+from medline.utils.data_streamer import DataStreamer
+from medline.utils.export_results import export_chunks, chunk_arrays
+
+PACKAGE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DEFAULT_CONFIG = os.path.join(PACKAGE_DIR, "medline", "config", "default.cfg")
+
+# config values that differ from default.cfg for benchmark runs. the vector cache would turn repeated end-to-end runs
+# into cache hits; document frequency bounds are relaxed for corpora of a few thousand documents
+BENCHMARK_CONFIG = {'vector.cache': '0', 'document.frequency.min': '0.005', 'kmeans.batch.size': '5000',
+                    'iterations.count': '10', 'verbosity': '0'}
+
+# documents per shard written by the shard_write stage
+SHARD_SIZE = 10000
+
+# batch sizes of the classify stage and # of calls timed per batch size
+CLASSIFY_BATCHES = ((1, 200), (100, 50), (10000, 3))
+
+# pubmed startup: # of runs timed, target time to argument validation and modules that startup should not import
+STARTUP_RUNS = 5
+STARTUP_TARGET_MS = 300
+STARTUP_HEAVY_MODULES = ('numpy', 'pandas', 'scipy', 'sklearn', 'h2o', 'nltk', 'pyarrow', 'xlsxwriter')
+
+
+def write_config(filename, work_dir, overrides=None):
+    """write a config file for a benchmark run: default.cfg with directories pointing into work_dir, BENCHMARK_CONFIG
+    and overrides applied
+        input:
+            :parameter filename: fully qualified name of config file to be written
+            :parameter work_dir: directory that receives temp files, vectorized files and logs
+            :parameter overrides: dict of config key -> value; keys are looked up in every section
+        output:
+            :returns values that differ from default.cfg, by key
+            :rtype dict
+            :raises ValueError"""
+
+    cfg_mgr = configparser.ConfigParser()
+    cfg_mgr.read(DEFAULT_CONFIG)
+    values = dict(BENCHMARK_CONFIG)
+    for key, directory in (('temp.data.directory', "temp"), ('features.pickled.files.directory', "vectorized"),
+                           ('logging.directory', "logs")):
+        values[key] = os.path.join(work_dir, directory) + os.sep
+        os.makedirs(values[key], exist_ok=True)
+    values.update(overrides or {})
+
+    for key, value in values.items():
+        sections = [section for section in cfg_mgr.sections() if cfg_mgr.has_option(section, key)]
+        if not sections:
+            raise ValueError("unknown config key: {0}".format(key))
+        cfg_mgr.set(sections[0], key, str(value))
+    with open(filename, 'w') as filehandle:
+        cfg_mgr.write(filehandle)
+    return values
+
+
+class BenchmarkContext:
+    """corpus files, config and intermediate results shared by the benchmark stages. stages store what later stages
+    consume(shard files, vectorized blocks, fitted models) as attributes"""
+
+    def __init__(self, corpus, work_dir, overrides=None):
+        self.corpus = corpus
+        self.work_dir = os.path.abspath(work_dir)
+        os.makedirs(self.work_dir, exist_ok=True)
+        self.config_file = os.path.join(self.work_dir, "benchmark.cfg")
+        self.config_values = write_config(self.config_file, self.work_dir, overrides)
+        self.config = Config(config_file=self.config_file)
+        self.xml_file = os.path.join(self.work_dir, "corpus.xml")
+        self.text_file = os.path.join(self.work_dir, "corpus.txt")
+
+        self.documents = None
+        self.shard_files = None
+        self.matrix = None
+        self.blocks = None
+        self.feature_extractor = None
+        self.reduced = None
+        self.cluster_mgr = None
+        self.cluster_ids = None
+
+    def path(self, *names):
+        return os.path.join(self.work_dir, *names)
+
+    def reset_dir(self, *names):
+        """empty and re-create a directory under work_dir"""
+
+        directory = self.path(*names)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+        return directory
+
+    def topics_of(self, pmids):
+        """ground truth topic of each PMID"""
+
+        return self.corpus.topics[numpy.asarray(pmids, dtype=numpy.int64) - self.corpus.first_pmid]
+
+    def texts(self, num_docs):
+        """abstract(or title) of the first num_docs documents, cycling through the corpus if it is smaller"""
+
+        contents = [document['content'] for document in self.documents.values()]
+        return [contents[index % len(contents)] for index in range(num_docs)]
+
+
+def _rate(count, seconds):
+    return count / seconds if seconds > 0 else None
+
+
+def _timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def _disk_size(paths):
+    return sum(os.path.getsize(path) for path in paths)
+
+
+def generate(context):
+    context.corpus.write_xml(context.xml_file)
+    context.corpus.write_text(context.text_file)
+    return {'docs': context.corpus.num_docs, 'xml_mb': os.path.getsize(context.xml_file) / 2 ** 20,
+            'text_mb': os.path.getsize(context.text_file) / 2 ** 20}
+
+
+def _pmid_errors(context, documents):
+    # documents whose permalink is not the PMID of their citation(e.g. a CommentsCorrections PMID)
+    return sum(1 for index, document in documents.items()
+               if document.get('permalink') != str(context.corpus.first_pmid + index))
+
+
+def parse_sax(context):
+    data_loader = loader.AbstractsXmlLoader(context.xml_file, config=context.config)
+    documents, seconds = _timed(data_loader.load_, as_="dict")
+    return {'docs': len(documents), 'docs_per_sec': _rate(len(documents), seconds),
+            'pmid_errors': _pmid_errors(context, documents)}
+
+
+def parse_stream(context):
+    data_loader = loader.AbstractsXmlStreamLoader(context.xml_file, config=context.config)
+    context.documents, seconds = _timed(data_loader.load_, as_="dict")
+    return {'docs': len(context.documents), 'docs_per_sec': _rate(len(context.documents), seconds),
+            'pmid_errors': _pmid_errors(context, context.documents)}
+
+
+def parse_text(context):
+    data_loader = loader.AbstractsTextLoader(context.text_file, config=context.config,
+                                             parser=input_parser.AbstractsParser())
+    documents, seconds = _timed(data_loader.load_, as_="dict")
+    return {'docs': len(documents), 'docs_per_sec': _rate(len(documents), seconds)}
+
+
+def shard_write(context):
+    directory = context.reset_dir("shards")
+    indices = sorted(context.documents)
+    context.shard_files = []
+    start = time.perf_counter()
+    for part, offset in enumerate(range(0, len(indices), SHARD_SIZE)):
+        filename = os.path.join(directory, "filepart.{0}".format(part + 1))
+        shard.write_shard(filename, {index: context.documents[index] for index in indices[offset:offset + SHARD_SIZE]},
+                          shard_format=context.config.TEMP_FILE_FORMAT)
+        context.shard_files.append(filename)
+    seconds = time.perf_counter() - start
+    size = _disk_size(context.shard_files)
+    return {'shards': len(context.shard_files), 'mb': size / 2 ** 20, 'mb_per_sec': _rate(size / 2 ** 20, seconds)}
+
+
+def deduplicate(context):
+    """near-duplicate detection over the shards; precision and recall are measured against the near-duplicates
+    planted in the corpus(see SyntheticCorpus.duplicate_share)"""
+
+    deduplicator = dedup.Deduplicator(context.config, context.path("dedup"))
+    (_, duplicates), seconds = _timed(deduplicator.deduplicate_shards, context.shard_files)
+    removed = numpy.zeros(context.corpus.num_docs, dtype=bool)
+    removed[duplicates['positions']] = True
+    planted = context.corpus.duplicate_of >= 0
+    found = int((removed & planted).sum())
+    return {'docs': context.corpus.num_docs, 'docs_per_sec': _rate(context.corpus.num_docs, seconds),
+            'duplicates': int(removed.sum()), 'planted_duplicates': int(planted.sum()),
+            'precision': found / removed.sum() if removed.any() else None,
+            'recall': found / planted.sum() if planted.any() else None}
+
+
+def stream_read(context):
+    streamer = DataStreamer(context.shard_files, prefetch=context.config.STREAM_PREFETCH,
+                            memory_budget=context.config.STREAM_MEMORY_MB * 1024 * 1024)
+    start = time.perf_counter()
+    num_docs = sum(1 for _ in streamer.texts())
+    return {'docs': num_docs, 'docs_per_sec': _rate(num_docs, time.perf_counter() - start)}
+
+
+def _feature_extractor(context, vectorizer_type):
+    feature_extractor = features.FeatureExtractor(vectorizer_type=vectorizer_type, config=context.config)
+    feature_extractor.vectorizer = vectorizer_type
+    return feature_extractor
+
+
+def vectorize_tfidf(context):
+    feature_extractor = _feature_extractor(context, 'tfidf')
+    streamer = DataStreamer(context.shard_files, prefetch=context.config.STREAM_PREFETCH,
+                            memory_budget=context.config.STREAM_MEMORY_MB * 1024 * 1024)
+    context.matrix, seconds = _timed(feature_extractor.vectorize_text, streamer.texts())
+    return {'docs_per_sec': _rate(context.matrix.shape[0], seconds), 'features': context.matrix.shape[1],
+            'nnz': int(context.matrix.nnz)}
+
+
+def _vectorize_shards(context, vectorizer_type):
+    feature_extractor = _feature_extractor(context, vectorizer_type)
+    output_dir = context.path("vectorized", vectorizer_type + "_blocks")
+    shutil.rmtree(output_dir, ignore_errors=True)
+    blocks, seconds = _timed(feature_extractor.vectorize_shards, context.shard_files, output_dir=output_dir)
+    size = _disk_size(glob.glob(os.path.join(output_dir, "**", "*"), recursive=True))
+    metrics = {'docs_per_sec': _rate(blocks.shape[0], seconds), 'features': blocks.shape[1], 'mb': size / 2 ** 20}
+    return blocks, feature_extractor, metrics
+
+
+def vectorize_tfidf_streaming(context):
+    context.blocks, context.feature_extractor, metrics = _vectorize_shards(context, 'tfidf-streaming')
+    return metrics
+
+
+def vectorize_hashing(context):
+    _, _, metrics = _vectorize_shards(context, 'hashing')
+    return metrics
+
+
+def reduce_vectors(context):
+    reducer = reduction.Reducer(context.config)
+    context.reduced, seconds = _timed(reducer.fit_transform, context.blocks,
+                                      output_file=context.path("vectorized", "reduced.npy"))
+    return {'dimensions': context.config.DIM, 'docs_per_sec': _rate(context.reduced.shape[0], seconds),
+            'explained_variance': float(reducer.svd.explained_variance_ratio_.sum())}
+
+
+def _cluster_metrics(context, cluster_ids, seconds):
+    return {'docs_per_sec': _rate(len(cluster_ids), seconds),
+            'ari': float(adjusted_rand_score(context.topics_of(context.blocks.labels), cluster_ids))}
+
+
+def cluster_minibatch(context):
+    context.cluster_mgr = cluster.Cluster(config=context.config)
+    cluster_ids, seconds = _timed(context.cluster_mgr.do_minibatch_kmeans, context.blocks.stack())
+    context.cluster_ids = numpy.asarray(cluster_ids)
+    return _cluster_metrics(context, context.cluster_ids, seconds)
+
+
+def cluster_reduced(context):
+    cluster_mgr = cluster.Cluster(config=context.config)
+    cluster_ids, seconds = _timed(cluster_mgr.do_minibatch_kmeans, context.reduced)
+    return _cluster_metrics(context, cluster_ids, seconds)
+
+
+def cluster_streaming(context):
+    cluster_mgr = cluster.Cluster(config=context.config)
+    cluster_ids, seconds = _timed(cluster_mgr.do_streaming_minibatch_kmeans, context.blocks,
+                                  labels_file=context.path("vectorized", "streaming_labels"))
+    return _cluster_metrics(context, cluster_ids, seconds)
+
+
+def cluster_spherical(context):
+    cluster_mgr = cluster.Cluster(config=context.config)
+    cluster_ids, seconds = _timed(cluster_mgr.do_spherical_kmeans, context.blocks)
+    metrics = _cluster_metrics(context, cluster_ids, seconds)
+    metrics['iterations'] = cluster_mgr.model.n_iter_
+    return metrics
+
+
+def cluster_sharded(context):
+    cluster_mgr = cluster.Cluster(config=context.config)
+    cluster_ids, seconds = _timed(cluster_mgr.do_sharded_kmeans, context.blocks,
+                                  labels_file=context.path("vectorized", "sharded_labels"))
+    metrics = _cluster_metrics(context, cluster_ids, seconds)
+    metrics.update({'workers': context.config.SHARDED_PCNT, 'iterations': cluster_mgr.model.n_iter_})
+    return metrics
+
+
+def cluster_h2o_stub(context):
+    # bulk file handoff of the H2O backend(export, import, prediction readback) against an in-process server stub
+    cluster_mgr = cluster.Cluster(config=context.config)
+    cluster_ids, seconds = _timed(cluster_mgr.do_h2o_kmeans, context.blocks, server_url="stub",
+                                  labels_file=context.path("vectorized", "h2o_labels"), client=StubH2OClient())
+    return _cluster_metrics(context, cluster_ids, seconds)
+
+
+def keywords(context):
+    terms = context.cluster_mgr.get_top_cluster_terms(context.feature_extractor.get_features(),
+                                                      num_terms=context.config.NTERMS)
+    return {'clusters': len(terms)}
+
+
+def _export(context, out_format):
+    output_file = context.path("output", "clusters." + out_format)
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    permalinks = context.blocks.labels
+    chunks = chunk_arrays(['cluster_id', 'permalink'], [context.cluster_ids, permalinks],
+                          chunk_size=context.config.EXPORT_CHUNK)
+    num_rows, seconds = _timed(export_chunks, output_file, chunks, out_format=out_format, num_rows=len(permalinks))
+    return {'rows_per_sec': _rate(num_rows, seconds), 'mb': os.path.getsize(output_file) / 2 ** 20}
+
+
+def export_csv(context):
+    return _export(context, 'csv')
+
+
+def export_xlsx(context):
+    return _export(context, 'xlsx')
+
+
+def collate(context):
+    output_file = context.path("output", "collated.csv")
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    num_rows, seconds = _timed(write_collated, output_file, context.cluster_ids, context.blocks.labels,
+                               context.config.PERMALINK_URL, context.config.NCLUSTERS,
+                               page_size=context.config.COLLATE_PAGE_SIZE)
+    return {'rows': num_rows, 'docs_per_sec': _rate(len(context.cluster_ids), seconds)}
+
+
+def classify(context):
+    """latency percentiles and throughput of ClusterClassifier for single documents, small and large batches"""
+
+    model_file = context.path("vectorized", "model.pkl")
+    save_model(model_file, context.feature_extractor, context.cluster_mgr)
+    classifier = ClusterClassifier(model_file, context.config)
+    metrics = {}
+    for batch_size, num_calls in CLASSIFY_BATCHES:
+        texts = context.texts(batch_size)
+        latencies = []
+        for _ in range(num_calls):
+            _, seconds = _timed(classifier.classify, texts)
+            latencies.append(seconds)
+        metrics['batch_{0}'.format(batch_size)] = {
+            'p50_ms': float(numpy.percentile(latencies, 50) * 1000),
+            'p99_ms': float(numpy.percentile(latencies, 99) * 1000),
+            'docs_per_sec': _rate(batch_size * num_calls, sum(latencies))}
+    return metrics
+
+
+def _end_to_end(context, large_file):
+    output_file = context.path("output", "pubmed.csv")
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    context.reset_dir("temp")
+    metrics_file = context.config.LOG_DIR + context.config.METRICS_FILE
+    if os.path.exists(metrics_file):
+        os.remove(metrics_file)
+    pubmed = PubMed(config_file=context.config_file)
+    _, seconds = _timed(pubmed.process, input_file=context.xml_file, in_format="xml", output_file=output_file,
+                        out_format="csv", vectorized_file=None, num_docs=0, large_file=large_file,
+                        use_temp_files=False, collate=False, use_h2o=False, h2o_url=None)
+    metrics = {'docs_per_sec': _rate(context.corpus.num_docs, seconds)}
+    if os.path.exists(metrics_file):
+        # wall time and peak RSS of each pipeline stage, as recorded by utils.instrumentation
+        with open(metrics_file) as filehandle:
+            metrics['pipeline'] = {record['stage']: {'wall_seconds': record['wall_seconds'],
+                                                     'peak_rss_mb': record['peak_rss_mb']}
+                                   for record in map(json.loads, filehandle)}
+    return metrics
+
+
+def end_to_end(context):
+    return _end_to_end(context, large_file=True)
+
+
+def end_to_end_normal(context):
+    return _end_to_end(context, large_file=False)
+
+
+def _startup_seconds(arguments, runs):
+    # median wall time of `python -m medline.pubmed arguments` in a new interpreter
+    seconds = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "medline.pubmed"] + arguments, cwd=PACKAGE_DIR,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        seconds.append(time.perf_counter() - start)
+    return float(numpy.median(seconds))
+
+
+def startup(context):
+    # time to parse and validate pubmed arguments; pipeline modules are imported lazily(see utils.registry), so
+    # neither run should import scikit-learn, pandas or h2o
+    invalid_arguments = [context.xml_file, context.path("output", "startup.csv"), "-i", "xml", "-o", "csv",
+                         "--backend", "sharded", "--use-h2o", "--config-file", context.config_file]
+    help_seconds = _startup_seconds(["--help"], STARTUP_RUNS)
+    validation_seconds = _startup_seconds(invalid_arguments, STARTUP_RUNS)
+    probe = "import sys, medline.pubmed; print(' '.join(sorted(set(sys.modules) & set(sys.argv[1:]))))"
+    imported = subprocess.check_output([sys.executable, "-c", probe] + list(STARTUP_HEAVY_MODULES), cwd=PACKAGE_DIR,
+                                       universal_newlines=True).split()
+    return {'help_ms': help_seconds * 1000, 'validation_ms': validation_seconds * 1000,
+            'target_ms': STARTUP_TARGET_MS, 'within_target': validation_seconds * 1000 < STARTUP_TARGET_MS,
+            'heavy_modules_imported': imported}
+
+
+# stages in run order: name -> <function, names of stages whose results it uses>
+STAGES = {
+    'startup': (startup, ()),
+    'generate': (generate, ()),
+    'parse_sax': (parse_sax, ('generate',)),
+    'parse_stream': (parse_stream, ('generate',)),
+    'parse_text': (parse_text, ('generate',)),
+    'shard_write': (shard_write, ('parse_stream',)),
+    'dedup': (deduplicate, ('shard_write',)),
+    'stream_read': (stream_read, ('shard_write',)),
+    'vectorize_tfidf': (vectorize_tfidf, ('shard_write',)),
+    'vectorize_tfidf_streaming': (vectorize_tfidf_streaming, ('shard_write',)),
+    'vectorize_hashing': (vectorize_hashing, ('shard_write',)),
+    'reduce': (reduce_vectors, ('vectorize_tfidf_streaming',)),
+    'cluster_minibatch': (cluster_minibatch, ('vectorize_tfidf_streaming',)),
+    'cluster_reduced': (cluster_reduced, ('reduce',)),
+    'cluster_streaming': (cluster_streaming, ('vectorize_tfidf_streaming',)),
+    'cluster_spherical': (cluster_spherical, ('vectorize_tfidf_streaming',)),
+    'cluster_sharded': (cluster_sharded, ('vectorize_tfidf_streaming',)),
+    'cluster_h2o_stub': (cluster_h2o_stub, ('vectorize_tfidf_streaming',)),
+    'keywords': (keywords, ('cluster_minibatch',)),
+    'export_csv': (export_csv, ('cluster_minibatch',)),
+    'export_xlsx': (export_xlsx, ('cluster_minibatch',)),
+    'collate': (collate, ('cluster_minibatch',)),
+    'classify': (classify, ('cluster_minibatch',)),
+    'end_to_end': (end_to_end, ('generate',)),
+    'end_to_end_normal': (end_to_end_normal, ('generate',)),
+}
+
+
+def resolve(names):
+    """names plus the stages they depend on, in run order
+
+        :rtype list
+        :raises ValueError"""
+
+    unknown = [name for name in names if name not in STAGES]
+    if unknown:
+        raise ValueError("unknown stage(s): {0}. available: {1}".format(", ".join(unknown), ", ".join(STAGES)))
+    selected = set()
+    pending = list(names)
+    while pending:
+        name = pending.pop()
+        if name not in selected:
+            selected.add(name)
+            pending.extend(STAGES[name][1])
+    return [name for name in STAGES if name in selected]
@@ -39,9 +39,20 @@ if __name__ == "__main__":
     cfg_mgr.add_config_entry('input', {'abstracts.parser.title.index': '1'})
     cfg_mgr.add_config_entry('input', {'temp.data.directory': "C:\\Users\\ramji\\Documents\\masters\\datasets"
                                                               "\\pubmed\\temp\\"})
+    cfg_mgr.add_config_entry('input', {'ingest.process.count': '1'})
+    cfg_mgr.add_config_entry('input', {'xml.parser.engine': 'sax'})
+    cfg_mgr.add_config_entry('input', {'decompression.threaded': '1'})
+    cfg_mgr.add_config_entry('input', {'temp.file.format': 'columnar'})
+    cfg_mgr.add_config_entry('input', {'streamer.prefetch.count': '2'})
+    cfg_mgr.add_config_entry('input', {'streamer.memory.budget.mb': '1024'})
+    cfg_mgr.add_config_entry('input', {'text.parse.batch.size': '2000'})
 
     cfg_mgr.add_config_entry('output', {'permalink.base.url': "https://www.ncbi.nlm.nih.gov/pubmed/"})
     cfg_mgr.add_config_entry('output', {'permalink.base.search.url': "https://www.ncbi.nlm.nih.gov/pubmed/?term="})
+    cfg_mgr.add_config_entry('output', {'collate.page.size': '200'})
+    cfg_mgr.add_config_entry('output', {'output.chunk.size': '100000'})
+    cfg_mgr.add_config_entry('output', {'output.partition.clusters': '0'})
+    cfg_mgr.add_config_entry('output', {'output.xlsx.overflow': 'split'})
 
     cfg_mgr.add_config_entry('clustering', {'clusters.count': '20'})
     cfg_mgr.add_config_entry('clustering', {'iterations.count': '30'})
@@ -50,19 +61,47 @@ if __name__ == "__main__":
     cfg_mgr.add_config_entry('clustering', {'cluster.terms.count': '20'})
     cfg_mgr.add_config_entry('clustering', {'verbosity': '1'})
     cfg_mgr.add_config_entry('clustering', {'init.process.count': '4'})
+    cfg_mgr.add_config_entry('clustering', {'clustering.streaming': '0'})
+    cfg_mgr.add_config_entry('clustering', {'kmeans.engine': 'euclidean'})
+    cfg_mgr.add_config_entry('clustering', {'spherical.tolerance': '0.001'})
+    cfg_mgr.add_config_entry('clustering', {'spherical.chunk.size': '10000'})
+    cfg_mgr.add_config_entry('clustering', {'sharded.process.count': '4'})
+    cfg_mgr.add_config_entry('clustering', {'sharded.tolerance': '0.001'})
 
     cfg_mgr.add_config_entry('feature-extraction', {'document.frequency.min': '0.05'})
     cfg_mgr.add_config_entry('feature-extraction', {'document.frequency.max': '0.7'})
     cfg_mgr.add_config_entry('feature-extraction', {'vectorizer': 'tfidf'})
-    cfg_mgr.add_config_entry('feature-extraction', {'vectorizer.input.type': 'file'})
+    cfg_mgr.add_config_entry('feature-extraction', {'vectorizer.input.type': 'content'})
     cfg_mgr.add_config_entry('feature-extraction', {'vectorizer.features.avail': '1'})
     cfg_mgr.add_config_entry('feature-extraction', {'features.dimension': '100'})
     cfg_mgr.add_config_entry('feature-extraction', {'normalization': 'l1'})
     cfg_mgr.add_config_entry('feature-extraction', {'features.pickled.files.directory':
                                                     "C:\\Users\\ramji\\Documents\\masters\\datasets\\pubmed\\temp\\"})
+    cfg_mgr.add_config_entry('feature-extraction', {'features.max.count': '10000'})
+    cfg_mgr.add_config_entry('feature-extraction', {'vectorizer.process.count': '1'})
+    cfg_mgr.add_config_entry('feature-extraction', {'vectorizer.stemming': '0'})
+    cfg_mgr.add_config_entry('feature-extraction', {'stem.cache.size': '200000'})
+    cfg_mgr.add_config_entry('feature-extraction', {'features.reduction': '0'})
+    cfg_mgr.add_config_entry('feature-extraction', {'reduction.sample.size': '50000'})
+    cfg_mgr.add_config_entry('feature-extraction', {'vector.cache': '1'})
+    cfg_mgr.add_config_entry('feature-extraction', {'vector.cache.budget.mb': '10240'})
+    cfg_mgr.add_config_entry('feature-extraction', {'dedup': '0'})
+    cfg_mgr.add_config_entry('feature-extraction', {'dedup.permutations': '64'})
+    cfg_mgr.add_config_entry('feature-extraction', {'dedup.bands': '16'})
+    cfg_mgr.add_config_entry('feature-extraction', {'dedup.shingle.size': '5'})
+    cfg_mgr.add_config_entry('feature-extraction', {'dedup.similarity': '0.8'})
 
     cfg_mgr.add_config_entry('logging', {'logging.directory': "C:\\Users\\ramji\\Documents\\masters\\datasets"
                                                               "\\pubmed\\log\\"})
     cfg_mgr.add_config_entry('logging', {'log.filename': "pubmed_clustering.log"})
+    cfg_mgr.add_config_entry('logging', {'metrics.file': 'pubmed_metrics.jsonl'})
+    cfg_mgr.add_config_entry('logging', {'profile.stage': 'none'})
+    cfg_mgr.add_config_entry('logging', {'profile.interval.ms': '5'})
     cfg_mgr.add_config_entry('framework', {'h2o.server.url': 'http://localhost:54321'})
+    cfg_mgr.add_config_entry('framework', {'service.port': '8765'})
+    cfg_mgr.add_config_entry('framework', {'service.batch.size': '256'})
+    cfg_mgr.add_config_entry('framework', {'service.batch.delay.ms': '5'})
+    cfg_mgr.add_config_entry('framework', {'h2o.exchange.directory': 'none'})
+    cfg_mgr.add_config_entry('framework', {'h2o.export.process.count': '4'})
+    cfg_mgr.add_config_entry('framework', {'h2o.chunk.size': '100000'})
     cfg_mgr.save_config_file("default.cfg")
@@ -0,0 +1,332 @@
+# date: 17-Oct-2026
+# near-duplicate detection over temp files(shards) with MinHash signatures and LSH(locality sensitive hashing) banding
+
+import logging
+import os
+import shutil
+from multiprocessing import Pool
+
+import numpy
+
+from medline.data.load import shard
+
+# bytes that make up words: ascii digits and lower case letters, and every byte of multi-byte utf-8 characters
+_WORD_BYTES = numpy.zeros(256, dtype=bool)
+_WORD_BYTES[ord('0'):ord('9') + 1] = True
+_WORD_BYTES[ord('a'):ord('z') + 1] = True
+_WORD_BYTES[128:] = True
+
+# words are hashed as polynomials in _BASE modulo 2**64; _BASE is odd, hence invertible modulo 2**64:
+# _BASE * _BASE_INVERSE % 2**64 == 1
+_BASE = 1099511628211
+_BASE_INVERSE = 0xCE965057AFF6957B
+# shingles(runs of consecutive words) are hashed as polynomials of their word hashes
+_SHINGLE_BASE = numpy.uint64(0x9E3779B97F4A7C15)
+
+# # of documents hashed at a time and bound on the # of elements of the permutations x shingles matrix
+_DOCS_PER_BATCH = 1000
+_MAX_HASHES = 1 << 22
+
+# temp files rewritten without duplicates are read once; they are compressed for speed rather than size
+_COMPRESSION_LEVEL = 1
+
+# powers of _BASE and _BASE_INVERSE, extended as longer batches of text are hashed
+_powers = numpy.ones(1, dtype=numpy.uint64)
+_inverse_powers = numpy.ones(1, dtype=numpy.uint64)
+
+
+class Deduplicator:
+    """find groups of near-duplicate documents(errata, republications, consensus statements published in several
+    journals) so that only 1 document per group is vectorized and clustered.
+
+    every document is reduced to the set of its dedup.shingle.size word shingles and summarized by a MinHash signature
+    of dedup.permutations hash values; the share of equal values of 2 signatures estimates the Jaccard similarity of
+    their shingle sets. signatures are split into dedup.bands bands; documents that agree on all values of a band are
+    candidates, and a candidate pair whose estimated similarity is at least dedup.similarity is a near-duplicate pair.
+    the earliest document(in temp file order) of each group of linked documents is kept as its representative
+
+    signatures and band keys of all documents are kept in memory-mapped files in work_dir, so memory use does not grow
+    with the size of the corpus"""
+
+    def __init__(self, config, work_dir, seed=0):
+        self.config = config
+        self.work_dir = work_dir
+        self.num_perm = config.DEDUP_PERMUTATIONS
+        self.bands = config.DEDUP_BANDS
+        self.shingle_size = config.DEDUP_SHINGLE_SIZE
+        self.similarity = config.DEDUP_SIMILARITY
+        if self.num_perm < 1 or self.bands < 1 or self.num_perm % self.bands:
+            raise ValueError("invalid dedup.permutations or dedup.bands. permutations must be a positive multiple of "
+                             "bands")
+        if self.shingle_size < 1:
+            raise ValueError("invalid dedup.shingle.size. must be a positive integer")
+        if not 0 < self.similarity <= 1:
+            raise ValueError("invalid dedup.similarity. must be in (0, 1]")
+
+        # multiply-shift hash functions h(x) = (a * x + b) mod 2**64 >> 32, a odd; 1 per permutation
+        random_state = numpy.random.RandomState(seed)
+        self.hash_params = (random_state.randint(0, 2 ** 63, size=self.num_perm, dtype=numpy.uint64) * 2 + 1,
+                            random_state.randint(0, 2 ** 63, size=self.num_perm, dtype=numpy.uint64))
+
+    def deduplicate_shards(self, shard_files):
+        """remove near-duplicate documents from temp files. temp files with duplicates are rewritten to work_dir
+        without them; the others are used as they are
+            input:
+                :parameter shard_files: list of temp files
+            output:
+                :returns tuple of <temp files of representative documents, duplicates(see propagate_labels)>
+                :rtype tuple"""
+
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+        os.makedirs(self.work_dir)
+        sizes = [len(shard.open_shard(shard_file)) for shard_file in shard_files]
+        offsets = numpy.concatenate(([0], numpy.cumsum(sizes, dtype=numpy.int64)))
+        num_docs = int(offsets[-1])
+        signature_file = os.path.join(self.work_dir, "signatures.npy")
+        band_file = os.path.join(self.work_dir, "bands.npy")
+        numpy.lib.format.open_memmap(signature_file, mode='w+', dtype=numpy.uint32, shape=(num_docs, self.num_perm))
+        numpy.lib.format.open_memmap(band_file, mode='w+', dtype=numpy.uint64, shape=(self.bands, num_docs))
+
+        logging.info("computing MinHash signatures of {0} documents".format(num_docs))
+        tasks = [(shard_file, int(offset), signature_file, band_file, self.hash_params, self.shingle_size, self.bands)
+                 for shard_file, offset in zip(shard_files, offsets)]
+        has_words = numpy.concatenate([numpy.zeros(0, dtype=bool)] +
+                                      _map(_signature_shard, tasks, self.config.VECTORIZER_PCNT))
+
+        representatives = self.find_representatives(numpy.load(signature_file, mmap_mode='r'),
+                                                    numpy.load(band_file, mmap_mode='r'), has_words)
+        keep = representatives == numpy.arange(num_docs)
+        tasks = [(shard_file, keep[offsets[index]:offsets[index + 1]],
+                  os.path.join(self.work_dir, os.path.basename(shard_file)), self.config.TEMP_FILE_FORMAT)
+                 for index, shard_file in enumerate(shard_files)]
+        results = _map(_filter_shard, tasks, self.config.VECTORIZER_PCNT)
+
+        positions = numpy.flatnonzero(~keep)
+        duplicates = {'positions': positions,
+                      'representatives': (numpy.cumsum(keep) - 1)[representatives[positions]],
+                      'labels': numpy.concatenate([numpy.zeros(0, dtype='<i8')] + [labels for _, labels in results])}
+        logging.info("{0} near-duplicate documents found; {1} documents kept".format(len(positions),
+                                                                                      num_docs - len(positions)))
+        return [filename for filename, _ in results], duplicates
+
+    def find_representatives(self, signatures, band_keys, has_words):
+        """representative of every document - the earliest document it is linked to by near-duplicate pairs
+            input:
+                :parameter signatures: (# documents x dedup.permutations) MinHash signatures
+                :parameter band_keys: (dedup.bands x # documents) hash of each band of each signature
+                :parameter has_words: flag per document; documents without words are never duplicates
+            output:
+                :returns index of the representative of each document; its own index if it is kept
+                :rtype numpy.ndarray"""
+
+        num_docs = len(has_words)
+        candidates = numpy.flatnonzero(has_words)
+        pairs = []
+        for band in range(self.bands):
+            keys = numpy.asarray(band_keys[band])[candidates]
+            order = numpy.argsort(keys, kind='stable')
+            sorted_keys = keys[order]
+            group_start = numpy.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1]))
+            # pair every member of a bucket with its first(earliest) member
+            first = order[numpy.flatnonzero(group_start)[numpy.cumsum(group_start) - 1]]
+            members = ~group_start
+            pairs.append(numpy.stack((candidates[order[members]], candidates[first[members]])))
+        pairs = numpy.unique(numpy.concatenate([numpy.zeros((2, 0), dtype=numpy.int64)] + pairs, axis=1), axis=1)
+        logging.info("verifying {0} candidate pairs".format(pairs.shape[1]))
+
+        representatives = numpy.arange(num_docs)
+        batch = max(1, _MAX_HASHES // self.num_perm)
+        for start in range(0, pairs.shape[1], batch):
+            documents, others = pairs[:, start:start + batch]
+            similarity = (numpy.asarray(signatures[documents]) == numpy.asarray(signatures[others])).mean(axis=1)
+            similar = similarity >= self.similarity
+            numpy.minimum.at(representatives, documents[similar], others[similar])
+        # follow links to the earliest document of each group
+        while True:
+            linked = representatives[representatives]
+            if numpy.array_equal(linked, representatives):
+                return representatives
+            representatives = linked
+
+
+def propagate_labels(labels, cluster_ids, duplicates):
+    """insert near-duplicate documents removed by Deduplicator back into clustering results, each with the cluster of
+    its representative. documents are returned in their original(temp file) order
+        input:
+            :parameter labels: PMIDs of clustered(representative) documents - list or array
+            :parameter cluster_ids: cluster id of each representative document
+            :parameter duplicates: dict of positions(original index), representatives(row of representative in
+                                   cluster_ids) and labels(PMIDs, -1 if missing) of removed documents
+        output:
+            :returns tuple of <PMIDs, cluster ids> of all documents
+            :rtype tuple"""
+
+    cluster_ids = numpy.asarray(cluster_ids)
+    positions = duplicates['positions']
+    total = len(cluster_ids) + len(positions)
+    kept = numpy.ones(total, dtype=bool)
+    kept[positions] = False
+    all_ids = numpy.empty(total, dtype=cluster_ids.dtype)
+    all_ids[kept] = cluster_ids
+    all_ids[positions] = cluster_ids[duplicates['representatives']]
+    if isinstance(labels, list):
+        all_labels = numpy.empty(total, dtype=object)
+        all_labels[kept] = labels
+        all_labels[positions] = [str(pmid) if pmid >= 0 else None for pmid in duplicates['labels'].tolist()]
+        return all_labels.tolist(), all_ids
+    labels = numpy.asarray(labels)
+    all_labels = numpy.empty(total, dtype=numpy.result_type(labels, duplicates['labels']))
+    all_labels[kept] = labels
+    all_labels[positions] = duplicates['labels']
+    return all_labels, all_ids
+
+
+def minhash_signatures(texts, hash_params, shingle_size):
+    """MinHash signatures of texts. texts are lower cased and split into words on anything but letters and digits;
+    texts with fewer than shingle_size words have a single shingle
+        input:
+            :parameter texts: list of str(None is read as empty text)
+            :parameter hash_params: <multipliers, increments> of the hash functions, 1 per permutation
+            :parameter shingle_size: # of words per shingle
+        output:
+            :returns tuple of <(# texts x # permutations) uint32 signatures, flag per text that has words>
+            :rtype tuple"""
+
+    multipliers, increments = hash_params
+    signatures = numpy.full((len(texts), len(multipliers)), numpy.iinfo(numpy.uint32).max, dtype=numpy.uint32)
+    has_words = numpy.zeros(len(texts), dtype=bool)
+    for start in range(0, len(texts), _DOCS_PER_BATCH):
+        shingles, shingle_docs = _shingles(texts[start:start + _DOCS_PER_BATCH], shingle_size)
+        if not len(shingles):
+            continue
+        docs, doc_starts = numpy.unique(shingle_docs, return_index=True)
+        has_words[start + docs] = True
+        step = max(1, _MAX_HASHES // len(shingles))
+        for first in range(0, len(multipliers), step):
+            hashes = (multipliers[first:first + step, None] * shingles[None, :] +
+                      increments[first:first + step, None]) >> numpy.uint64(32)
+            signatures[start + docs, first:first + step] = numpy.minimum.reduceat(hashes, doc_starts, axis=1).T
+    return signatures, has_words
+
+
+def _shingles(texts, shingle_size):
+    """hash of every shingle of texts and the index of its text, ordered by text"""
+
+    encoded = [(text or "").lower().encode('utf-8') for text in texts]
+    # a separator after every text keeps words of adjacent texts apart
+    data = numpy.frombuffer(b"\n".join(encoded) + b"\n", dtype=numpy.uint8)
+    text_ends = numpy.cumsum([len(text) + 1 for text in encoded]) - 1
+    change = numpy.diff(_WORD_BYTES[data].astype(numpy.int8), prepend=0, append=0)
+    word_starts, word_ends = numpy.flatnonzero(change == 1), numpy.flatnonzero(change == -1)
+    if not len(word_starts):
+        return numpy.zeros(0, dtype=numpy.uint64), numpy.zeros(0, dtype=numpy.int64)
+
+    # polynomial hash of every word from prefix sums of data[j] * base**j: sum of data[start:end] weighted by
+    # base**(j - start)
+    powers, inverse_powers = _base_powers(len(data))
+    prefix = numpy.concatenate((numpy.zeros(1, dtype=numpy.uint64),
+                                numpy.cumsum(data * powers, dtype=numpy.uint64)))
+    words = (prefix[word_ends] - prefix[word_starts]) * inverse_powers[word_starts]
+    word_docs = numpy.searchsorted(text_ends, word_starts)
+
+    num_shingles = max(0, len(words) - shingle_size + 1)
+    shingles = words[:num_shingles].copy()
+    for offset in range(1, shingle_size):
+        shingles = shingles * _SHINGLE_BASE + words[offset:offset + num_shingles]
+    within_text = word_docs[:num_shingles] == word_docs[shingle_size - 1:]
+    shingles, shingle_docs = shingles[within_text], word_docs[:num_shingles][within_text]
+
+    # texts with words but fewer than shingle_size of them
+    counts = numpy.bincount(word_docs, minlength=len(texts))
+    short = numpy.flatnonzero((counts > 0) & (counts < shingle_size))
+    if len(short):
+        first_word = numpy.searchsorted(word_docs, short)
+        short_shingles = numpy.zeros(len(short), dtype=numpy.uint64)
+        for offset in range(shingle_size - 1):
+            present = offset < counts[short]
+            index = numpy.minimum(first_word + offset, len(words) - 1)
+            short_shingles = numpy.where(present, short_shingles * _SHINGLE_BASE + words[index], short_shingles)
+        order = numpy.argsort(numpy.concatenate((shingle_docs, short)), kind='stable')
+        shingles = numpy.concatenate((shingles, short_shingles))[order]
+        shingle_docs = numpy.concatenate((shingle_docs, short))[order]
+    return shingles, shingle_docs
+
+
+def _base_powers(length):
+    """_BASE**j and _BASE_INVERSE**j modulo 2**64 for j < length"""
+
+    global _powers, _inverse_powers
+    if len(_powers) < length:
+        factors = numpy.ones((2, max(length, 2 * len(_powers))), dtype=numpy.uint64)
+        factors[0, 1:] = _BASE
+        factors[1, 1:] = _BASE_INVERSE
+        _powers, _inverse_powers = numpy.cumprod(factors, axis=1)
+    return _powers[:length], _inverse_powers[:length]
+
+
+def _band_keys(signatures, bands):
+    """hash of every band of every signature
+
+        :returns (bands x # signatures) array
+        :rtype numpy.ndarray"""
+
+    rows = signatures.reshape(len(signatures), bands, -1).astype(numpy.uint64)
+    keys = numpy.zeros((len(signatures), bands), dtype=numpy.uint64)
+    for row in range(rows.shape[2]):
+        keys = keys * _SHINGLE_BASE + rows[:, :, row]
+    return keys.T
+
+
+def _signature_shard(task):
+    """compute MinHash signatures and band keys of the documents of 1 temp file and write them to the memory-mapped
+    signature and band files at the temp file's offset. runs in a worker process
+        input:
+            :parameter task: tuple of <temp file, offset, signature file, band file, hash parameters, shingle size,
+                             # bands>
+        output:
+            :returns flag per document that has words
+            :rtype numpy.ndarray"""
+
+    shard_file, offset, signature_file, band_file, hash_params, shingle_size, bands = task
+    texts = shard.open_shard(shard_file).read(columns=('content',))['content']
+    signatures, has_words = minhash_signatures(texts, hash_params, shingle_size)
+    signature_map = numpy.load(signature_file, mmap_mode='r+')
+    signature_map[offset:offset + len(texts)] = signatures
+    signature_map.flush()
+    band_map = numpy.load(band_file, mmap_mode='r+')
+    band_map[:, offset:offset + len(texts)] = _band_keys(signatures, bands)
+    band_map.flush()
+    return has_words
+
+
+def _filter_shard(task):
+    """rewrite a temp file without its near-duplicate documents. runs in a worker process
+        input:
+            :parameter task: tuple of <temp file, flag per document to keep it, output file, temp file format>
+        output:
+            :returns tuple of <temp file of kept documents, PMIDs of removed documents(-1 if missing)>
+            :rtype tuple"""
+
+    shard_file, keep, output_file, shard_format = task
+    reader = shard.open_shard(shard_file)
+    if keep.all():
+        return shard_file, numpy.zeros(0, dtype='<i8')
+    labels = reader.read(columns=('permalink',))['permalink']
+    documents = [dict(zip(shard.SHARD_COLUMNS, values))
+                 for values in reader.iter_documents(columns=shard.SHARD_COLUMNS)]
+    kept = {index: document for index, document in enumerate(documents) if keep[index]}
+    if shard_format == "columnar":
+        shard.ShardWriter(output_file, compression_level=_COMPRESSION_LEVEL).write(kept.values())
+    else:
+        shard.write_shard(output_file, kept, shard_format=shard_format)
+    return output_file, numpy.asarray(labels)[~keep]
+
+
+def _map(function, tasks, processes):
+    """apply function to every task, in a pool of worker processes if processes > 1. results are returned in task
+    order"""
+
+    if processes <= 1:
+        return [function(task) for task in tasks]
+    with Pool(processes=processes) as pool:
+        return pool.map(function, tasks, chunksize=1)
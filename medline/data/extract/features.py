@@ -2,10 +2,20 @@
 # date: 06-Feb-2017
 # feature extraction from input data
 
-from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer, TfidfTransformer
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer, TfidfTransformer, CountVectorizer
 from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import normalize
 from nltk.stem import SnowballStemmer
 import numpy
+import numbers
+import logging
+import os
+from multiprocessing import Pool
+
+from medline.data.load import shard
+from medline.data.extract.sparse_store import SparseBlocks, save_block, save_csr, load_csr
+from medline.utils import instrumentation
+from medline.utils.registry import VECTORIZERS
 
 
 class FeatureExtractor:
@@ -19,6 +29,8 @@ class FeatureExtractor:
         self.vectorizer_type = vectorizer_type
         self.vector_features = []
         self.lda_model = None
+        # stem cache statistics of all processes of the last vectorize_shards run
+        self.shard_stem_cache_info = None
 
     @property
     def vectorizer(self):
@@ -26,26 +38,20 @@ class FeatureExtractor:
 
     @vectorizer.setter
     def vectorizer(self, vec_type):
-        """instantiate a vectorizer: tf-idf or hashing
+        """instantiate a vectorizer: tf-idf, hashing or tfidf-streaming
 
-            for large input files, a Hashing vectorizer could be used if there are memory limitations
+            for large input files, a Hashing vectorizer could be used if there are memory limitations. tfidf-streaming
+            is fitted out-of-core(see vectorize_shards) and keeps the vocabulary, unlike hashing
             input:
-                :parameter vec_type: type of vectorizer to use - either tfidf or hashing
+                :parameter vec_type: type of vectorizer to use - one of tfidf, hashing, tfidf-streaming
             output:
                 :return None
                 :raises ValueError"""
 
-        if vec_type == 'tfidf':
-            self._vectorizer = TfidfVectorizer(input=self.config.VECTORIZER_INPUT, stop_words='english',
-                                               norm=self.config.NORM, analyzer='word', max_features=10000,
-                                               min_df=self.config.MINDF, max_df=self.config.MAXDF)
-        elif vec_type == 'hashing':
-            self._vectorizer = make_pipeline(HashingVectorizer(input=self.config.VECTORIZER_INPUT, stop_words='english',
-                                                               norm=self.config.NORM, analyzer='word'),
-                                             TfidfTransformer(norm=self.config.NORM))
-        else:
-            raise ValueError("unsupported vectorizer type. value must be one of tfidf, hashing")
+        # vectorizers are created by the functions registered in utils.registry.VECTORIZERS
+        self._vectorizer = VECTORIZERS.get(vec_type)(self.config)
 
+    @instrumentation.instrument("vectorize_text", count=instrumentation.num_rows)
     def vectorize_text(self, text):
         """perform feature extraction by converting data to a term-document matrix
 
@@ -56,9 +62,375 @@ class FeatureExtractor:
                 :rtype numpy.NDarray"""
 
         vectorized_text = self.vectorizer.fit_transform(text)
-        if self.vectorizer_type == 'tfidf':
-            self.vector_features = self.vectorizer.get_feature_names()
+        if self.vectorizer_type in ('tfidf', 'tfidf-streaming'):
+            self.vector_features = _feature_names(self.vectorizer)
+        if self.config.STEMMING:
+            logging.info("stem cache: {0}".format(stem_cache_info()))
         return vectorized_text
 
+    def transform_text(self, text):
+        """convert documents to a term-document matrix with the already fitted vectorizer(e.g. of a saved model).
+        vocabulary and idf weights are left unchanged, so rows line up with the matrix the vectorizer was fitted on
+
+            input:
+                :parameter text: raw input data - list of documents
+            output:
+                :return vectorized_text: term-document matrix
+                :rtype scipy.sparse.csr_matrix"""
+
+        return self.vectorizer.transform(text)
+
+    @instrumentation.instrument("vectorize_shards", count=instrumentation.num_rows)
+    def vectorize_shards(self, shard_files, output_dir):
+        """perform feature extraction over temp files without loading the corpus into memory. the term-document matrix
+        is written to output_dir block by block - 1 block per temp file. temp files are vectorized by a pool of
+        vectorizer.process.count worker processes; blocks and their PMIDs are kept in temp file order
+
+            tfidf-streaming makes 2 passes over the temp files: the 1st pass counts document frequencies and fixes the
+            vocabulary(document.frequency.min/max and features.max.count apply as they do for tfidf); the 2nd pass
+            transforms each temp file into a sparse block.
+            hashing needs no fitting: workers hash their temp files and return per-block document frequencies, which
+            are merged to compute idf weights; the weights are then applied to every block by the workers
+            input:
+                :parameter shard_files: list of temp files
+                :parameter output_dir: directory in which vectorized blocks are saved
+            output:
+                :return vectorized blocks with the PMIDs of their rows
+                :rtype SparseBlocks
+                :raises ValueError"""
+
+        # stem cache use is counted per process: pass 1 in this process, transforms in the worker processes
+        fit_counts = _stem_cache_counts()
+        if self.vectorizer_type == 'tfidf-streaming':
+            logging.info("vectorizer pass 1: counting document frequencies")
+            self.vectorizer.fit_shards(shard_files)
+            self.vector_features = _feature_names(self.vectorizer)
+            logging.info("vocabulary size: {0}".format(len(self.vector_features)))
+            transformer = self.vectorizer
+        elif self.vectorizer_type == 'hashing':
+            transformer = self.vectorizer.steps[0][1]
+        else:
+            raise ValueError("vectorizing temp files is supported only by tfidf-streaming and hashing vectorizers")
+
+        logging.info("transforming temp files using {0} process(es)".format(self.config.VECTORIZER_PCNT))
+        blocks = SparseBlocks(output_dir)
+        tasks = [(transformer, shard_file, blocks.block_path(index)) for index, shard_file in enumerate(shard_files)]
+        lookups, misses, _ = [end - start for start, end in zip(fit_counts, _stem_cache_counts())]
+        # sizes of the caches used by this run, by process id
+        cache_sizes = {os.getpid(): _stem_cache_counts()[2]} if lookups else {}
+        doc_freq = None
+        # shard results are added up as they arrive, so only the running document frequencies are held in memory
+        for rows, num_features, block_doc_freq, stem_counts in _map(_vectorize_shard, tasks,
+                                                                    self.config.VECTORIZER_PCNT):
+            blocks.add(rows, num_features)
+            pid, task_lookups, task_misses, cache_size = stem_counts
+            cache_sizes[pid] = cache_size
+            lookups += task_lookups
+            misses += task_misses
+            if doc_freq is None:
+                doc_freq = block_doc_freq
+            else:
+                doc_freq += block_doc_freq
+
+        if self.vectorizer_type == 'hashing' and blocks.blocks:
+            # same idf as TfidfTransformer(smooth_idf=True) fitted on the whole corpus
+            idf = numpy.log((1 + len(blocks)) / (1 + doc_freq)) + 1
+            self.vectorizer.steps[-1][1].idf_ = idf
+            logging.info("applying idf weights to vectorized blocks")
+            tasks = [(blocks.block_path(index), self.config.NORM) for index in range(len(blocks.blocks))]
+            list(_map(_apply_idf, tasks, self.config.VECTORIZER_PCNT, initializer=_set_idf, initargs=(idf,)))
+        blocks.save()
+        if self.config.STEMMING:
+            self.shard_stem_cache_info = _cache_info(lookups, misses, sum(cache_sizes.values()),
+                                                     self.config.STEM_CACHE_SIZE)
+            self.shard_stem_cache_info['processes'] = len(cache_sizes)
+            logging.info("stem cache: {0}".format(self.shard_stem_cache_info))
+        return blocks
+
+    def stem_cache_info(self):
+        """hit-rate and size of the stem cache - summed over all processes of the last vectorize_shards run if there
+        was one, of this process otherwise. None if stemming is not enabled
+
+            :rtype dict"""
+
+        if not self.config.STEMMING:
+            return None
+        return self.shard_stem_cache_info or stem_cache_info()
+
     def get_features(self):
         return self.vector_features
+
+
+def _analyzer(config):
+    """analyzer and stop words of a vectorizer. stemming analyzer replaces the built-in word analyzer and removes
+    stop words itself, before stemming"""
+
+    if config.STEMMING:
+        return StemmingAnalyzer(cache_size=config.STEM_CACHE_SIZE), None
+    return 'word', 'english'
+
+
+def tfidf_vectorizer(config):
+    analyzer, stop_words = _analyzer(config)
+    return TfidfVectorizer(input=config.VECTORIZER_INPUT, stop_words=stop_words, norm=config.NORM, analyzer=analyzer,
+                           max_features=config.MAX_FEATURES, min_df=config.MINDF, max_df=config.MAXDF)
+
+
+def hashing_vectorizer(config):
+    analyzer, stop_words = _analyzer(config)
+    return make_pipeline(HashingVectorizer(input=config.VECTORIZER_INPUT, stop_words=stop_words, norm=config.NORM,
+                                           analyzer=analyzer),
+                         TfidfTransformer(norm=config.NORM))
+
+
+def streaming_tfidf_vectorizer(config):
+    analyzer, _ = _analyzer(config)
+    return StreamingTfidfVectorizer(norm=config.NORM, max_features=config.MAX_FEATURES, min_df=config.MINDF,
+                                    max_df=config.MAXDF, analyzer=analyzer if config.STEMMING else None)
+
+
+def _feature_names(vectorizer):
+    # get_feature_names was replaced by get_feature_names_out in newer scikit-learn releases
+    if hasattr(vectorizer, 'get_feature_names_out'):
+        return list(vectorizer.get_feature_names_out())
+    return vectorizer.get_feature_names()
+
+
+def _map(function, tasks, processes, initializer=None, initargs=()):
+    """apply function to every task, in a pool of worker processes if processes > 1. results are yielded in task
+    order as they become available, so the caller can reduce them one at a time
+
+        :rtype generator"""
+
+    if processes <= 1:
+        if initializer:
+            initializer(*initargs)
+        for task in tasks:
+            yield function(task)
+        return
+    with Pool(processes=processes, initializer=initializer, initargs=initargs) as pool:
+        for result in pool.imap(function, tasks, chunksize=1):
+            yield result
+
+
+def _vectorize_shard(task):
+    """vectorize 1 temp file and save it as a block. runs in a worker process
+
+        input:
+            :parameter task: tuple of <fitted or stateless vectorizer, temp file, block directory>
+        output:
+            :returns tuple of <# rows, # features, document frequency of each feature, stem cache counts>. stem cache
+                     counts are <process id, lookups, misses, cache size after the transform>; lookups and misses
+                     are those of this task only
+            :rtype tuple"""
+
+    transformer, shard_file, block_dir = task
+    start_counts = _stem_cache_counts()
+    data = shard.open_shard(shard_file).read(columns=('permalink', 'content'))
+    vectorized_text = transformer.transform(data['content']).tocsr()
+    save_block(block_dir, vectorized_text, data['permalink'])
+    doc_freq = numpy.bincount(vectorized_text.indices, minlength=vectorized_text.shape[1])
+    lookups, misses, size = _stem_cache_counts()
+    stem_counts = (os.getpid(), lookups - start_counts[0], misses - start_counts[1], size)
+    return vectorized_text.shape[0], vectorized_text.shape[1], doc_freq, stem_counts
+
+
+_idf = None
+
+
+def _set_idf(idf):
+    global _idf
+    _idf = idf
+
+
+def _apply_idf(task):
+    """scale a saved block by the idf weights set by _set_idf and re-normalize it. runs in a worker process"""
+
+    block_dir, norm = task
+    vectorized_text = load_csr(block_dir, mmap=False)
+    vectorized_text.data *= _idf[vectorized_text.indices]
+    if norm:
+        vectorized_text = normalize(vectorized_text, norm=norm, copy=False)
+    save_csr(block_dir, vectorized_text)
+
+
+class StreamingTfidfVectorizer:
+    """tf-idf vectorizer that can be fitted over data too large for memory. document and term frequencies are
+    accumulated batch by batch(partial_fit), the vocabulary is fixed by finalize and transform then works batch by batch
+    as well. produces the same features and weights as TfidfVectorizer(smooth idf, raw term frequency)"""
+
+    def __init__(self, norm='l2', min_df=1, max_df=1.0, max_features=None, stop_words='english', analyzer=None):
+        self.norm = norm
+        self.min_df = min_df
+        self.max_df = max_df
+        self.max_features = max_features
+        self.stop_words = stop_words
+        self.analyzer = analyzer
+        self.vocabulary_ = None
+        self.idf_ = None
+        self.n_docs_ = 0
+        self._term_counts = {}
+
+    def build_analyzer(self):
+        if self.analyzer is not None:
+            return self.analyzer
+        return CountVectorizer(stop_words=self.stop_words).build_analyzer()
+
+    def partial_fit(self, texts):
+        """accumulate document and term frequencies of a batch of documents"""
+
+        texts = list(texts)
+        self.n_docs_ += len(texts)
+        counter = CountVectorizer(analyzer=self.build_analyzer())
+        try:
+            counts = counter.fit_transform(texts)
+        except ValueError:
+            # batch contains stop words only
+            return self
+        doc_freq = numpy.bincount(counts.indices, minlength=counts.shape[1])
+        term_freq = numpy.asarray(counts.sum(axis=0)).ravel()
+        for term, index in counter.vocabulary_.items():
+            frequencies = self._term_counts.get(term)
+            if frequencies is None:
+                self._term_counts[term] = [int(doc_freq[index]), int(term_freq[index])]
+            else:
+                frequencies[0] += int(doc_freq[index])
+                frequencies[1] += int(term_freq[index])
+        return self
+
+    def finalize(self):
+        """fix the vocabulary and idf weights from the accumulated frequencies; frequencies are discarded afterwards"""
+
+        terms = sorted(self._term_counts)
+        frequencies = numpy.asarray([self._term_counts[term] for term in terms], dtype=numpy.int64).reshape(-1, 2)
+        doc_freq, term_freq = frequencies[:, 0], frequencies[:, 1]
+        max_doc_count = self.max_df if isinstance(self.max_df, numbers.Integral) else self.max_df * self.n_docs_
+        min_doc_count = self.min_df if isinstance(self.min_df, numbers.Integral) else self.min_df * self.n_docs_
+        kept = numpy.flatnonzero((doc_freq >= min_doc_count) & (doc_freq <= max_doc_count))
+        if self.max_features and len(kept) > self.max_features:
+            kept = kept[numpy.argsort(-term_freq[kept], kind='stable')[:self.max_features]]
+        if not len(kept):
+            raise ValueError("After pruning, no terms remain. Try a lower min_df or a higher max_df.")
+
+        kept_terms = sorted(terms[index] for index in kept)
+        self.vocabulary_ = {term: index for index, term in enumerate(kept_terms)}
+        kept_doc_freq = numpy.asarray([self._term_counts[term][0] for term in kept_terms], dtype=numpy.float64)
+        self.idf_ = numpy.log((1 + self.n_docs_) / (1 + kept_doc_freq)) + 1
+        self._term_counts = {}
+        return self
+
+    def fit_shards(self, shard_files):
+        """fit the vectorizer over temp files - 1 temp file held in memory at a time"""
+
+        self.n_docs_ = 0
+        self._term_counts = {}
+        for shard_file in shard_files:
+            logging.info("counting document frequencies in {0}".format(shard_file))
+            self.partial_fit(shard.open_shard(shard_file).read(columns=('content',))['content'])
+        return self.finalize()
+
+    def fit(self, texts):
+        self.n_docs_ = 0
+        self._term_counts = {}
+        return self.partial_fit(texts).finalize()
+
+    def fit_transform(self, texts):
+        texts = list(texts)
+        return self.fit(texts).transform(texts)
+
+    def transform(self, texts):
+        """transform documents into a tf-idf weighted term-document matrix
+
+            :rtype scipy.sparse.csr_matrix
+            :raises ValueError"""
+
+        if self.vocabulary_ is None:
+            raise ValueError("vectorizer is not fitted")
+        counter = CountVectorizer(analyzer=self.build_analyzer(), vocabulary=self.vocabulary_)
+        vectorized_text = counter.transform(texts).astype(numpy.float64)
+        vectorized_text.data *= self.idf_[vectorized_text.indices]
+        if self.norm:
+            vectorized_text = normalize(vectorized_text, norm=self.norm, copy=False)
+        return vectorized_text
+
+    def get_feature_names(self):
+        return sorted(self.vocabulary_, key=self.vocabulary_.get)
+
+
+# stem cache shared by all StemmingAnalyzer objects of a process. token frequencies in abstracts are heavily skewed,
+# so a bounded cache of stems serves most lookups without calling the stemmer
+class _StemCache(dict):
+    """token -> stem dict that stems missing tokens on lookup. tokens are cached in the order they are first seen and
+    never evicted; once max_size tokens are cached, stems of new tokens are computed but no longer stored. frequent
+    tokens tend to be seen early, but a token first seen after the cache is full is stemmed on every lookup"""
+
+    def __init__(self, max_size):
+        super(_StemCache, self).__init__()
+        self.max_size = max_size
+        self.stem = SnowballStemmer('english').stem
+        self.lookups = 0
+        self.misses = 0
+
+    def __missing__(self, token):
+        self.misses += 1
+        stem = self.stem(token)
+        if len(self) < self.max_size:
+            self[token] = stem
+        return stem
+
+
+_stem_cache = None
+
+
+def _get_stem_cache(cache_size):
+    global _stem_cache
+    if _stem_cache is None or _stem_cache.max_size != cache_size:
+        _stem_cache = _StemCache(cache_size)
+    return _stem_cache
+
+
+def stem_cache_info():
+    """hits, misses, current size, maximum size and hit-rate of the stem cache of this process
+
+        :rtype dict"""
+
+    if _stem_cache is None:
+        return None
+    return _cache_info(_stem_cache.lookups, _stem_cache.misses, len(_stem_cache), _stem_cache.max_size)
+
+
+def _stem_cache_counts():
+    """<lookups, misses, size> of the stem cache of this process; zeros if there is none yet"""
+
+    if _stem_cache is None:
+        return 0, 0, 0
+    return _stem_cache.lookups, _stem_cache.misses, len(_stem_cache)
+
+
+def _cache_info(lookups, misses, size, max_size):
+    hits = lookups - misses
+    return {'hits': hits, 'misses': misses, 'size': size, 'max_size': max_size,
+            'hit_rate': hits / lookups if lookups else 0.0}
+
+
+class StemmingAnalyzer:
+    """word analyzer(same tokenization and stop words as analyzer='word') that stems every token with the Snowball
+    stemmer. stems are memoized in a bounded cache shared by all analyzers of a process. picklable, so it can be sent to
+    vectorizer worker processes"""
+
+    def __init__(self, stop_words='english', cache_size=200000):
+        self.stop_words = stop_words
+        self.cache_size = cache_size
+        self._analyzer = None
+        self._cache = None
+
+    def __call__(self, doc):
+        if self._analyzer is None:
+            self._analyzer = CountVectorizer(stop_words=self.stop_words).build_analyzer()
+            self._cache = _get_stem_cache(self.cache_size)
+        tokens = self._analyzer(doc)
+        self._cache.lookups += len(tokens)
+        return list(map(self._cache.__getitem__, tokens))
+
+    def __getstate__(self):
+        return {'stop_words': self.stop_words, 'cache_size': self.cache_size, '_analyzer': None, '_cache': None}
@@ -0,0 +1,167 @@
+# date: 17-Oct-2026
+# store sparse term-document matrices on disk as CSR components(.npy files) that can be memory-mapped back in
+
+import json
+import os
+
+import numpy
+from scipy import sparse
+
+CSR_COMPONENTS = ('data', 'indices', 'indptr')
+
+
+def save_csr(directory, matrix):
+    """save a sparse matrix to a directory as data.npy, indices.npy, indptr.npy and shape.npy
+
+        input:
+            :parameter directory: fully qualified path of directory; created if missing
+            :parameter matrix: scipy sparse matrix(converted to CSR if necessary)"""
+
+    matrix = sparse.csr_matrix(matrix)
+    os.makedirs(directory, exist_ok=True)
+    for component in CSR_COMPONENTS:
+        numpy.save(os.path.join(directory, component + ".npy"), getattr(matrix, component))
+    numpy.save(os.path.join(directory, "shape.npy"), numpy.asarray(matrix.shape, dtype=numpy.int64))
+
+
+def load_csr(directory, mmap=True):
+    """load a sparse matrix saved by save_csr
+
+        input:
+            :parameter directory: fully qualified path of directory
+            :parameter mmap: flag to memory-map the CSR components instead of reading them into memory. maps are
+                              copy-on-write: estimators that need writable input can use them, the files are never
+                              modified
+        output:
+            :returns CSR matrix
+            :rtype scipy.sparse.csr_matrix"""
+
+    mmap_mode = 'c' if mmap else None
+    data, indices, indptr = [numpy.load(os.path.join(directory, component + ".npy"), mmap_mode=mmap_mode)
+                             for component in CSR_COMPONENTS]
+    shape = tuple(numpy.load(os.path.join(directory, "shape.npy")).tolist())
+    return sparse.csr_matrix((data, indices, indptr), shape=shape, copy=False)
+
+
+def save_block(directory, matrix, labels):
+    """save a block of a term-document matrix along with the PMIDs of its rows
+
+        :raises ValueError"""
+
+    if matrix.shape[0] != len(labels):
+        raise ValueError("# of labels does not match # of rows in block")
+    save_csr(directory, matrix)
+    save_labels(os.path.join(directory, "labels.npy"), labels)
+
+
+def save_labels(filename, labels):
+    """save PMIDs of matrix rows to a .npy file. PMIDs are stored as fixed width strings unless some are missing(None),
+    in which case they are stored as(pickled) objects"""
+
+    numpy.save(filename, numpy.asarray(labels))
+
+
+def load_labels(filename, mmap=True):
+    """load PMIDs saved by save_labels; memory-mapped if mmap is set and PMIDs are not stored as objects. integer PMIDs
+    (from columnar shards) mark missing PMIDs as -1; if any are missing, PMIDs are returned as objects with None in
+    their place, same as PMIDs saved from documents"""
+
+    labels = None
+    if mmap:
+        try:
+            labels = numpy.load(filename, mmap_mode='r')
+        except ValueError:
+            # object arrays can not be memory-mapped
+            pass
+    if labels is None:
+        labels = numpy.load(filename, allow_pickle=True)
+    if labels.dtype.kind == 'i' and labels.size and labels.min() < 0:
+        missing = labels < 0
+        labels = labels.astype(object)
+        labels[missing] = None
+    return labels
+
+
+class SparseBlocks:
+    """term-document matrix stored on disk as a list of CSR blocks(consecutive row slices), each with the PMIDs of its
+    rows. blocks are written one at a time, so the full matrix never has to be held in memory"""
+
+    manifest_name = "blocks.json"
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.blocks = []
+        self.num_features = None
+
+    def __len__(self):
+        return sum(block['rows'] for block in self.blocks)
+
+    @property
+    def shape(self):
+        return len(self), self.num_features
+
+    def append(self, matrix, labels):
+        """save matrix as the next block
+
+            input:
+                :parameter matrix: sparse matrix - 1 row per document
+                :parameter labels: PMIDs of the rows of matrix
+            :raises ValueError"""
+
+        save_block(self.block_path(len(self.blocks)), matrix, labels)
+        self.add(matrix.shape[0], matrix.shape[1])
+
+    def block_path(self, index):
+        """directory of the index'th block. blocks can be written there(see save_block) by other processes and then
+        registered in order with add"""
+
+        return os.path.join(self.directory, "block{0:05d}".format(index))
+
+    def add(self, rows, num_features):
+        """register the next block, already written to block_path(len(blocks))
+
+            :raises ValueError"""
+
+        if self.num_features is not None and num_features != self.num_features:
+            raise ValueError("# of features in block does not match previous blocks")
+        self.blocks.append({'name': os.path.basename(self.block_path(len(self.blocks))), 'rows': rows})
+        self.num_features = num_features
+
+    def save(self):
+        """write the block manifest; blocks are only visible to SparseBlocks.load once the manifest is saved"""
+
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, self.manifest_name), 'w') as filehandle:
+            json.dump({'num_features': self.num_features, 'blocks': self.blocks}, filehandle)
+
+    @classmethod
+    def load(cls, directory):
+        with open(os.path.join(directory, cls.manifest_name), 'r') as filehandle:
+            manifest = json.load(filehandle)
+        blocks = cls(directory)
+        blocks.blocks = manifest['blocks']
+        blocks.num_features = manifest['num_features']
+        return blocks
+
+    def block(self, index, mmap=True):
+        return load_csr(os.path.join(self.directory, self.blocks[index]['name']), mmap=mmap)
+
+    def block_labels(self, index):
+        return load_labels(os.path.join(self.directory, self.blocks[index]['name'], "labels.npy"), mmap=False)
+
+    def iter_blocks(self, mmap=True):
+        for index in range(len(self.blocks)):
+            yield self.block(index, mmap=mmap)
+
+    @property
+    def labels(self):
+        """PMIDs of all rows, in row order"""
+
+        if not self.blocks:
+            return numpy.asarray([], dtype=numpy.int64)
+        return numpy.concatenate([self.block_labels(index) for index in range(len(self.blocks))])
+
+    def stack(self):
+        """load all blocks into a single in-memory CSR matrix"""
+
+        return sparse.vstack(list(self.iter_blocks(mmap=False)), format='csr')
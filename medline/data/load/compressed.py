@@ -0,0 +1,129 @@
+# date: 17-Oct-2026
+# open compressed input files(.gz, .bz2, .xz) as regular file objects. decompression can run in a background thread so
+# that it overlaps with parsing
+
+import bz2
+import gzip
+import io
+import lzma
+import queue
+import threading
+
+# compressed file suffix -> function to open the file in binary mode. add an entry here to support another codec
+CODECS = {
+    ".gz": gzip.open,
+    ".bz2": bz2.open,
+    ".xz": lzma.open,
+}
+
+
+def compression_suffix(filename):
+    """return compression suffix of a filename(e.g. '.gz' for 'medline17n0001.xml.gz'). None if file is not
+    compressed with a supported codec"""
+
+    for suffix in CODECS:
+        if filename.lower().endswith(suffix):
+            return suffix
+    return None
+
+
+def strip_compression_suffix(filename):
+    """return filename without its compression suffix; 'medline17n0001.xml.gz' -> 'medline17n0001.xml'"""
+
+    suffix = compression_suffix(filename)
+    return filename[:-len(suffix)] if suffix else filename
+
+
+class BackgroundDecompressor(io.RawIOBase):
+    """read-only binary stream over a compressed file. a background thread decompresses the file into a bounded queue
+    of chunks; the consuming thread(parser) only copies already decompressed bytes. zlib, bz2 and lzma release the GIL
+    while decompressing, so decompression and parsing run concurrently"""
+
+    def __init__(self, filename, opener, chunk_size=1024*1024, max_chunks=8):
+        super(BackgroundDecompressor, self).__init__()
+        self._file = opener(filename, 'rb')
+        self._chunk_size = chunk_size
+        self._chunks = queue.Queue(maxsize=max_chunks)
+        self._buffer = memoryview(b"")
+        self._eof = False
+        # exception raised by the producer. the producer has exited, so it is re-raised by every later read
+        self._error = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._decompress, name="decompress-" + filename, daemon=True)
+        self._thread.start()
+
+    def _decompress(self):
+        """producer: decompress file chunk by chunk. an empty chunk marks end of file; exceptions are handed over to the
+        consumer and re-raised there"""
+
+        try:
+            while not self._stop.is_set():
+                data = self._file.read(self._chunk_size)
+                self._put(data)
+                if not data:
+                    break
+        except Exception as error:
+            self._put(error)
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self._chunks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._error is not None:
+            raise self._error
+        if not self._buffer and not self._eof:
+            item = self._chunks.get()
+            if isinstance(item, Exception):
+                self._error = item
+                raise item
+            if not item:
+                self._eof = True
+            self._buffer = memoryview(item)
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+    def close(self):
+        if not self.closed:
+            self._stop.set()
+            self._thread.join()
+            self._file.close()
+        super(BackgroundDecompressor, self).close()
+
+
+def open_input(filename, mode='rb', threaded=True, encoding='utf-8'):
+    """open an input file for reading, transparently decompressing it if its suffix matches a supported codec
+
+        input:
+            :parameter filename: fully qualified path of input file
+            :parameter mode: 'rb' or 'r'/'rt'
+            :parameter threaded: flag to decompress in a background thread
+            :parameter encoding: encoding of text mode files
+        output:
+            :returns file object
+            :raises ValueError"""
+
+    if mode not in ('rb', 'r', 'rt'):
+        raise ValueError("unsupported file mode. value must be one of rb, r, rt")
+    suffix = compression_suffix(filename)
+    if suffix is None:
+        if mode == 'rb':
+            return open(filename, 'rb')
+        return open(filename, 'r', encoding=encoding)
+
+    if threaded:
+        binary_file = io.BufferedReader(BackgroundDecompressor(filename, CODECS[suffix]))
+    else:
+        binary_file = CODECS[suffix](filename, 'rb')
+    if mode == 'rb':
+        return binary_file
+    return io.TextIOWrapper(binary_file, encoding=encoding)
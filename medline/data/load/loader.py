@@ -2,13 +2,16 @@
 # date: 05-Feb-2017
 
 import os
+import re
 import pandas
-import pickle
 import logging
 from xml.sax.handler import ContentHandler
 from xml.sax import parse
+from xml.etree.ElementTree import fromstring, ParseError
+from html import unescape
 
-from medline.utils import input_parser
+from medline.data.load import compressed, shard, text_records
+from medline.utils import input_parser, instrumentation
 
 
 class Loader(object):
@@ -19,7 +22,8 @@ class Loader(object):
         self.config = config
 
     def _validate_file(self, filename):
-        """validates input file format and type. skips validation if filename is NA
+        """validates input file format and type. skips validation if filename is NA. files compressed with a supported
+        codec(e.g. .xml.gz) are validated against the extension preceding the compression suffix
 
         input:
             :parameter filename: fully qualified path of input file"""
@@ -31,7 +35,8 @@ class Loader(object):
         if os.path.isdir(filename):
             raise ValueError("filename is a directory. expected: a file")
         else:
-            if not os.path.basename(filename).lower().endswith(supported_formats):
+            basename = compressed.strip_compression_suffix(os.path.basename(filename))
+            if not basename.lower().endswith(supported_formats):
                 raise ValueError("invalid file extension. supported formats: {0}".format(supported_formats))
 
     def load_(self, as_, limit):
@@ -40,60 +45,148 @@ class Loader(object):
     def _read_file(self):
         raise NotImplementedError
 
+    def _open_file(self, mode='rb'):
+        """open input file for reading; compressed files are decompressed on the fly"""
+
+        return compressed.open_input(self.filename, mode=mode, threaded=self.config.THREADED_DECOMPRESSION)
+
+    def manifest(self):
+        """identify the data this loader would load, without loading it. used as part of cache keys(see
+        utils.vector_cache)
+
+            :returns list of <file name, size, modification time> of input files
+            :rtype list"""
+
+        return _file_manifest([self.filename])
+
 
 class AbstractsTextLoader(Loader):
-    """Loads PubMed data from input .txt file."""
+    """Loads PubMed data from input .txt file. the file is memory mapped and split into records on PMID line
+    boundaries in 1 pass(see text_records); records are parsed in batches, in worker processes if
+    ingest.process.count > 1"""
 
-    def __init__(self, filename, config, parser=input_parser.DefaultParser()):
-        super(AbstractsTextLoader).__init__(config)
+    def __init__(self, filename, config, parser=input_parser.DefaultParser(), workers=None, batch_size=None):
+        super(AbstractsTextLoader, self).__init__(config)
         self.filename = filename
         self.config = config
         self.data_parser = parser
+        self.workers = workers if workers is not None else self.config.INGEST_PCNT
+        self.batch_size = batch_size if batch_size is not None else self.config.TEXT_BATCH_SIZE
+        self.num_docs_read = 0
 
         # validate input file
         self._validate_file(self.filename)
 
-    def load_(self, as_="dataframe", limit=100):
+    @instrumentation.instrument("parse", count=len)
+    def load_(self, as_="dataframe", limit=None):
         """load input data file into a format specified. supports pandas dataframe
         Parameters:
             as_: data structure to load data into. default = dataframe
-            limit: # of data items to be loaded. default = 100
+            limit: # of data items to be loaded. default = None(all)
 
-        :rtype pandas.Dataframe"""
+        :rtype pandas.Dataframe
+        :rtype dict"""
         data_dict = {}
-        data_index = 0
-        for data in self.__collate_data():
-            data_dict[data_index] = self.data_parser.parse_(data)
-            data_index += 1
-            if data_index >= limit:
+        for data_index, document in self.iter_documents():
+            data_dict[data_index] = document
+            if limit and len(data_dict) >= limit:
                 break
-        return pandas.DataFrame.from_dict(data_dict, orient='index')
+        if as_ == "dataframe":
+            return pandas.DataFrame.from_dict(data_dict, orient='index')
+        else:
+            return data_dict
 
-    def __collate_data(self):
-        """collates read data into logical segments separating one data item from another"""
+    def iter_documents(self):
+        """parse the input file one record at a time, without holding parsed records in memory
 
-        collated_data = ""
-        last_line = ""
-        record_sep = self.config.RECORD_SEP
+            :returns generator of <record index, parsed record> tuples
+            :rtype generator"""
 
-        for data in self._read_file():
-            if data.startswith("PMID"):
-                yield collated_data
-                collated_data = ""
-            elif data == "\n" and last_line == "\n":
-                pass
-            elif data == "\n":
-                collated_data += record_sep
-            else:
-                collated_data += data
-            last_line = data
+        logging.info("Begin text file parsing")
+        self.num_docs_read = 0
+        with self._read_file() as buffer:
+            for document in text_records.iter_parsed(self.filename, buffer, self.config.RECORD_SEP, self.data_parser,
+                                                     workers=self.workers, batch_size=self.batch_size):
+                yield self.num_docs_read, document
+                self.num_docs_read += 1
+        logging.info("text file parsing complete. read {0} documents".format(self.num_docs_read))
 
     def _read_file(self):
-        """read input file and return 1 line of data at a time"""
+        """input file contents as a buffer(see text_records.open_buffer)"""
 
-        with open(self.filename, 'r', encoding='utf-8') as file:
-            for data in file:
-                yield data
+        return text_records.open_buffer(self.filename, threaded=self.config.THREADED_DECOMPRESSION)
+
+
+class AbstractsTextSplitLoader(AbstractsTextLoader):
+    """parse PubMed input .txt file and save subsets of parsed records in a temporary folder, same as
+    AbstractsXmlSplitLoader does for .xml files. parsing of input file can be skipped if pre-processed temporary files
+    are available. extends AbstractsTextLoader"""
+
+    def __init__(self, filename, config, parser=input_parser.DefaultParser(), threshold=100000, use_temp_files=False,
+                 num_docs=0):
+        super(AbstractsTextSplitLoader, self).__init__(filename, config, parser=parser)
+
+        self.use_temp_files = use_temp_files
+        self.threshold = threshold
+        self.temp_filenames = []
+        self.temp_files_dir = self.config.TEMP_DIR
+        self.temp_file_basename = "filepart."
+        self.num_docs_processed = num_docs
+
+    @instrumentation.instrument("parse", count=lambda result: result[0])
+    def load_(self, as_, limit=None):
+        """load input data file into temporary files. Skips loading input file if use_temp_files flag is set to True
+           and pre-processed temporary files are available
+                Parameters:
+                   as_: data structure to load data into. supports only "files"
+                   limit: # of data items to be loaded. default = None
+                :return tuple of <# items loaded, list of items)
+                :rtype tuple"""
+
+        if as_ != "files":
+            raise ValueError("invalid value for param as_. only 'files' is supported. For other purposes use "
+                             "AbstractsTextLoader class")
+        if self.use_temp_files:
+            temp_files = _existing_temp_files(self.temp_files_dir, self.temp_file_basename)
+            if temp_files:
+                logging.info("non-empty temp directory found. returning temp files for processing")
+                return self.num_docs_processed, temp_files
+            if self.filename == "NA":
+                logging.error("temp directory missing & input file is set to NA. processing aborted")
+            else:
+                logging.info("temp directory missing. ignoring use_temp_files flag and loading source file")
+
+        data_dict = {}
+        for data_index, document in self.iter_documents():
+            data_dict[data_index] = document
+            self.num_docs_processed += 1
+            if len(data_dict) >= self.threshold:
+                self._save_temporary_file(data_dict)
+            if limit and self.num_docs_processed >= limit:
+                break
+        if data_dict:
+            self._save_temporary_file(data_dict)
+        logging.info("total docs processed: {0}".format(self.num_docs_processed))
+        return self.num_docs_processed, self.temp_filenames
+
+    def _save_temporary_file(self, data_dict):
+        """save parsed records to the next temporary file(in the format set in config) and flush data_dict"""
+
+        full_filename = self.temp_files_dir + self.temp_file_basename + str(len(self.temp_filenames) + 1)
+        try:
+            shard.write_shard(full_filename, data_dict, shard_format=self.config.TEMP_FILE_FORMAT)
+            self.temp_filenames.append(full_filename)
+        except IOError:
+            logging.error("unable to save temporary data file")
+        data_dict.clear()
+
+    def manifest(self):
+        """manifest(see Loader.manifest) of the temp files if they would be used, of the input file otherwise"""
+
+        temp_files = _existing_temp_files(self.temp_files_dir, self.temp_file_basename) if self.use_temp_files else []
+        if temp_files:
+            return _file_manifest(temp_files)
+        return super(AbstractsTextSplitLoader, self).manifest()
 
 
 class AbstractsXmlLoader(Loader, ContentHandler):
@@ -107,6 +200,8 @@ class AbstractsXmlLoader(Loader, ContentHandler):
         self.data_dict = {}
         self.data_index = -1
         self.char_buffer = []
+        # names of the open elements, outermost first
+        self.element_path = []
 
         # validate input file
         self._validate_file(self.filename)
@@ -117,8 +212,9 @@ class AbstractsXmlLoader(Loader, ContentHandler):
         self.pmid_base_url = self.config.PERMALINK_URL
 
     def _read_file(self):
-        return self.filename
+        return self._open_file()
 
+    @instrumentation.instrument("parse", count=len)
     def load_(self, as_, limit=None):
         """load input data file into a format specified. supports pandas dataframe
            Parameters:
@@ -129,7 +225,8 @@ class AbstractsXmlLoader(Loader, ContentHandler):
             :rtype dict"""
 
         # parse the input xml file
-        parse(self._read_file(), self)
+        with self._read_file() as file:
+            parse(file, self)
 
         # parsing complete. return the collated data
         if as_ == "dataframe":
@@ -138,7 +235,7 @@ class AbstractsXmlLoader(Loader, ContentHandler):
             return self.data_dict
 
     def _get_content(self):
-        content = " ".join(self.char_buffer).strip()
+        content = "".join(self.char_buffer).strip()
         self.char_buffer = []
         return content
 
@@ -153,6 +250,7 @@ class AbstractsXmlLoader(Loader, ContentHandler):
         logging.info("Begin XML file parsing")
 
     def endElement(self, name):
+        self.element_path.pop()
         try:
             if name == "PubmedArticle":
                 # if the 'content' is missing, make 'title' of the document its 'content'. delete the document if both
@@ -168,7 +266,9 @@ class AbstractsXmlLoader(Loader, ContentHandler):
             elif name == "Abstract":
                 self.data_dict[self.data_index]['content'] = self._get_content()
             elif name == "PMID":
-                self.data_dict[self.data_index]['permalink'] = self._get_content()
+                # PMID of the citation itself; PMIDs of other elements(e.g. CommentsCorrections) are ignored
+                if self.element_path[-1:] == ["MedlineCitation"]:
+                    self.data_dict[self.data_index]['permalink'] = self._get_content()
             elif name == "DateCreated":
                 pass
             else:
@@ -177,6 +277,7 @@ class AbstractsXmlLoader(Loader, ContentHandler):
             logging.warning("Invalid xml element - end tag missing")
 
     def startElement(self, name, attrs):
+        self.element_path.append(name)
         if name == "PubmedArticle":
             self.data_index += 1
             self.data_dict[self.data_index] = {}
@@ -190,12 +291,242 @@ class AbstractsXmlLoader(Loader, ContentHandler):
         self.char_buffer.append(content)
 
 
+class AbstractsXmlStreamLoader(Loader):
+    """load PubMed abstracts from .xml file without SAX callbacks. input file is read in fixed size chunks and split on
+    PubmedArticle boundaries; only the PMID, ArticleTitle and Abstract elements of each article are parsed into
+    (small) element trees and each article is discarded once its document is extracted. produces the same documents as
+    AbstractsXmlLoader"""
+
+    article_start = re.compile(b"<PubmedArticle[\\s>]")
+    article_end = b"</PubmedArticle>"
+    citation_start = re.compile(b"<MedlineCitation[\\s>]")
+    element_patterns = {name: re.compile(b"<" + name.encode() + b"[\\s>]")
+                        for name in ("PMID", "ArticleTitle", "Abstract")}
+
+    def __init__(self, filename, config, parser=input_parser.DefaultParser(), chunk_size=4*1024*1024):
+        super(AbstractsXmlStreamLoader, self).__init__(config)
+        self.filename = filename
+        self.config = config
+        self.data_parser = parser
+        self.chunk_size = chunk_size
+        self.num_docs_read = 0
+        self.trailer = b""
+
+        # validate input file
+        self._validate_file(self.filename)
+
+    def _read_file(self):
+        """read input file and return 1 PubmedArticle element(as bytes) at a time"""
+
+        buffer = b""
+        with self._open_file() as file:
+            while True:
+                data = file.read(self.chunk_size)
+                buffer += data
+                position = 0
+                while True:
+                    match = self.article_start.search(buffer, position)
+                    if not match:
+                        break
+                    start = match.start()
+                    end = buffer.find(self.article_end, start)
+                    if end < 0:
+                        break
+                    position = end + len(self.article_end)
+                    yield buffer[start:position]
+                buffer = buffer[position:]
+                if not data:
+                    break
+        # whatever follows the last article(e.g. DeleteCitation of update files)
+        self.trailer = buffer
+
+    @instrumentation.instrument("parse", count=len)
+    def load_(self, as_, limit=None):
+        """load input data file into a format specified. supports pandas dataframe
+           Parameters:
+                as_: data structure to load data into.
+               limit: # of data items to be loaded. default = None
+
+            :rtype pandas.Dataframe
+            :rtype dict"""
+
+        data_dict = {}
+        for data_index, document in self.iter_documents():
+            data_dict[data_index] = document
+            if limit and len(data_dict) >= limit:
+                break
+
+        # parsing complete. return the collated data
+        if as_ == "dataframe":
+            return pandas.DataFrame.from_dict(data_dict, orient='index')
+        else:
+            return data_dict
+
+    def iter_documents(self, skip=0):
+        """parse the input file one PubmedArticle at a time
+
+            input:
+                :parameter skip: # of leading articles to pass over without parsing them(e.g. articles already saved
+                                 to temp files by an interrupted run). default - 0
+            output:
+                :returns generator of <article index, document dict> tuples. article index counts every PubmedArticle
+                         in the file, including the ones skipped for lack of title and abstract
+                :rtype generator"""
+
+        logging.info("Begin XML file parsing")
+        self.num_docs_read = 0
+        for article in self._read_file():
+            self.num_docs_read += 1
+            if self.num_docs_read <= skip:
+                continue
+            document = self._extract_document(article)
+            if document:
+                yield self.num_docs_read - 1, document
+        logging.info("XML file parsing complete. read {0} documents".format(self.num_docs_read))
+
+    def iter_documents_from(self, data):
+        """parse PubmedArticle elements of an in-memory xml document(e.g. a request body) instead of the input file.
+        articles skipped for lack of title and abstract are not yielded
+
+            input:
+                :parameter data: xml document as bytes
+            output:
+                :returns generator of document dicts
+                :rtype generator"""
+
+        position = 0
+        while True:
+            match = self.article_start.search(data, position)
+            if not match:
+                break
+            start = match.start()
+            end = data.find(self.article_end, start)
+            if end < 0:
+                break
+            position = end + len(self.article_end)
+            document = self._extract_document(data[start:position])
+            if document:
+                yield document
+
+    def _get_content(self, article, name, position=0):
+        """extract text of the first element with given name from a PubmedArticle
+
+            input:
+                :parameter article: PubmedArticle element as bytes
+                :parameter name: element name - PMID, ArticleTitle or Abstract
+                :parameter position: offset in article to start searching from. default - 0
+            output:
+                :returns text of the element including text of its sub elements. None if element is missing
+                :rtype str"""
+
+        match = self.element_patterns[name].search(article, position)
+        if not match:
+            return None
+        end_tag = b"</" + name.encode() + b">"
+        end = article.find(end_tag, match.start())
+        if end < 0:
+            return None
+        fragment = article[match.start():end + len(end_tag)]
+        try:
+            return "".join(fromstring(fragment).itertext()).strip()
+        except ParseError:
+            # e.g. namespace prefix declared outside of the fragment; drop the markup and keep the text
+            return unescape(re.sub(b"<[^>]+>", b"", fragment).decode('utf-8')).strip()
+
+    def _get_pmid(self, article):
+        """extract the PMID of the citation - the PMID child of MedlineCitation, which is its first child element. PMIDs
+        of other elements(e.g. CommentsCorrections) are ignored, as in AbstractsXmlLoader
+
+            input:
+                :parameter article: PubmedArticle element as bytes
+            output:
+                :returns PMID. None if MedlineCitation or its PMID is missing
+                :rtype str"""
+
+        match = self.citation_start.search(article)
+        if not match:
+            return None
+        children = article.find(b">", match.start()) + 1
+        pmid = self.element_patterns["PMID"].search(article, children)
+        if not pmid or article[children:pmid.start()].strip():
+            return None
+        return self._get_content(article, "PMID", position=pmid.start())
+
+    def _extract_document(self, article):
+        """extract permalink, title and content of a PubmedArticle. mirrors AbstractsXmlLoader: if either the abstract
+        or the PMID is missing, title is used as content; article is skipped if title is missing as well
+
+            input:
+                :parameter article: PubmedArticle element as bytes
+            output:
+                :returns document dict. empty if article must be skipped
+                :rtype dict"""
+
+        document = {}
+        pmid = self._get_pmid(article)
+        if pmid is not None:
+            document['permalink'] = pmid
+        for key, name in (('title', "ArticleTitle"), ('content', "Abstract")):
+            text = self._get_content(article, name)
+            if text is not None:
+                document[key] = text
+        if 'content' not in document or 'permalink' not in document:
+            if 'title' not in document:
+                return {}
+            document['content'] = document['title']
+        return document
+
+
+class AbstractsXmlUpdateLoader(AbstractsXmlStreamLoader):
+    """load a PubMed update file(updatefiles). new and revised citations are PubmedArticle elements, same as in
+    baseline files; PMIDs of deleted citations are listed in a DeleteCitation element that follows the last article"""
+
+    delete_start = b"<DeleteCitation>"
+    delete_end = b"</DeleteCitation>"
+    pmid_pattern = re.compile(rb"<PMID[^>]*>\s*(\d+)\s*</PMID>")
+
+    def deleted_pmids(self):
+        """PMIDs of deleted citations. available once all documents have been read(see iter_documents)
+
+            :rtype list
+            :raises ValueError"""
+
+        start = self.trailer.find(self.delete_start)
+        if start < 0:
+            return []
+        end = self.trailer.find(self.delete_end, start)
+        if end < 0:
+            raise ValueError("incomplete DeleteCitation element in {0}".format(self.filename))
+        return [pmid.decode('ascii') for pmid in self.pmid_pattern.findall(self.trailer[start:end])]
+
+
+def get_xml_loader(filename, config, parser=input_parser.DefaultParser()):
+    """create a loader for .xml input based on the xml parser engine set in config - sax or stream
+
+        input:
+            :parameter filename: fully qualified path of input file
+            :parameter config: Config object
+            :parameter parser: input data parser
+        output:
+            :returns AbstractsXmlLoader or AbstractsXmlStreamLoader object
+            :raises ValueError"""
+
+    if config.XML_PARSER == "sax":
+        return AbstractsXmlLoader(filename, config=config, parser=parser)
+    elif config.XML_PARSER == "stream":
+        return AbstractsXmlStreamLoader(filename, config=config, parser=parser)
+    else:
+        raise ValueError("unsupported xml parser engine. value must be one of sax, stream")
+
+
 class AbstractsXmlSplitLoader(AbstractsXmlLoader):
-    """parse PubMed input .xml file but pickle subsets of extracted data in a temporary folder.
+    """parse PubMed input .xml file but save subsets of extracted data in a temporary folder.
        parsing of input file can be skipped if pre-processed temporary files are available.
+       with a run manifest(see utils.run_manifest), every temp file is recorded with its checksum once written; a
+       resumed run keeps the verified temp files and continues parsing after the last article they cover.
        extends AbstractsXmlLoader"""
 
-    def __init__(self, filename, config, threshold=100000, use_temp_files=False, num_docs=0):
+    def __init__(self, filename, config, threshold=100000, use_temp_files=False, num_docs=0, run_manifest=None):
         super(AbstractsXmlSplitLoader, self).__init__(filename, config)
 
         self.use_temp_files = use_temp_files
@@ -206,6 +537,9 @@ class AbstractsXmlSplitLoader(AbstractsXmlLoader):
         self.temp_file_basename = "filepart."
         self.filepart = 1
         self.num_docs_processed = num_docs
+        self.run_manifest = run_manifest
+        # index of the last article saved to a temp file by an interrupted run; articles up to it are not saved again
+        self.resume_index = -1
 
     def endDocument(self):
         logging.info("XML file parsing complete")
@@ -215,6 +549,10 @@ class AbstractsXmlSplitLoader(AbstractsXmlLoader):
     def endElement(self, name):
         super(AbstractsXmlSplitLoader, self).endElement(name)
         if name == "PubmedArticle":
+            if self.data_index <= self.resume_index:
+                # saved to a temp file by the interrupted run
+                self.data_dict.pop(self.data_index, None)
+                return
             self._check_and_save_temporary_file()
             self.num_docs_processed += 1
 
@@ -223,6 +561,7 @@ class AbstractsXmlSplitLoader(AbstractsXmlLoader):
         if name == "PubmedArticle":
             self.num_docs_read += 1
 
+    @instrumentation.instrument("parse", count=lambda result: result[0])
     def load_(self, as_, limit=None):
         """load input data file into a specified format. Skips loading input file if use_temp_files flag is set to True
            and pre-processed temporary files are available
@@ -240,36 +579,115 @@ class AbstractsXmlSplitLoader(AbstractsXmlLoader):
             # check if use_temp_files flag is set
             if self.use_temp_files:
                 # check if non-empty temp directory exists
-                if os.path.lexists(self.temp_files_dir) and len(os.listdir(self.temp_files_dir)) > 0:
+                temp_files = _existing_temp_files(self.temp_files_dir, self.temp_file_basename)
+                if temp_files:
                     logging.info("non-empty temp directory found. returning temp files for processing")
-                    return self.num_docs_processed, [self.temp_files_dir + file for file in
-                                                     os.listdir(self.temp_files_dir)]
+                    return self.num_docs_processed, temp_files
                 else:
                     if self.filename == "NA":
                         logging.error("temp directory missing & input file is set to NA. processing aborted")
                     else:
                         logging.info("temp directory missing. ignoring use_temp_files flag and loading source file")
 
+            if self.run_manifest is not None and self.run_manifest.resuming:
+                shards = self.run_manifest.verified_shards()
+                if self.run_manifest.parse_complete:
+                    logging.info("all temp files of the run are complete. skipping input file parsing")
+                    return self.run_manifest.num_docs_processed, [entry['file'] for entry in shards]
+                self._resume_from(shards)
+
             # parse the input xml file
-            parse(self._read_file(), self)
+            self._parse()
             logging.info("total docs processed: {0}".format(self.num_docs_processed))
+            if self.run_manifest is not None:
+                self.run_manifest.complete_parse(self.num_docs_processed)
             return self.num_docs_processed, self.temp_filenames
 
+    def _resume_from(self, shards):
+        """continue splitting after the temp files of an interrupted run; files written after the last verified one
+        (partial or unrecorded) are removed"""
+
+        self.temp_filenames = [entry['file'] for entry in shards]
+        self.filepart = len(shards) + 1
+        if shards:
+            self.resume_index = shards[-1]['last_index']
+            self.num_docs_processed += self.resume_index + 1
+        for filename in os.listdir(self.temp_files_dir) if os.path.isdir(self.temp_files_dir) else []:
+            filename = self.temp_files_dir + filename
+            if filename.startswith(self.temp_files_dir + self.temp_file_basename) and \
+                    filename not in self.temp_filenames:
+                os.remove(filename)
+        logging.info("resuming input file parsing after article {0}; {1} temp files kept".format(
+            self.resume_index, len(shards)))
+
+    def manifest(self):
+        """manifest(see Loader.manifest) of the temp files if they would be used, of the input file otherwise"""
+
+        temp_files = _existing_temp_files(self.temp_files_dir, self.temp_file_basename) if self.use_temp_files else []
+        if temp_files:
+            return _file_manifest(temp_files)
+        return super(AbstractsXmlSplitLoader, self).manifest()
+
+    def input_manifest(self):
+        """manifest(see Loader.manifest) of the input file, whether or not temp files would be used"""
+
+        return super(AbstractsXmlSplitLoader, self).manifest()
+
+    def _parse(self):
+        """parse input file with the xml parser engine set in config. documents extracted by the stream engine go
+        through the same temporary file bookkeeping as the SAX callbacks"""
+
+        if self.config.XML_PARSER != "stream":
+            with self._read_file() as file:
+                parse(file, self)
+            return
+
+        stream_loader = AbstractsXmlStreamLoader(self.filename, self.config)
+        for self.data_index, document in stream_loader.iter_documents(skip=self.resume_index + 1):
+            self.data_dict[self.data_index] = document
+            self._check_and_save_temporary_file()
+            self.num_docs_processed += 1
+        self.num_docs_read += stream_loader.num_docs_read
+        self.endDocument()
+
     def _check_and_save_temporary_file(self, eof=False):
-        """ check if # documents read is a multiple of 'threshold'; if so, pickle the data read so far and flush holding
-        data structures"""
+        """ check if # documents read is a multiple of 'threshold'; if so, save the data read so far to a temporary
+        file(in the format set in config) and flush holding data structures"""
 
         if eof or self.data_index >= (self.filepart * self.threshold):
-            # threshold reached - pickle in-memory data and flush data structures
+            # threshold reached - save in-memory data and flush data structures
             logging.info("threshold reached. saving data to temporary file")
             full_filename = self.temp_files_dir + self.temp_file_basename + str(self.filepart)
             try:
-                with open(full_filename, 'wb') as filehandle:
-                    pickle.dump(self.data_dict, filehandle)
-                    self.filepart += 1
-                    self.temp_filenames.append(full_filename)
+                shard.write_shard(full_filename, self.data_dict, shard_format=self.config.TEMP_FILE_FORMAT)
+                self.filepart += 1
+                self.temp_filenames.append(full_filename)
+                if self.run_manifest is not None:
+                    self.run_manifest.add_shard(full_filename, len(self.data_dict), self.data_index)
             except IOError:
                 logging.error("unable to save temporary data file")
 
             # flush data structures
             self.data_dict.clear()
+
+
+def _existing_temp_files(temp_files_dir, temp_file_basename):
+    """complete temp files in the temp directory, in file part order. partially written files(.tmp) and other files
+    are ignored"""
+
+    if not os.path.isdir(temp_files_dir):
+        return []
+    parts = []
+    for file in os.listdir(temp_files_dir):
+        part = file[len(temp_file_basename):]
+        if file.startswith(temp_file_basename) and part.isdigit():
+            parts.append(int(part))
+    return [temp_files_dir + temp_file_basename + str(part) for part in sorted(parts)]
+
+
+def _file_manifest(filenames):
+    manifest = []
+    for filename in sorted(filenames):
+        stat = os.stat(filename)
+        manifest.append((os.path.abspath(filename), stat.st_size, stat.st_mtime_ns))
+    return manifest
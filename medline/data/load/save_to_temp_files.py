@@ -1,22 +1,50 @@
 # author: Ramji Chandrasekaran
 # date: 15-02-2017
-# load source data and save it in a pickled intermediate data structure
+# load source data and save it in an intermediate data structure(temporary files)
 
-import pickle
 import argparse
 import os
+import time
+import logging
 import configparser
+from multiprocessing import Pool
 
-from medline.data.load import loader
+from medline.data.load import loader, shard
 from medline.utils import input_parser
 from medline.utils.configuration import Config
 
 
+def _serialize_file(task):
+    """parse a single input file and save its contents to a pre-assigned temporary file. runs in a worker process
+    when parallel ingest is enabled, hence a module level function
+        input:
+            :parameter task: tuple of <input filename, output filename, input format>
+        output:
+            :returns tuple of <worker pid, output filename, # documents, elapsed seconds>
+            :rtype tuple"""
+
+    input_file, output_file, in_format = task
+    start_time = time.time()
+    config = Config(None)
+    if in_format == "xml":
+        data_loader = loader.get_xml_loader(input_file, config=config)
+    else:
+        # input files are already spread across worker processes
+        data_loader = loader.AbstractsTextLoader(input_file, config=config, parser=input_parser.AbstractsParser(),
+                                                 workers=1)
+    loaded_data = data_loader.load_(as_="dict")
+    shard.write_shard(output_file, loaded_data, shard_format=config.TEMP_FILE_FORMAT)
+    return os.getpid(), output_file, len(loaded_data), time.time() - start_time
+
+
 class Serializer:
-    """used to load large data-sets into a python dict or other data structure, which is then pickled.
-    run this script before repeated analyses of large data-sets, if long XML loading times are to be avoided"""
+    """used to load large data-sets into a python dict or other data structure, which is then saved to temporary files
+    (columnar or pickled, see temp.file.format in default.cfg).
+    run this script before repeated analyses of large data-sets, if long XML loading times are to be avoided.
+    input files can be spread across a pool of worker processes; temp file names are assigned before parsing begins
+    so that they do not depend on the order in which workers finish"""
 
-    def __init__(self, input_path, in_format):
+    def __init__(self, input_path, in_format, workers=None):
         if not os.path.isdir(input_path):
             raise ValueError("invalid input_path. not a directory")
 
@@ -27,11 +55,32 @@ class Serializer:
         self.format = in_format
         self.output_path = self.cfg_mgr.get('input', 'temp.data.directory')
         self.filepart_index = 1
+        if workers is None:
+            workers = int(self.cfg_mgr.get('input', 'ingest.process.count'))
+        if workers < 1:
+            raise ValueError("invalid # of workers. must be a positive integer")
+        self.workers = workers
+        self.worker_stats = {}
 
     def _load_config(self):
         self.cfg_mgr.read(os.path.abspath(os.path.join(self.script_dir, "../..", "config",
                                                        "default.cfg")))
 
+    def _create_tasks(self):
+        """assign a temp file to every input file. input files are sorted by name, so a given input file is always
+        written to the same temp file and filepart_index numbering is identical for sequential and parallel runs
+
+            :returns list of <input filename, output filename, input format> tuples
+            :rtype list"""
+
+        tasks = []
+        for input_file in sorted(os.listdir(self.input_path)):
+            full_filename = self.input_path + input_file
+            output_file = self.output_path + "pubmed_tempfile" + str(self.filepart_index)
+            tasks.append((full_filename, output_file, self.format))
+            self.filepart_index += 1
+        return tasks
+
     def create_temp_files(self):
         """parse all input files and create temporary files
 
@@ -39,28 +88,45 @@ class Serializer:
             input: None
             output: None
         temporary files are stored in temp directory specified in default.cfg file"""
-        for input_file in os.listdir(self.input_path):
-            full_filename = self.input_path + input_file
-            print(full_filename)
-            if self.format == "xml":
-                data_loader = loader.AbstractsXmlLoader(full_filename, config=Config(None))
-            else:
-                data_loader = loader.AbstractsTextLoader(full_filename, input_parser.AbstractsParser())
-            loaded_data = data_loader.load_(as_="dict")
-            output_file = self.output_path + "pubmed_tempfile" + str(self.filepart_index)
-            with open(output_file, 'wb') as filehandle:
-                pickle.dump(loaded_data, filehandle)
-            self.filepart_index += 1
+
+        tasks = self._create_tasks()
+        if self.workers == 1:
+            results = map(_serialize_file, tasks)
+            self._collect_results(results)
+        else:
+            with Pool(processes=self.workers) as pool:
+                self._collect_results(pool.imap_unordered(_serialize_file, tasks))
+        self._report_worker_stats()
+
+    def _collect_results(self, results):
+        """accumulate per-worker document counts and parse times as files complete"""
+
+        for pid, output_file, num_docs, elapsed in results:
+            print("{0} - {1} docs in {2:.1f}s".format(output_file, num_docs, elapsed))
+            docs, seconds = self.worker_stats.get(pid, (0, 0.0))
+            self.worker_stats[pid] = (docs + num_docs, seconds + elapsed)
+
+    def _report_worker_stats(self):
+        """print and log documents/sec throughput of each worker process"""
+
+        for pid, (docs, seconds) in sorted(self.worker_stats.items()):
+            rate = docs / seconds if seconds else 0.0
+            message = "worker {0}: {1} docs in {2:.1f}s ({3:.1f} docs/sec)".format(pid, docs, seconds, rate)
+            logging.info(message)
+            print(message)
 
 
 if __name__ == "__main__":
-    arg_parser = argparse.ArgumentParser(usage="save_to_temp_files.py input_path -i input_format",
+    arg_parser = argparse.ArgumentParser(usage="save_to_temp_files.py input_path -i input_format [--workers #]",
                                          description="create temporary files by loading input data-set to python dict "
-                                                     "and pickle them")
+                                                     "and saving them")
     arg_parser.add_argument("input_path", help="fully qualified path of directory where input files are stored")
     arg_parser.add_argument("-i", required=True, choices=["xml", "txt"], help="format of input file")
+    arg_parser.add_argument("--workers", type=int, default=None,
+                            help="# of worker processes used to parse input files. default: ingest.process.count "
+                                 "in default.cfg")
 
     args = arg_parser.parse_args()
 
-    data_serializer = Serializer(args.input_path, args.i)
+    data_serializer = Serializer(args.input_path, args.i, workers=args.workers)
     data_serializer.create_temp_files()
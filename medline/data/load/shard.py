@@ -0,0 +1,225 @@
+# date: 17-Oct-2026
+# read and write temporary data files(shards). a shard is either a pickled {index: {'title', 'content', 'permalink'}}
+# dict or a columnar file with PMIDs stored as an integer array and title/content as compressed text columns
+
+import json
+import os
+import pickle
+import struct
+import zlib
+
+import numpy
+
+SHARD_COLUMNS = ('permalink', 'title', 'content')
+TEXT_COLUMNS = ('title', 'content')
+
+# columnar shard layout:
+#   magic | header length(uint32) | json header | column blocks
+# json header holds # documents and <offset, length> of every column block relative to the end of the header.
+# permalink block: int64 PMIDs(-1 if missing). text blocks: uint32 byte length of every document followed by the
+# zlib compressed utf-8 text of all documents
+MAGIC = b"MLSHARD1"
+_HEADER_LENGTH = struct.Struct("<I")
+_MISSING_PMID = -1
+
+# shards are written to <filename><TEMP_SUFFIX> and renamed into place once complete, so a shard file is never partial
+TEMP_SUFFIX = ".tmp"
+
+
+class ShardWriter:
+    """write documents to a columnar shard file"""
+
+    def __init__(self, filename, compression_level=6):
+        self.filename = filename
+        self.compression_level = compression_level
+
+    def write(self, documents):
+        """write documents to shard file. a missing title or content is stored as an empty string
+
+            input:
+                :parameter documents: iterable of document dicts with keys permalink, title, content
+            output:
+                :returns # documents written
+                :rtype int
+                :raises ValueError"""
+
+        pmids = []
+        texts = {column: [] for column in TEXT_COLUMNS}
+        for document in documents:
+            pmids.append(self._to_pmid(document.get('permalink')))
+            for column in TEXT_COLUMNS:
+                texts[column].append((document.get(column) or "").encode('utf-8'))
+
+        blocks = [('permalink', numpy.asarray(pmids, dtype='<i8').tobytes())]
+        for column in TEXT_COLUMNS:
+            lengths = numpy.asarray([len(text) for text in texts[column]], dtype='<u4').tobytes()
+            blocks.append((column, lengths + zlib.compress(b"".join(texts[column]), self.compression_level)))
+
+        header = {'num_docs': len(pmids), 'columns': {}}
+        offset = 0
+        for column, block in blocks:
+            header['columns'][column] = [offset, len(block)]
+            offset += len(block)
+        header_bytes = json.dumps(header).encode('utf-8')
+
+        with _AtomicFile(self.filename) as filehandle:
+            filehandle.write(MAGIC)
+            filehandle.write(_HEADER_LENGTH.pack(len(header_bytes)))
+            filehandle.write(header_bytes)
+            for _, block in blocks:
+                filehandle.write(block)
+        return len(pmids)
+
+    @staticmethod
+    def _to_pmid(permalink):
+        if permalink is None or permalink == "":
+            return _MISSING_PMID
+        try:
+            return int(permalink)
+        except ValueError:
+            raise ValueError("non-numeric PMID {0!r} can not be stored in a columnar shard".format(permalink))
+
+
+class ShardReader:
+    """read a columnar shard file. only the header is read on instantiation; columns are read on request"""
+
+    def __init__(self, filename):
+        self.filename = filename
+        with open(self.filename, 'rb') as filehandle:
+            if filehandle.read(len(MAGIC)) != MAGIC:
+                raise ValueError("{0} is not a columnar shard file".format(filename))
+            header_length = _HEADER_LENGTH.unpack(filehandle.read(_HEADER_LENGTH.size))[0]
+            header = json.loads(filehandle.read(header_length).decode('utf-8'))
+        self.num_docs = header['num_docs']
+        self.columns = header['columns']
+        self._data_offset = len(MAGIC) + _HEADER_LENGTH.size + header_length
+
+    def __len__(self):
+        return self.num_docs
+
+    def read(self, columns=SHARD_COLUMNS):
+        """read selected columns of the shard
+
+            input:
+                :parameter columns: names of columns to be read - any of permalink, title, content
+            output:
+                :returns dict of column name -> values. permalink is a numpy int64 array, text columns are lists of str
+                :rtype dict"""
+
+        data = {}
+        with open(self.filename, 'rb') as filehandle:
+            for column in columns:
+                offset, length = self.columns[column]
+                filehandle.seek(self._data_offset + offset)
+                block = filehandle.read(length)
+                if column == 'permalink':
+                    data[column] = numpy.frombuffer(block, dtype='<i8')
+                else:
+                    data[column] = self._decode_text(block)
+        return data
+
+    def _decode_text(self, block):
+        lengths_size = 4 * self.num_docs
+        lengths = numpy.frombuffer(block[:lengths_size], dtype='<u4')
+        text = zlib.decompress(block[lengths_size:])
+        ends = numpy.cumsum(lengths, dtype=numpy.int64).tolist()
+        starts = [0] + ends[:-1]
+        return [text[start:end].decode('utf-8') for start, end in zip(starts, ends)]
+
+    def iter_documents(self, columns=('permalink', 'content')):
+        """yield one tuple of values(in the order of columns) per document. permalink is returned as str, None if
+        missing - same as pickled shards"""
+
+        data = self.read(columns)
+        values = []
+        for column in columns:
+            if column == 'permalink':
+                values.append([str(pmid) if pmid != _MISSING_PMID else None for pmid in data[column].tolist()])
+            else:
+                values.append(data[column])
+        return zip(*values)
+
+
+class PickledShardReader:
+    """read a pickled {index: document} shard file through the same interface as ShardReader"""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._documents = None
+
+    def _load(self):
+        if self._documents is None:
+            with open(self.filename, 'rb') as filehandle:
+                self._documents = list(pickle.load(filehandle).values())
+        return self._documents
+
+    def __len__(self):
+        return len(self._load())
+
+    def read(self, columns=SHARD_COLUMNS):
+        data = {}
+        for column in columns:
+            if column == 'permalink':
+                data[column] = numpy.asarray([ShardWriter._to_pmid(document.get(column))
+                                              for document in self._load()], dtype='<i8')
+            else:
+                data[column] = [document.get(column) or "" for document in self._load()]
+        return data
+
+    def iter_documents(self, columns=('permalink', 'content')):
+        return (tuple(document.get(column) for column in columns) for document in self._load())
+
+
+def is_columnar(filename):
+    with open(filename, 'rb') as filehandle:
+        return filehandle.read(len(MAGIC)) == MAGIC
+
+
+def open_shard(filename):
+    """return a reader for a shard file, columnar or pickled
+
+        :rtype ShardReader
+        :rtype PickledShardReader"""
+
+    if is_columnar(filename):
+        return ShardReader(filename)
+    return PickledShardReader(filename)
+
+
+def write_shard(filename, data_dict, shard_format="columnar"):
+    """write a {index: document} dict to a shard file
+
+        input:
+            :parameter filename: fully qualified name of shard file
+            :parameter data_dict: dict of index -> document dict
+            :parameter shard_format: columnar or pickle
+        output:
+            :raises ValueError"""
+
+    if shard_format == "columnar":
+        ShardWriter(filename).write(data_dict.values())
+    elif shard_format == "pickle":
+        with _AtomicFile(filename) as filehandle:
+            pickle.dump(data_dict, filehandle)
+    else:
+        raise ValueError("unsupported temp file format. value must be one of columnar, pickle")
+
+
+class _AtomicFile:
+    """binary file handle on <filename><TEMP_SUFFIX>; renamed to filename on successful close, removed on error"""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.temp_filename = filename + TEMP_SUFFIX
+        self.filehandle = None
+
+    def __enter__(self):
+        self.filehandle = open(self.temp_filename, 'wb')
+        return self.filehandle
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.filehandle.close()
+        if exc_type is None:
+            os.replace(self.temp_filename, self.filename)
+        else:
+            os.remove(self.temp_filename)
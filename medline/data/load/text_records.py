@@ -0,0 +1,185 @@
+# date: 17-Oct-2026
+# split PubMed abstract text files into records on PMID line boundaries in 1 pass over a memory map of the file, and
+# parse batches of records in worker processes
+
+import collections
+import contextlib
+import mmap
+import re
+from multiprocessing import Pool
+
+from medline.data.load import compressed
+
+# a record ends at the line that starts with PMID; the PMID line itself is not part of any record
+PMID_LINE = b"\nPMID"
+
+# runs of empty lines after the first line of a record; each run is replaced by the record separator
+BLANK_LINES = re.compile(rb"\n\n+")
+
+# buffers of input files mapped by the current(worker) process
+_buffers = {}
+
+
+@contextlib.contextmanager
+def open_buffer(filename, threaded=True):
+    """contents of an input file as a read-only buffer. plain files are memory mapped; compressed files are
+    decompressed into memory. line endings are normalized to \\n, as they are when the file is read in text mode
+
+        input:
+            :parameter filename: fully qualified path of input file
+            :parameter threaded: flag to decompress in a background thread(see compressed.open_input)
+        output:
+            :returns mmap or bytes
+            :rtype contextmanager"""
+
+    if compressed.compression_suffix(filename):
+        with compressed.open_input(filename, threaded=threaded) as file:
+            yield _normalize_newlines(file.read())
+        return
+    with open(filename, 'rb') as file:
+        try:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty file can not be mapped
+            yield b""
+            return
+    try:
+        if buffer.find(b"\r") < 0:
+            yield buffer
+        else:
+            yield _normalize_newlines(buffer[:])
+    finally:
+        buffer.close()
+
+
+def _normalize_newlines(data):
+    if data.find(b"\r") < 0:
+        return data
+    return data.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+
+
+def record_spans(buffer):
+    """<start, end> byte offsets of records. a record is the text between 2 lines that start with PMID(or the text
+    before the first such line); text after the last PMID line is not a record
+
+        :rtype generator"""
+
+    start = 0
+    line_start = 0 if buffer[:len(PMID_LINE) - 1] == PMID_LINE[1:] else _next_pmid_line(buffer, 0)
+    while line_start >= 0:
+        yield start, line_start
+        end_of_line = buffer.find(b"\n", line_start)
+        if end_of_line < 0:
+            return
+        start = end_of_line + 1
+        line_start = _next_pmid_line(buffer, end_of_line)
+
+
+def _next_pmid_line(buffer, position):
+    """offset of the first PMID line that starts after position; -1 if there is none"""
+
+    position = buffer.find(PMID_LINE, position)
+    return position + 1 if position >= 0 else -1
+
+
+def collate(data, record_sep, encoding='utf-8'):
+    """record text with every run of empty lines replaced by record_sep
+
+        input:
+            :parameter data: record as bytes, see record_spans
+            :parameter record_sep: separator of record sections
+            :parameter encoding: encoding of input file
+        output:
+            :rtype str"""
+
+    separator = record_sep.encode(encoding)
+    # an empty first line starts a run as well
+    text = data.lstrip(b"\n")
+    prefix = separator if len(text) < len(data) else b""
+    return (prefix + BLANK_LINES.sub(b"\n" + separator.replace(b"\\", b"\\\\"), text)).decode(encoding)
+
+
+def parse_records(buffer, spans, record_sep, parser):
+    """collate and parse records of a buffer
+
+        input:
+            :parameter buffer: mmap or bytes
+            :parameter spans: list of <start, end> offsets of records in buffer
+            :parameter record_sep: separator of record sections
+            :parameter parser: InputParser object
+        output:
+            :returns parsed records, in the order of spans
+            :rtype list"""
+
+    return [parser.parse_(collate(buffer[start:end], record_sep)) for start, end in spans]
+
+
+def _parse_batch(task):
+    """parse a batch of records in a worker process. a batch refers to its records either by offsets in the input
+    file, which is mapped once per worker, or carries them as bytes(compressed input)
+        input:
+            :parameter task: tuple of <input filename or bytes, spans, record separator, parser>
+        output:
+            :returns parsed records
+            :rtype list"""
+
+    source, spans, record_sep, parser = task
+    if isinstance(source, bytes):
+        return parse_records(source, spans, record_sep, parser)
+    if source not in _buffers:
+        with open(source, 'rb') as file:
+            _buffers[source] = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    return parse_records(_buffers[source], spans, record_sep, parser)
+
+
+def iter_parsed(filename, buffer, record_sep, parser, workers=1, batch_size=2000):
+    """parse all records of an input file, in file order. with more than 1 worker, batches of batch_size records are
+    parsed in a pool of worker processes; at most 2 batches per worker are in flight, so memory use does not grow with
+    the size of the input file
+
+        input:
+            :parameter filename: fully qualified path of input file
+            :parameter buffer: contents of the input file, see open_buffer
+            :parameter record_sep: separator of record sections
+            :parameter parser: InputParser object; must be picklable if workers > 1
+            :parameter workers: # of worker processes
+            :parameter batch_size: # of records per batch
+        output:
+            :returns generator of parsed records
+            :rtype generator"""
+
+    if workers < 1 or batch_size < 1:
+        raise ValueError("invalid # of workers or batch size. must be positive integers")
+    batches = _batch_spans(record_spans(buffer), batch_size)
+    if workers == 1:
+        for spans in batches:
+            yield from parse_records(buffer, spans, record_sep, parser)
+        return
+
+    # mapped files are shared with workers through the file system; other buffers are sent batch by batch
+    mapped = isinstance(buffer, mmap.mmap)
+    with Pool(processes=workers) as pool:
+        pending = collections.deque()
+        for spans in batches:
+            if mapped:
+                task = (filename, spans, record_sep, parser)
+            else:
+                offset = spans[0][0]
+                task = (bytes(buffer[offset:spans[-1][1]]), [(start - offset, end - offset) for start, end in spans],
+                        record_sep, parser)
+            pending.append(pool.apply_async(_parse_batch, (task,)))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().get()
+        while pending:
+            yield from pending.popleft().get()
+
+
+def _batch_spans(spans, batch_size):
+    batch = []
+    for span in spans:
+        batch.append(span)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,50 @@
+# date: 17-Oct-2026
+# save and load a fitted model bundle - feature extractor, clustering model and reducer - so that new documents can be
+# assigned to existing clusters without re-clustering the corpus
+
+import os
+import pickle
+
+from medline.model import cluster
+
+BUNDLE_VERSION = 1
+
+
+def save_model(filename, feature_extractor, cluster_mgr):
+    """pickle a fitted feature extractor and clustering model to filename. the file is replaced atomically
+        input:
+            :parameter filename: fully qualified name of model file
+            :parameter feature_extractor: fitted FeatureExtractor
+            :parameter cluster_mgr: Cluster object with a fitted scikit-learn model
+        output:
+            :raises ValueError"""
+
+    if cluster_mgr.model is None or not hasattr(cluster_mgr.model, 'predict') or \
+            not hasattr(cluster_mgr.model, 'cluster_centers_'):
+        raise ValueError("only fitted scikit-learn k-means models can be saved")
+    bundle = {'version': BUNDLE_VERSION, 'feature_extractor': feature_extractor, 'model': cluster_mgr.model,
+              'svd': cluster_mgr.svd}
+    temp_filename = "{0}.tmp{1}".format(filename, os.getpid())
+    with open(temp_filename, 'wb') as filehandle:
+        pickle.dump(bundle, filehandle)
+    os.replace(temp_filename, filename)
+
+
+def load_model(filename, config):
+    """load a model bundle saved by save_model
+        input:
+            :parameter filename: fully qualified name of model file
+            :parameter config: Config object of the Cluster object to be returned
+        output:
+            :returns feature extractor and Cluster object holding the fitted model and reducer
+            :rtype tuple
+            :raises ValueError"""
+
+    with open(filename, 'rb') as filehandle:
+        bundle = pickle.load(filehandle)
+    if bundle.get('version') != BUNDLE_VERSION:
+        raise ValueError("unsupported model file version: {0}".format(bundle.get('version')))
+    cluster_mgr = cluster.Cluster(config=config)
+    cluster_mgr.model = bundle['model']
+    cluster_mgr.svd = bundle['svd']
+    return bundle['feature_extractor'], cluster_mgr
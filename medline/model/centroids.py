@@ -0,0 +1,87 @@
+# date: 17-Oct-2026
+# centroid arithmetic shared by the k-means implementations(cluster.SphericalKMeans and sharded_kmeans.ShardedKMeans)
+# - cosine assignment of rows to centroids, weighted per-cluster sums and their reduction, and normalization
+
+import numpy
+import scipy.sparse
+
+
+def row_norms(rows):
+    """L2 norm of each row of a sparse matrix or 2-d array"""
+
+    if scipy.sparse.issparse(rows):
+        return numpy.sqrt(numpy.asarray(rows.multiply(rows).sum(axis=1)).ravel())
+    return numpy.linalg.norm(rows, axis=1)
+
+
+def inverse_norms(norms):
+    """1 / norm of each row; 0 for all-zero rows, so they add nothing to cluster sums"""
+
+    norms = numpy.asarray(norms, dtype=numpy.float64)
+    return numpy.divide(1.0, norms, out=numpy.zeros_like(norms), where=norms > 0)
+
+
+def dot(rows, centers):
+    """rows x centers.T as a dense array"""
+
+    return numpy.asarray(rows @ centers.T)
+
+
+def nearest_by_cosine(rows, weights, centers):
+    """most similar centroid of each row
+        input:
+            :parameter rows: sparse matrix or 2-d array; rows need not be normalized
+            :parameter weights: inverse L2 norm of each row(see inverse_norms)
+            :parameter centers: (# clusters x # features) centroids of unit length
+        output:
+            :returns cluster ids and cosine similarity of each row to its centroid
+            :rtype tuple"""
+
+    similarities = dot(rows, centers) * weights[:, numpy.newaxis]
+    labels = similarities.argmax(axis=1).astype(numpy.int32)
+    return labels, similarities[numpy.arange(len(labels)), labels]
+
+
+def cluster_sums(rows, labels, weights, num_clusters):
+    """sum of the rows of each cluster, every row scaled by its weight(inverse norms sum up unit rows). sparse if rows
+    are sparse"""
+
+    indicator = scipy.sparse.csr_matrix((weights, (labels, numpy.arange(len(labels)))),
+                                        shape=(num_clusters, len(labels)))
+    return indicator @ rows
+
+
+def add_sums(sums, partial_sums):
+    """add cluster sums of a chunk or shard(see cluster_sums) to the dense sums in place"""
+
+    if scipy.sparse.issparse(partial_sums):
+        # add only the non-zero entries; a summed sparse matrix has no duplicate entries
+        partial_sums = partial_sums.tocoo()
+        sums[partial_sums.row, partial_sums.col] += partial_sums.data
+    else:
+        sums += partial_sums
+
+
+def normalized(vectors, dtype=numpy.float32):
+    """copy of dense vectors(e.g. cluster sums) with unit L2 norm; all-zero vectors stay zero"""
+
+    norms = numpy.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return (vectors / norms).astype(dtype)
+
+
+def normalized_rows(rows):
+    """float32 copy of the rows of a sparse matrix or 2-d array with unit L2 norm; all-zero rows stay zero"""
+
+    weights = inverse_norms(row_norms(rows)).astype(numpy.float32)[:, numpy.newaxis]
+    if scipy.sparse.issparse(rows):
+        return scipy.sparse.csr_matrix(scipy.sparse.csr_matrix(rows, dtype=numpy.float32).multiply(weights))
+    return numpy.asarray(rows, dtype=numpy.float32) * weights
+
+
+def dense(rows):
+    return rows.toarray() if scipy.sparse.issparse(rows) else numpy.asarray(rows)
+
+
+def stack(parts):
+    return scipy.sparse.vstack(parts, format='csr') if scipy.sparse.issparse(parts[0]) else numpy.vstack(parts)
@@ -0,0 +1,66 @@
+# date: 17-Oct-2026
+# assign raw abstracts or MEDLINE xml documents to the clusters of a saved model
+
+import numpy
+
+from medline.data.load import loader
+from medline.model.bundle import load_model
+
+
+class ClusterClassifier:
+    """predict-only wrapper around a model saved by pubmed.py --save-model. vectorizer, reducer and centroids are
+    loaded once; top terms of each cluster are computed once and returned as the label of every classified document"""
+
+    def __init__(self, model_file, config):
+        self.config = config
+        self.feature_extractor, self.cluster_mgr = load_model(model_file, config)
+        features = self.feature_extractor.get_features()
+        # hashing vectorizers keep no vocabulary; clusters can not be labelled with terms
+        if len(features):
+            self.cluster_terms = self.cluster_mgr.get_top_cluster_terms(features, num_terms=config.NTERMS)
+        else:
+            self.cluster_terms = [None] * len(self.cluster_mgr.model.cluster_centers_)
+        self.xml_loader = loader.AbstractsXmlStreamLoader("NA", config)
+
+    @property
+    def num_clusters(self):
+        return len(self.cluster_terms)
+
+    def predict(self, texts):
+        """cluster id of each document
+            input:
+                :parameter texts: list of raw documents(abstracts)
+            output:
+                :returns cluster ids
+                :rtype numpy.ndarray"""
+
+        if not len(texts):
+            return numpy.zeros(0, dtype=numpy.int32)
+        vectorized_data = self.feature_extractor.transform_text(texts)
+        if self.cluster_mgr.svd is not None:
+            vectorized_data = self.cluster_mgr.svd.transform(vectorized_data)
+        return self.cluster_mgr.model.predict(vectorized_data)
+
+    def classify(self, texts):
+        """cluster id and top cluster terms of each document
+
+            :returns 1 dict(cluster_id, terms) per document
+            :rtype list"""
+
+        return [{'cluster_id': int(cluster_id), 'terms': self.cluster_terms[cluster_id]}
+                for cluster_id in self.predict(texts)]
+
+    def classify_xml(self, data):
+        """classify the PubmedArticle elements of a MEDLINE xml document
+            input:
+                :parameter data: xml document as bytes
+            output:
+                :returns 1 dict(pmid, cluster_id, terms) per article; articles with neither title nor abstract are
+                         skipped
+                :rtype list"""
+
+        documents = list(self.xml_loader.iter_documents_from(data))
+        results = self.classify([document['content'] for document in documents])
+        for document, result in zip(documents, results):
+            result['pmid'] = document.get('permalink')
+        return results
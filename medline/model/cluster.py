@@ -2,20 +2,34 @@
 # date: 06-Feb-2017
 # cluster input data
 
-from sklearn.cluster import KMeans, MiniBatchKMeans
-from sklearn.decomposition import LatentDirichletAllocation
-import h2o
-from h2o.estimators import H2OKMeansEstimator
-from h2o.exceptions import H2OConnectionError
+from threadpoolctl import threadpool_limits
+import collections
+import concurrent.futures
 import logging
+import numpy
+
+from medline.model import centroids
+from medline.utils import instrumentation
+from medline.utils.registry import LazyModule
+
+# scikit-learn, the sharded k-means and the H2O modules are imported when a model is first fitted
+sklearn_cluster = LazyModule("sklearn.cluster")
+sklearn_decomposition = LazyModule("sklearn.decomposition")
+sharded_kmeans = LazyModule("medline.model.sharded_kmeans")
+h2o_bridge = LazyModule("medline.model.h2o_bridge")
+
+# values of clustering/kmeans.engine: euclidean - scikit-learn (mini-batch) k-means, spherical - SphericalKMeans
+KMEANS_ENGINES = ('euclidean', 'spherical')
 
 
 class Cluster:
 
-    """cluster input data using K-means, Minibatch-Kmeans or LDA. Input to clustering algorithms must be either
-    a Tf-Idf vector or a hashing vector. tuning parameters can be configured in default.cfg file."""
+    """cluster input data using K-means, Minibatch-Kmeans, spherical K-means or LDA. Input to clustering algorithms
+    must be either a Tf-Idf vector or a hashing vector. tuning parameters can be configured in default.cfg file."""
 
     def __init__(self, config):
+        if config.KMEANS_ENGINE not in KMEANS_ENGINES:
+            raise ValueError("unsupported k-means engine. value must be one of {0}".format(", ".join(KMEANS_ENGINES)))
         self.config = config
         self.model = None
         self.svd = None
@@ -23,6 +37,7 @@ class Cluster:
         # log_file = self.config.LOG_DIR + self.config.LOGFILE
         # logging.basicConfig(format='%(asctime)s::%(levelname)s::%(message)s', level=logging.INFO, filename=log_file)
 
+    @instrumentation.instrument("kmeans", count=instrumentation.num_rows)
     def do_kmeans(self, dataset):
         """vanilla k-means - Llyod's algorithm.
             Input:
@@ -32,17 +47,32 @@ class Cluster:
                 :returns labels_: a list of cluster identifiers - 1 per input document
                 :rtype list"""
 
-        # # normalization
-        # self.svd = TruncatedSVD(self.config.NCLUSTERS)
-        # normalizer = Normalizer(copy=False)
-        # lsa = make_pipeline(self.svd, normalizer)
-        # dataset = lsa.fit_transform(dataset)
+        # dimensionality reduction(LSA), if enabled, is done by model.reduction.Reducer before clustering
+        # scikit-learn parallelizes k-means with OpenMP threads; init.process.count caps them
+        self.model = sklearn_cluster.KMeans(n_clusters=self.config.NCLUSTERS, n_init=self.config.NINIT)
+        with threadpool_limits(limits=self.config.INIT_PCNT, user_api='openmp'):
+            self.model.fit_transform(dataset)
+        return self.model.labels_
+
+    @instrumentation.instrument("spherical_kmeans", count=instrumentation.num_rows)
+    def do_spherical_kmeans(self, dataset):
+        """k-means on cosine similarity(see SphericalKMeans). works on sparse rows directly - vectorized blocks are
+        read 1 block at a time and never stacked - as well as on reduced(dense) data
+            Input:
+                :parameter dataset: vectorized blocks(SparseBlocks), an in-memory term document matrix or reduced data
+
+            Output:
+                :returns labels_: cluster identifiers - 1 per input document
+                :rtype numpy.ndarray"""
 
-        # finish normalization,start k-means
-        self.model = KMeans(n_clusters=self.config.NCLUSTERS, n_init=self.config.NINIT, n_jobs=self.config.INIT_PCNT)
-        self.model.fit_transform(dataset)
+        self.model = SphericalKMeans(n_clusters=self.config.NCLUSTERS, max_iter=self.config.NITER,
+                                     n_init=self.config.NINIT, tol=self.config.SPHERICAL_TOL,
+                                     chunk_size=self.config.SPHERICAL_CHUNK, n_threads=self.config.INIT_PCNT,
+                                     verbose=self.config.VERBOSITY)
+        self.model.fit(dataset)
         return self.model.labels_
 
+    @instrumentation.instrument("minibatch_kmeans", count=instrumentation.num_rows)
     def do_minibatch_kmeans(self, dataset):
         """scalable version of k-means. used for large datasets. same input/output as k-means function
             Input:
@@ -52,11 +82,92 @@ class Cluster:
                 :returns labels_: a list of cluster identifiers - 1 per input document
                 :rtype list"""
 
-        self.model = MiniBatchKMeans(n_clusters=self.config.NCLUSTERS, n_init=self.config.NINIT,
-                                     batch_size=self.config.BATCHSIZE, max_iter=self.config.NITER, verbose=self.config)
+        self.model = sklearn_cluster.MiniBatchKMeans(n_clusters=self.config.NCLUSTERS, n_init=self.config.NINIT,
+                                                     batch_size=self.config.BATCHSIZE, max_iter=self.config.NITER,
+                                                     verbose=self.config.VERBOSITY)
         self.model.fit(dataset)
         return self.model.predict(dataset)
 
+    @instrumentation.instrument("streaming_minibatch_kmeans", count=instrumentation.num_rows)
+    def do_streaming_minibatch_kmeans(self, dataset, labels_file):
+        """mini-batch k-means that never materializes the full term-document matrix. the model is trained with
+        partial_fit over batches of kmeans.batch.size rows, block by block, for iterations.count epochs; a 2nd pass
+        assigns cluster ids batch by batch and appends them to labels_file. peak memory is bounded by the batch size
+            Input:
+                :parameter dataset: vectorized blocks(SparseBlocks) or an in-memory term document matrix
+                :parameter labels_file: fully qualified name of file to which cluster ids(int32) are written
+
+            Output:
+                :returns labels_: cluster identifiers - 1 per input document - memory-mapped from labels_file
+                :rtype numpy.memmap"""
+
+        self.model = sklearn_cluster.MiniBatchKMeans(n_clusters=self.config.NCLUSTERS, n_init=self.config.NINIT,
+                                                     batch_size=self.config.BATCHSIZE, verbose=self.config.VERBOSITY)
+        random_state = numpy.random.RandomState(0)
+        # initialization needs at least as many rows as clusters; smaller batches are held back and stacked until
+        # they are large enough for the first partial_fit
+        pending = []
+        for epoch in range(self.config.NITER):
+            logging.info("streaming k-means epoch {0} of {1}".format(epoch + 1, self.config.NITER))
+            for batch in self._iter_batches(dataset, random_state=random_state):
+                if not hasattr(self.model, 'cluster_centers_'):
+                    pending.append(batch)
+                    if sum(part.shape[0] for part in pending) < self.config.NCLUSTERS:
+                        continue
+                    batch = centroids.stack(pending)
+                    pending = []
+                self.model.partial_fit(batch)
+            if not hasattr(self.model, 'cluster_centers_'):
+                raise ValueError("# of documents({0}) is less than the # of clusters({1}). reduce clusters.count"
+                                 .format(sum(part.shape[0] for part in pending), self.config.NCLUSTERS))
+
+        logging.info("streaming k-means: assigning cluster ids")
+        num_labels = 0
+        with open(labels_file, 'wb') as filehandle:
+            for batch in self._iter_batches(dataset):
+                numpy.asarray(self.model.predict(batch), dtype=numpy.int32).tofile(filehandle)
+                num_labels += batch.shape[0]
+        if not num_labels:
+            return numpy.zeros(0, dtype=numpy.int32)
+        return numpy.memmap(labels_file, dtype=numpy.int32, mode='r')
+
+    @instrumentation.instrument("sharded_kmeans", count=instrumentation.num_rows)
+    def do_sharded_kmeans(self, dataset, labels_file=None):
+        """k-means in a pool of sharded.process.count worker processes, each holding a shard of the dataset(see
+        ShardedKMeans). rows are compared by cosine similarity if kmeans.engine is spherical, by euclidean distance
+        otherwise
+            Input:
+                :parameter dataset: vectorized blocks(SparseBlocks), an in-memory term document matrix or reduced data
+                :parameter labels_file: fully qualified name of file to which cluster ids(int32) are written.
+                                        default - None(kept in memory)
+
+            Output:
+                :returns labels_: cluster identifiers - 1 per input document
+                :rtype numpy.ndarray"""
+
+        self.model = sharded_kmeans.ShardedKMeans(n_clusters=self.config.NCLUSTERS, max_iter=self.config.NITER,
+                                                  n_init=self.config.NINIT, tol=self.config.SHARDED_TOL,
+                                                  n_workers=self.config.SHARDED_PCNT, chunk_size=self.config.BATCHSIZE,
+                                                  spherical=self.config.KMEANS_ENGINE == "spherical",
+                                                  verbose=self.config.VERBOSITY)
+        self.model.fit(dataset, labels_file=labels_file)
+        return self.model.labels_
+
+    def _iter_batches(self, dataset, random_state=None):
+        """yield row slices of at most kmeans.batch.size rows. blocks of a SparseBlocks dataset are loaded one at a
+        time(memory-mapped); their order is shuffled if random_state is given, rows within a block keep their order"""
+
+        if hasattr(dataset, 'iter_blocks'):
+            indices = numpy.arange(len(dataset.blocks))
+            if random_state is not None:
+                random_state.shuffle(indices)
+            blocks = (dataset.block(index) for index in indices)
+        else:
+            blocks = [dataset]
+        for block in blocks:
+            for start in range(0, block.shape[0], self.config.BATCHSIZE):
+                yield block[start:start + self.config.BATCHSIZE]
+
     def print_top_terms(self, features, model='kmeans'):
         """print top 'n' features(cluster centers) of each cluster
             Inputs:
@@ -83,9 +194,11 @@ class Cluster:
 
         top_terms = []
         if model == 'kmeans':
-            # original_space_centroids = self.svd.inverse_transform(self.model.cluster_centers_)
-            # order_centroids = original_space_centroids.argsort()[:, ::-1]
-            order_centroids = self.model.cluster_centers_.argsort()[:, ::-1]
+            centroids = self.model.cluster_centers_
+            if self.svd is not None:
+                # centroids of reduced data; map them back to term space
+                centroids = self.svd.inverse_transform(centroids)
+            order_centroids = centroids.argsort()[:, ::-1]
             for cluster_num in range(self.config.NCLUSTERS):
                 top_terms.append(", ".join([features[i] for i in order_centroids[cluster_num, :num_terms]]))
         elif model == 'lda':
@@ -93,6 +206,7 @@ class Cluster:
                 top_terms.append(", ".join([features[i] for i in topic.argsort()[:-num_terms - 1:-1]]))
         return top_terms
 
+    @instrumentation.instrument("lda")
     def do_lda(self, dataset):
         """Latent Dirichlet Allocation
             Input:
@@ -102,31 +216,297 @@ class Cluster:
                 :return components_: list of topic labels for each topic
                 :rtype list"""
 
-        self.model = LatentDirichletAllocation(n_topics=self.config.NTOPICS, max_iter=self.config.NITER)
+        self.model = sklearn_decomposition.LatentDirichletAllocation(n_components=self.config.NTOPICS,
+                                                                     max_iter=self.config.NITER)
         self.model.fit(dataset)
         return self.model.components_
 
-    def do_h2o_kmeans(self, dataset, server_url):
+    @instrumentation.instrument("h2o_kmeans", count=len)
+    def do_h2o_kmeans(self, dataset, server_url, labels_file=None, client=None):
         """use the h2o module to perform k-means clustering.
             This method delegates clustering to a H2O server instance(local or remote). A connection attempt will be
-            made to the provided server_url before clustering is initiated.
+            made to the provided server_url before clustering is initiated. data and predictions are handed over as
+            files in h2o.exchange.directory(see h2o_bridge.H2OKMeans), not through the Python client
             input:
-                :param dataset: input data - term document matrix
+                :param dataset: input data - vectorized blocks(SparseBlocks), term document matrix or reduced data
                 :param server_url: URL of the H2O server instance on which clustering would run
+                :param labels_file: fully qualified name of file to which cluster ids(int32) are written. default - None
+                :param client: object that makes the H2O calls. default - None(h2o_bridge.H2OClient)
             output:
-                labels_: a list of cluster identifiers - 1 per input document
+                labels_: cluster identifiers - 1 per input document
             :raises ConnectionError"""
 
-        # establish connection to H20 server
-        try:
-            h2o.connect(url=server_url, verbose=False)
-            logging.info("connected to H2O server")
-            h2o_dataframe = h2o.H2OFrame(python_obj=dataset)
-            self.model = H2OKMeansEstimator(max_iterations=self.config.NITER, k=self.config.NCLUSTERS, init="PlusPlus",
-                                            standardize=False)
-            self.model.train(training_frame=h2o_dataframe)
-            logging.info("modelling complete. predicting cluster membership")
-            return self.model.predict(h2o_dataframe)["predict"].as_data_frame(use_pandas=False, header=False)
-        except H2OConnectionError:
-            logging.error("unable to connect to H2O server @ {0}".format(server_url))
-            raise ConnectionError("unable to connect to H2O server. check if server is running at specified URL")
\ No newline at end of file
+        bridge = h2o_bridge.H2OKMeans(self.config, client=client)
+        labels = bridge.fit_predict(dataset, server_url, labels_file=labels_file)
+        self.model = bridge.model
+        return labels
+
+
+# clustering backends(see utils.registry.BACKENDS). a backend clusters dataset with the models of cluster_mgr and
+# returns 1 cluster id per row; large_file selects the models suited to data that does not fit in memory
+def sklearn_backend(cluster_mgr, dataset, labels_file=None, large_file=False, server_url=None):
+    """scikit-learn k-means(mini-batch k-means for large files; streaming if clustering.streaming is set) or
+    SphericalKMeans if kmeans.engine is spherical, in this process"""
+
+    if cluster_mgr.config.KMEANS_ENGINE == "spherical":
+        # spherical k-means reads vectorized blocks one at a time; it needs no streaming variant
+        logging.info("clustering using spherical k-means")
+        return cluster_mgr.do_spherical_kmeans(dataset)
+    if not large_file:
+        logging.info("clustering using scikit-learn")
+        return cluster_mgr.do_kmeans(dataset)
+    if cluster_mgr.config.STREAM_CLUSTERING:
+        logging.info("clustering using scikit-learn - streaming mini-batch k-means")
+        return cluster_mgr.do_streaming_minibatch_kmeans(dataset, labels_file=labels_file)
+    logging.info("clustering using scikit-learn")
+    # vectorized blocks are stacked into 1 in-memory matrix
+    return cluster_mgr.do_minibatch_kmeans(dataset.stack() if hasattr(dataset, 'iter_blocks') else dataset)
+
+
+def sharded_backend(cluster_mgr, dataset, labels_file=None, large_file=False, server_url=None):
+    """ShardedKMeans in a pool of sharded.process.count worker processes"""
+
+    logging.info("clustering using sharded k-means - {0} worker processes".format(cluster_mgr.config.SHARDED_PCNT))
+    return cluster_mgr.do_sharded_kmeans(dataset, labels_file=labels_file)
+
+
+def h2o_backend(cluster_mgr, dataset, labels_file=None, large_file=False, server_url=None):
+    """k-means on the H2O server at server_url(h2o.server.url if None)"""
+
+    logging.info("clustering using H2O server")
+    return cluster_mgr.do_h2o_kmeans(dataset, server_url=server_url or cluster_mgr.config.H2O_SERVER_URL,
+                                     labels_file=labels_file)
+
+
+class SphericalKMeans:
+    """k-means with cosine similarity on L2-normalized rows(spherical k-means). a document is assigned to the centroid
+    with the largest dot product, so each iteration needs only sparse x dense products of the documents with the k
+    centroids - no distances over all features. a centroid is the normalized sum of its documents.
+
+    rows are processed in chunks of chunk_size; chunks are assigned in a pool of n_threads threads(the sparse products
+    release the GIL) with at most 2 chunks per thread in flight, and the chunk results are merged in input order.
+    SparseBlocks input is read block by block. centroids are kept as float32. iterations stop once the share of
+    documents that change cluster drops to tol or below.
+
+    centroids are seeded with k-means++ on a random sample of rows; with n_init > 1 every seeding is refined on the
+    sample and the seeding with the largest total similarity is used on the full dataset. the fitted model exposes
+    cluster_centers_, labels_, predict and partial_fit like the scikit-learn k-means models"""
+
+    # rows sampled for seeding, per cluster, and at least
+    SAMPLE_ROWS_PER_CLUSTER = 100
+    MIN_SAMPLE_ROWS = 10000
+
+    def __init__(self, n_clusters, max_iter=30, n_init=1, tol=0.001, chunk_size=10000, n_threads=1, random_state=0,
+                 verbose=False):
+        if n_clusters < 1 or max_iter < 1 or n_init < 1 or chunk_size < 1 or n_threads < 1:
+            raise ValueError("invalid spherical k-means parameters. # of clusters, iterations, inits, chunk size and "
+                             "threads must be positive integers")
+        if not 0 <= tol < 1:
+            raise ValueError("invalid spherical.tolerance. must be in [0, 1)")
+        self.n_clusters = n_clusters
+        self.max_iter = max_iter
+        self.n_init = n_init
+        self.tol = tol
+        self.chunk_size = chunk_size
+        self.n_threads = n_threads
+        self.random_state = random_state
+        self.verbose = verbose
+
+    def fit(self, dataset):
+        """cluster dataset
+            input:
+                :parameter dataset: SparseBlocks, sparse matrix or 2-d array; rows need not be normalized
+            output:
+                :returns self
+                :raises ValueError"""
+
+        if dataset.shape[0] < self.n_clusters:
+            raise ValueError("# of documents({0}) is less than # of clusters({1})".format(dataset.shape[0],
+                                                                                          self.n_clusters))
+        random_state = numpy.random.RandomState(self.random_state)
+        sample = self._sample(dataset, random_state)
+        centers, best_similarity = None, None
+        for _ in range(self.n_init):
+            seeds = self._seed(sample, random_state)
+            if self.n_init == 1:
+                centers = seeds
+                break
+            seeds, _, similarity, _, _ = self._lloyd(sample, seeds)
+            if best_similarity is None or similarity > best_similarity:
+                centers, best_similarity = seeds, similarity
+
+        centers, self.labels_, self.similarity_, self.n_iter_, counts = self._lloyd(dataset, centers,
+                                                                                    verbose=self.verbose)
+        self.cluster_centers_ = centers
+        self.counts_ = counts.astype(numpy.float64)
+        return self
+
+    def fit_predict(self, dataset):
+        return self.fit(dataset).labels_
+
+    def predict(self, dataset):
+        """ids of the nearest(most similar) centroids
+            input:
+                :parameter dataset: SparseBlocks, sparse matrix or 2-d array
+            output:
+                :rtype numpy.ndarray"""
+
+        labels = numpy.empty(dataset.shape[0], dtype=numpy.int32)
+        for start, chunk_labels, _, _, _ in self._assign(dataset, self.cluster_centers_, accumulate=False):
+            labels[start:start + len(chunk_labels)] = chunk_labels
+        return labels
+
+    def partial_fit(self, dataset):
+        """move centroids towards the documents of dataset. each centroid is the normalized sum of the documents
+        assigned to it so far, with its previous documents represented by centroid * their count
+            input:
+                :parameter dataset: sparse matrix or 2-d array
+            output:
+                :returns self"""
+
+        if not hasattr(self, 'cluster_centers_'):
+            return self.fit(dataset)
+        sums, counts = self._accumulate(self._assign(dataset, self.cluster_centers_))[:2]
+        sums += self.cluster_centers_ * self.counts_[:, numpy.newaxis]
+        self.counts_ += counts
+        assigned = self.counts_ > 0
+        self.cluster_centers_[assigned] = centroids.normalized(sums[assigned])
+        return self
+
+    def _lloyd(self, dataset, centers, verbose=False):
+        """assign documents and update centroids until the share of changed labels drops to tol or max_iter is reached
+
+            :returns centroids, labels, total similarity of the documents to their centroids, # iterations and
+                     # documents per cluster
+            :rtype tuple"""
+
+        labels = numpy.full(dataset.shape[0], -1, dtype=numpy.int32)
+        for iteration in range(1, self.max_iter + 1):
+            sums, counts, similarity, changed, candidates = self._accumulate(self._assign(dataset, centers), labels)
+            centers = self._update(sums, counts, candidates)
+            change_rate = changed / dataset.shape[0]
+            if verbose:
+                logging.info("spherical k-means iteration {0}: {1:.4%} of documents changed cluster, similarity "
+                             "{2:.1f}".format(iteration, change_rate, similarity))
+            if change_rate <= self.tol:
+                break
+        return centers, labels, similarity, iteration, counts
+
+    def _accumulate(self, assignments, labels=None):
+        """merge chunk assignments; labels, if given, are updated in place
+
+            :returns sums of documents per cluster, # documents per cluster, total similarity, # changed labels and
+                     the least similar documents(candidates for empty clusters)
+            :rtype tuple"""
+
+        sums, counts = None, numpy.zeros(self.n_clusters, dtype=numpy.int64)
+        similarity, changed, candidates = 0.0, 0, []
+        for start, chunk_labels, best, chunk_sums, worst in assignments:
+            if labels is not None:
+                current = labels[start:start + len(chunk_labels)]
+                changed += numpy.count_nonzero(current != chunk_labels)
+                current[:] = chunk_labels
+            if sums is None:
+                sums = numpy.zeros((self.n_clusters, chunk_sums.shape[1]), dtype=numpy.float64)
+            centroids.add_sums(sums, chunk_sums)
+            counts += numpy.bincount(chunk_labels, minlength=self.n_clusters)
+            similarity += float(best.sum(dtype=numpy.float64))
+            candidates.append(worst)
+        return sums, counts, similarity, changed, candidates
+
+    def _update(self, sums, counts, candidates):
+        """normalized cluster sums; an empty cluster is re-seeded with 1 of the documents least similar to their
+        centroids"""
+
+        centers = centroids.normalized(sums)
+        empty = numpy.flatnonzero(counts == 0)
+        if len(empty):
+            similarities = numpy.concatenate([similarity for similarity, _ in candidates])
+            rows = centroids.stack([rows for _, rows in candidates])
+            order = numpy.argsort(similarities, kind='stable')[:len(empty)]
+            centers[empty[:len(order)]] = centroids.normalized(centroids.dense(rows[order]))
+            logging.info("spherical k-means: re-seeded {0} empty cluster(s)".format(len(order)))
+        return centers
+
+    def _assign(self, dataset, centers, accumulate=True):
+        """assign chunks of rows to their most similar centroids, in a thread pool
+
+            :returns generator of <row offset, labels, similarities, cluster sums, least similar rows> per chunk, in
+                     input order
+            :rtype generator"""
+
+        chunks = self._iter_chunks(dataset)
+        if self.n_threads == 1:
+            for start, chunk in chunks:
+                yield (start,) + _assign_chunk(chunk, centers, self.n_clusters, accumulate)
+            return
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.n_threads) as pool:
+            pending = collections.deque()
+            for start, chunk in chunks:
+                pending.append((start, pool.submit(_assign_chunk, chunk, centers, self.n_clusters, accumulate)))
+                if len(pending) >= 2 * self.n_threads:
+                    start, future = pending.popleft()
+                    yield (start,) + future.result()
+            while pending:
+                start, future = pending.popleft()
+                yield (start,) + future.result()
+
+    def _iter_chunks(self, dataset):
+        """<row offset, rows> of chunks of at most chunk_size rows; blocks of a SparseBlocks dataset are loaded 1 at a
+        time(memory-mapped)"""
+
+        if hasattr(dataset, 'iter_blocks'):
+            blocks = (dataset.block(index) for index in range(len(dataset.blocks)))
+        else:
+            blocks = [dataset]
+        offset = 0
+        for block in blocks:
+            for start in range(0, block.shape[0], self.chunk_size):
+                yield offset + start, block[start:start + self.chunk_size]
+            offset += block.shape[0]
+
+    def _sample(self, dataset, random_state):
+        """normalized random sample of rows used to seed the centroids; all rows of small datasets"""
+
+        num_rows = dataset.shape[0]
+        sample_size = min(num_rows, max(self.MIN_SAMPLE_ROWS, self.SAMPLE_ROWS_PER_CLUSTER * self.n_clusters))
+        positions = numpy.sort(random_state.choice(num_rows, sample_size, replace=False))
+        rows = []
+        for start, chunk in self._iter_chunks(dataset):
+            selected = positions[(positions >= start) & (positions < start + chunk.shape[0])]
+            if len(selected):
+                rows.append(centroids.normalized_rows(chunk[selected - start]))
+        return centroids.stack(rows)
+
+    def _seed(self, sample, random_state):
+        """k-means++ seeding with cosine distance(1 - similarity)
+
+            :rtype numpy.ndarray(float32)"""
+
+        centers = numpy.empty((self.n_clusters, sample.shape[1]), dtype=numpy.float32)
+        centers[0] = centroids.dense(sample[random_state.randint(sample.shape[0])])
+        distances = numpy.maximum(1 - centroids.dot(sample, centers[:1]).ravel(), 0)
+        for index in range(1, self.n_clusters):
+            total = distances.sum()
+            if total > 0:
+                position = random_state.choice(sample.shape[0], p=distances / total)
+            else:
+                # every row coincides with a centroid
+                position = random_state.randint(sample.shape[0])
+            centers[index] = centroids.dense(sample[position])
+            distances = numpy.minimum(distances,
+                                      numpy.maximum(1 - centroids.dot(sample, centers[index:index + 1]).ravel(), 0))
+        return centers
+
+
+def _assign_chunk(chunk, centers, num_clusters, accumulate=True):
+    """labels, similarity to the assigned centroid, sum of unit rows per cluster and the least similar(normalized) rows
+    of 1 chunk"""
+
+    weights = centroids.inverse_norms(centroids.row_norms(chunk))
+    labels, best = centroids.nearest_by_cosine(chunk, weights, centers)
+    if not accumulate:
+        return labels, best, None, None
+    sums = centroids.cluster_sums(chunk, labels, weights, num_clusters)
+    worst = numpy.argsort(best, kind='stable')[:num_clusters]
+    return labels, best, sums, (best[worst], centroids.normalized_rows(chunk[worst]))
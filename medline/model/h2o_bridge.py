@@ -0,0 +1,217 @@
+# date: 17-Oct-2026
+# bulk data handoff to an H2O server - vectorized data is exported to SVMLight files that the server imports in
+# parallel, and cluster predictions are written server-side and read back in chunks
+
+import logging
+import os
+import re
+import shutil
+import tempfile
+from multiprocessing import Pool
+
+import numpy
+import pandas
+from sklearn.datasets import dump_svmlight_file
+
+# h2o is optional; it is needed only to connect to a real H2O server(see H2OClient)
+try:
+    import h2o
+    from h2o.estimators import H2OKMeansEstimator
+    from h2o.exceptions import H2OConnectionError
+except ImportError:
+    h2o = None
+
+# exported data files; the server imports every file of the data directory that matches DATA_PATTERN
+DATA_PATTERN = r".*\.svm$"
+
+# columns of the exported predictions. row ids are written as the SVMLight label, which H2O imports as column C1
+ROW_ID_COLUMN = "C1"
+PREDICTION_COLUMN = "predict"
+
+
+class H2OClient:
+    """the calls made to the h2o module. any object with the same methods can stand in for it(e.g. a local stub that
+    clusters the exported files in process); frames and models are opaque handles passed back to the client"""
+
+    def __init__(self):
+        if h2o is None:
+            raise ValueError("the h2o backend requires the h2o module. install h2o or use another backend")
+
+    def connect(self, url):
+        """:raises ConnectionError"""
+
+        try:
+            h2o.connect(url=url, verbose=False)
+        except H2OConnectionError:
+            logging.error("unable to connect to H2O server @ {0}".format(url))
+            raise ConnectionError("unable to connect to H2O server. check if server is running at specified URL")
+        logging.info("connected to H2O server")
+
+    def import_files(self, directory, pattern):
+        """parse all files of directory that match pattern into 1 frame; the server parses the files in parallel"""
+
+        return h2o.import_file(path=directory, pattern=pattern)
+
+    def train_kmeans(self, frame, k, max_iterations):
+        """k-means on all columns of frame except the row ids"""
+
+        model = H2OKMeansEstimator(max_iterations=max_iterations, k=k, init="PlusPlus", standardize=False)
+        model.train(x=[name for name in frame.names if name != ROW_ID_COLUMN], training_frame=frame)
+        return model
+
+    def predict(self, model, frame):
+        """frame of row ids and predicted cluster ids"""
+
+        return frame[ROW_ID_COLUMN].cbind(model.predict(frame)[PREDICTION_COLUMN])
+
+    def export(self, frame, directory):
+        """write frame as CSV part files to directory, on the server's file system"""
+
+        h2o.export_file(frame, directory, force=True, parts=-1)
+
+    def remove(self, frame):
+        h2o.remove(frame)
+
+
+class H2OKMeans:
+    """k-means on an H2O server without sending the data through the Python client:
+        1. rows are written to SVMLight files(sparse; row id as label) of at most h2o.chunk.size rows, in a pool of
+           h2o.export.process.count processes. vectorized blocks are read 1 at a time(memory-mapped)
+        2. the server imports all files in parallel and trains the model
+        3. predictions are exported by the server as CSV part files and read back h2o.chunk.size rows at a time
+    files are exchanged through a subdirectory of h2o.exchange.directory created for each run; the directory must be
+    readable and writable at the same path by this process and the H2O server(e.g. a shared file system). only the
+    subdirectory of the run is removed, once the predictions have been read or the run has failed"""
+
+    def __init__(self, config, client=None):
+        self.config = config
+        self.client = client if client is not None else H2OClient()
+        if config.H2O_EXCHANGE_DIR == "none":
+            self.exchange_dir = os.path.join(config.TEMP_DIR, "h2o")
+        else:
+            self.exchange_dir = config.H2O_EXCHANGE_DIR
+        self.model = None
+
+    def fit_predict(self, dataset, server_url, labels_file=None):
+        """cluster dataset on the H2O server at server_url
+            input:
+                :parameter dataset: vectorized blocks(SparseBlocks), sparse matrix or 2-d array
+                :parameter server_url: URL of the H2O server instance
+                :parameter labels_file: fully qualified name of file to which cluster ids(int32) are written; the ids
+                                        are returned memory-mapped from it. default - None(kept in memory)
+            output:
+                :returns cluster identifiers - 1 per row of dataset
+                :rtype numpy.ndarray
+                :raises ConnectionError, ValueError"""
+
+        self.client.connect(server_url)
+        # the exchange directory may be shared with other runs and users; files of this run go to a new subdirectory
+        os.makedirs(self.exchange_dir, exist_ok=True)
+        run_dir = tempfile.mkdtemp(prefix="medline_", dir=self.exchange_dir)
+        data_dir = os.path.join(run_dir, "data")
+        predictions_dir = os.path.join(run_dir, "predictions")
+        os.makedirs(data_dir)
+
+        try:
+            num_rows = export_svmlight(dataset, data_dir, processes=self.config.H2O_EXPORT_PCNT,
+                                       chunk_size=self.config.H2O_CHUNK)
+            logging.info("exported {0} rows to {1}. importing them on the H2O server".format(num_rows, data_dir))
+            frame = self.client.import_files(data_dir, DATA_PATTERN)
+            self.model = self.client.train_kmeans(frame, self.config.NCLUSTERS, self.config.NITER)
+            logging.info("modelling complete. predicting cluster membership")
+            predictions = self.client.predict(self.model, frame)
+            self.client.export(predictions, predictions_dir)
+            self.client.remove(predictions)
+            self.client.remove(frame)
+
+            return read_predictions(predictions_dir, num_rows, chunk_size=self.config.H2O_CHUNK,
+                                    labels_file=labels_file)
+        finally:
+            shutil.rmtree(run_dir, ignore_errors=True)
+
+
+def export_svmlight(dataset, directory, processes=1, chunk_size=100000):
+    """write the rows of dataset to SVMLight files(1-based feature indices) of at most chunk_size rows. the label of a
+    row is its row id, so predictions can be matched to rows whatever order the files are imported in
+        input:
+            :parameter dataset: vectorized blocks(SparseBlocks), sparse matrix or 2-d array
+            :parameter directory: fully qualified path of directory to write the files to
+            :parameter processes: # of processes writing files
+            :parameter chunk_size: max # of rows per file
+        output:
+            :returns # rows written
+            :rtype int"""
+
+    if processes < 1 or chunk_size < 1:
+        raise ValueError("invalid # of export processes or chunk size. must be positive integers")
+    if hasattr(dataset, 'iter_blocks'):
+        sources = [(index, block['rows']) for index, block in enumerate(dataset.blocks)]
+    else:
+        sources = [(None, dataset.shape[0])]
+    tasks = []
+    offset = 0
+    for index, num_rows in sources:
+        for start in range(0, num_rows, chunk_size):
+            stop = min(start + chunk_size, num_rows)
+            filename = os.path.join(directory, "part{0:012d}.svm".format(offset + start))
+            if index is None:
+                # in-memory rows are handed to the writing process
+                tasks.append((dataset[start:stop], None, 0, stop - start, offset + start, filename))
+            else:
+                tasks.append((dataset, index, start, stop, offset + start, filename))
+        offset += num_rows
+    if processes == 1 or len(tasks) < 2:
+        for task in tasks:
+            _write_svmlight(task)
+    else:
+        with Pool(processes=min(processes, len(tasks))) as pool:
+            for _ in pool.imap_unordered(_write_svmlight, tasks):
+                pass
+    return offset
+
+
+def _write_svmlight(task):
+    source, index, start, stop, offset, filename = task
+    rows = (source if index is None else source.block(index))[start:stop]
+    temp_filename = filename + ".tmp"
+    dump_svmlight_file(rows, numpy.arange(offset, offset + rows.shape[0]), temp_filename, zero_based=False)
+    os.replace(temp_filename, filename)
+
+
+def read_predictions(path, num_rows, chunk_size=100000, labels_file=None):
+    """read cluster ids from the CSV file(s) exported by the server, chunk_size rows at a time
+        input:
+            :parameter path: fully qualified name of CSV file or directory of CSV part files
+            :parameter num_rows: # of rows that were clustered
+            :parameter chunk_size: # of rows read at a time
+            :parameter labels_file: fully qualified name of file to write cluster ids(int32) to. default - None
+        output:
+            :returns cluster ids in row order
+            :rtype numpy.ndarray
+            :raises ValueError"""
+
+    if labels_file:
+        labels = numpy.memmap(labels_file, dtype=numpy.int32, mode='w+', shape=(num_rows,))
+    else:
+        labels = numpy.empty(num_rows, dtype=numpy.int32)
+    labels[:] = -1
+    num_read = 0
+    for filename in _prediction_files(path):
+        for chunk in pandas.read_csv(filename, usecols=[ROW_ID_COLUMN, PREDICTION_COLUMN], chunksize=chunk_size):
+            row_ids = chunk[ROW_ID_COLUMN].to_numpy(dtype=numpy.int64)
+            labels[row_ids] = chunk[PREDICTION_COLUMN].to_numpy(dtype=numpy.int32)
+            num_read += len(chunk)
+    if num_read != num_rows or (num_rows and labels.min() < 0):
+        raise ValueError("H2O returned {0} predictions for {1} rows".format(num_read, num_rows))
+    if labels_file:
+        labels.flush()
+    return labels
+
+
+def _prediction_files(path):
+    """CSV file(s) of an export; part files are sorted by name, checksum and hidden files are skipped"""
+
+    if not os.path.isdir(path):
+        return [path]
+    return [os.path.join(path, name) for name in sorted(os.listdir(path))
+            if not name.startswith(('.', '_')) and not re.search(r"\.crc$", name)]
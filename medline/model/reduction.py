@@ -0,0 +1,101 @@
+# date: 17-Oct-2026
+# reduce term-document matrices to a small # of dense dimensions(latent semantic analysis) before clustering
+
+import logging
+
+import numpy
+from numpy.lib.format import open_memmap
+from scipy import sparse
+from sklearn.decomposition import TruncatedSVD
+from sklearn.preprocessing import normalize
+
+
+class Reducer:
+    """project tf-idf or hashing vectors onto features.dimension dense, L2 normalized float32 columns using a
+    randomized truncated SVD. the SVD is fit on a random sample of at most reduction.sample.size documents; all
+    documents are then projected chunk by chunk, so vectorized blocks(SparseBlocks) are never loaded in full"""
+
+    def __init__(self, config, chunk_size=10000, random_state=0):
+        self.config = config
+        self.chunk_size = chunk_size
+        self.random_state = random_state
+        self.svd = None
+
+    def fit(self, dataset):
+        """fit the SVD on a sample of dataset
+            input:
+                :parameter dataset: vectorized blocks(SparseBlocks) or an in-memory term document matrix
+            output:
+                :returns self
+                :raises ValueError"""
+
+        if self.config.DIM >= dataset.shape[1]:
+            raise ValueError("features.dimension must be less than # of features({0})".format(dataset.shape[1]))
+        sample = self._sample(dataset)
+        logging.info("fitting truncated SVD({0} components) on {1} documents".format(self.config.DIM, sample.shape[0]))
+        self.svd = TruncatedSVD(n_components=self.config.DIM, algorithm='randomized', random_state=self.random_state)
+        self.svd.fit(sample)
+        logging.info("explained variance of {0} components: {1:.3f}".format(self.config.DIM,
+                                                                             self.svd.explained_variance_ratio_.sum()))
+        return self
+
+    def transform(self, dataset, output_file=None):
+        """project dataset chunk by chunk onto the fitted components and L2 normalize each row
+            input:
+                :parameter dataset: vectorized blocks(SparseBlocks) or an in-memory term document matrix
+                :parameter output_file: fully qualified name of .npy file to write the projection to. the projection
+                                        is returned memory-mapped from this file. default - None(kept in memory)
+            output:
+                :returns # documents x features.dimension matrix
+                :rtype numpy.ndarray"""
+
+        shape = (dataset.shape[0], self.config.DIM)
+        if output_file:
+            reduced = open_memmap(output_file, mode='w+', dtype=numpy.float32, shape=shape)
+        else:
+            reduced = numpy.empty(shape, dtype=numpy.float32)
+        start = 0
+        for chunk in self._iter_chunks(dataset):
+            projected = normalize(self.svd.transform(chunk).astype(numpy.float32), copy=False)
+            reduced[start:start + projected.shape[0]] = projected
+            start += projected.shape[0]
+        if output_file:
+            reduced.flush()
+        return reduced
+
+    def fit_transform(self, dataset, output_file=None):
+        return self.fit(dataset).transform(dataset, output_file=output_file)
+
+    def inverse_transform(self, reduced):
+        """map reduced vectors(e.g. cluster centroids) back to term space"""
+
+        return self.svd.inverse_transform(reduced)
+
+    def _sample(self, dataset):
+        """random sample(without replacement) of at most reduction.sample.size rows, in row order"""
+
+        num_rows = dataset.shape[0]
+        random_state = numpy.random.RandomState(self.random_state)
+        if num_rows > self.config.REDUCTION_SAMPLE:
+            rows = numpy.sort(random_state.choice(num_rows, size=self.config.REDUCTION_SAMPLE, replace=False))
+        else:
+            rows = numpy.arange(num_rows)
+        if not hasattr(dataset, 'iter_blocks'):
+            return dataset[rows]
+
+        # pick sampled rows block by block
+        chunks = []
+        start = 0
+        for index, block in enumerate(dataset.blocks):
+            end = start + block['rows']
+            block_rows = rows[(rows >= start) & (rows < end)] - start
+            if len(block_rows):
+                chunks.append(dataset.block(index)[block_rows])
+            start = end
+        return sparse.vstack(chunks, format='csr')
+
+    def _iter_chunks(self, dataset):
+        blocks = dataset.iter_blocks() if hasattr(dataset, 'iter_blocks') else [dataset]
+        for block in blocks:
+            for start in range(0, block.shape[0], self.chunk_size):
+                yield block[start:start + self.chunk_size]
@@ -0,0 +1,389 @@
+# date: 17-Oct-2026
+# k-means over the shards of a vectorized dataset in a pool of persistent worker processes(map-reduce) - a local
+# alternative to clustering on an H2O server
+
+import logging
+import multiprocessing
+import sys
+import traceback
+
+import numpy
+from scipy import sparse
+from sklearn.cluster import KMeans
+
+from medline.model import centroids
+
+# rows sampled to seed the centroids, per cluster, and at least
+SAMPLE_ROWS_PER_CLUSTER = 100
+MIN_SAMPLE_ROWS = 10000
+
+
+class ShardedKMeans:
+    """Lloyd's k-means, map-reduce style. the rows of the dataset are split into pieces of at most chunk_size rows and
+    contiguous runs of pieces(shards) are handed to n_workers worker processes, which live for the whole fit. a
+    worker memory-maps the blocks of its shard once; each iteration it assigns its rows to the nearest centroids and
+    returns per-cluster sums and counts, which are reduced centrally into the next centroids. only centroids, sums and
+    counts cross process boundaries; cluster ids stay with the workers until the fit is done.
+
+    with spherical set, rows are compared by cosine similarity and centroids are normalized sums, with the same
+    arithmetic(see centroids) as cluster.SphericalKMeans; otherwise by euclidean distance and centroids are means.
+    centroids are seeded with scikit-learn k-means(n_init runs) on a random sample of rows. iterations stop once the
+    share of rows that change cluster drops to tol or below. an empty cluster is re-seeded with 1 of the rows farthest
+    from their centroids.
+
+    the fitted model exposes cluster_centers_, labels_, predict and partial_fit like the scikit-learn k-means models;
+    predict and partial_fit run in the calling process"""
+
+    def __init__(self, n_clusters, max_iter=30, n_init=1, tol=0.001, n_workers=1, chunk_size=50000, spherical=False,
+                 random_state=0, verbose=False):
+        if n_clusters < 1 or max_iter < 1 or n_init < 1 or n_workers < 1 or chunk_size < 1:
+            raise ValueError("invalid sharded k-means parameters. # of clusters, iterations, inits, workers and chunk "
+                             "size must be positive integers")
+        if not 0 <= tol < 1:
+            raise ValueError("invalid sharded.tolerance. must be in [0, 1)")
+        self.n_clusters = n_clusters
+        self.max_iter = max_iter
+        self.n_init = n_init
+        self.tol = tol
+        self.n_workers = n_workers
+        self.chunk_size = chunk_size
+        self.spherical = spherical
+        self.random_state = random_state
+        self.verbose = verbose
+
+    def fit(self, dataset, labels_file=None):
+        """cluster dataset
+            input:
+                :parameter dataset: vectorized blocks(SparseBlocks), sparse matrix or 2-d array
+                :parameter labels_file: fully qualified name of file to which workers write cluster ids(int32);
+                                        labels_ is then memory-mapped from it. default - None(labels_ in memory)
+            output:
+                :returns self
+                :raises ValueError, RuntimeError"""
+
+        num_rows = dataset.shape[0]
+        if num_rows < self.n_clusters:
+            raise ValueError("# of documents({0}) is less than # of clusters({1})".format(num_rows, self.n_clusters))
+        centers = self._seed(dataset)
+        if labels_file:
+            numpy.memmap(labels_file, dtype=numpy.int32, mode='w+', shape=(num_rows,)).flush()
+
+        shards = _partition(_pieces(dataset, self.chunk_size), num_rows, self.n_workers)
+        logging.info("sharded k-means: {0} rows in {1} shards".format(num_rows, len(shards)))
+        with _Workers(dataset, shards, self.spherical, labels_file) as workers:
+            for iteration in range(1, self.max_iter + 1):
+                sums, counts, inertia, changed, candidates = workers.step(centers)
+                centers = self._update(centers, sums, counts, candidates)
+                change_rate = changed / num_rows
+                if self.verbose:
+                    logging.info("sharded k-means iteration {0}: {1:.4%} of documents changed cluster, inertia "
+                                 "{2:.1f}".format(iteration, change_rate, inertia))
+                if change_rate <= self.tol:
+                    break
+            labels = workers.labels(num_rows)
+
+        self.cluster_centers_ = centers
+        self.labels_ = numpy.memmap(labels_file, dtype=numpy.int32, mode='r') if labels_file else labels
+        self.inertia_ = inertia
+        self.n_iter_ = iteration
+        self.counts_ = counts.astype(numpy.float64)
+        return self
+
+    def fit_predict(self, dataset, labels_file=None):
+        return self.fit(dataset, labels_file=labels_file).labels_
+
+    def predict(self, dataset):
+        """ids of the nearest centroids
+            input:
+                :parameter dataset: sparse matrix or 2-d array
+            output:
+                :rtype numpy.ndarray"""
+
+        labels = numpy.empty(dataset.shape[0], dtype=numpy.int32)
+        for start in range(0, dataset.shape[0], self.chunk_size):
+            chunk = dataset[start:start + self.chunk_size]
+            labels[start:start + chunk.shape[0]] = _assign(chunk, centroids.row_norms(chunk), self.cluster_centers_,
+                                                           self.spherical)[0]
+        return labels
+
+    def partial_fit(self, dataset):
+        """move centroids towards the documents of dataset; previous documents are represented by their centroids
+        weighted by their count
+            input:
+                :parameter dataset: sparse matrix or 2-d array
+            output:
+                :returns self"""
+
+        if not hasattr(self, 'cluster_centers_'):
+            return self.fit(dataset)
+        norms = centroids.row_norms(dataset)
+        labels, _, weights = _assign(dataset, norms, self.cluster_centers_, self.spherical)
+        sums = centroids.dense(centroids.cluster_sums(dataset, labels, weights, self.n_clusters))
+        counts = numpy.bincount(labels, minlength=self.n_clusters)
+        sums += self.cluster_centers_ * self.counts_[:, numpy.newaxis]
+        self.counts_ += counts
+        assigned = self.counts_ > 0
+        if self.spherical:
+            self.cluster_centers_[assigned] = centroids.normalized(sums[assigned], dtype=numpy.float64)
+        else:
+            self.cluster_centers_[assigned] = sums[assigned] / self.counts_[assigned, numpy.newaxis]
+        return self
+
+    def _seed(self, dataset):
+        """centroids of scikit-learn k-means on a random sample of rows
+
+            :rtype numpy.ndarray"""
+
+        num_rows = dataset.shape[0]
+        random_state = numpy.random.RandomState(self.random_state)
+        sample_size = min(num_rows, max(MIN_SAMPLE_ROWS, SAMPLE_ROWS_PER_CLUSTER * self.n_clusters))
+        rows = numpy.sort(random_state.choice(num_rows, size=sample_size, replace=False))
+        chunks = []
+        for offset, source, start, stop in _pieces(dataset, self.chunk_size):
+            piece_rows = rows[(rows >= offset) & (rows < offset + stop - start)] - offset + start
+            if len(piece_rows):
+                chunks.append(_source_rows(dataset, source)[piece_rows])
+        sample = centroids.stack(chunks)
+        if self.spherical:
+            sample = centroids.normalized_rows(sample)
+        model = KMeans(n_clusters=self.n_clusters, n_init=self.n_init, max_iter=self.max_iter,
+                       random_state=self.random_state).fit(sample)
+        centers = model.cluster_centers_.astype(numpy.float64)
+        return centroids.normalized(centers, dtype=numpy.float64) if self.spherical else centers
+
+    def _update(self, centers, sums, counts, candidates):
+        """centroids of the reduced sums and counts; an empty cluster is re-seeded with 1 of the rows farthest from
+        their centroids"""
+
+        centers = centers.copy()
+        assigned = counts > 0
+        if self.spherical:
+            centers[assigned] = centroids.normalized(sums[assigned], dtype=numpy.float64)
+        else:
+            centers[assigned] = sums[assigned] / counts[assigned, numpy.newaxis]
+        empty = numpy.flatnonzero(~assigned)
+        if len(empty):
+            costs, rows = candidates
+            order = numpy.argsort(-costs, kind='stable')[:len(empty)]
+            centers[empty[:len(order)]] = rows[order]
+            logging.info("sharded k-means: re-seeded {0} empty cluster(s)".format(len(order)))
+        return centers
+
+
+class _Workers:
+    """pool of persistent worker processes, 1 per shard, driven over pipes"""
+
+    def __init__(self, dataset, shards, spherical, labels_file):
+        self.connections = []
+        self.processes = []
+        blocks = dataset if hasattr(dataset, 'iter_blocks') else None
+        for shard in shards:
+            if blocks is None:
+                # in-memory rows are handed over once, when the worker starts
+                shard = [(offset, dataset[start:stop], 0, stop - start) for offset, _, start, stop in shard]
+            connection, worker_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_work, args=(worker_connection, blocks, shard, spherical,
+                                                                  labels_file), daemon=True)
+            process.start()
+            worker_connection.close()
+            self.connections.append(connection)
+            self.processes.append(process)
+
+    def __enter__(self):
+        try:
+            self._receive()
+        except RuntimeError:
+            self.__exit__(*sys.exc_info())
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback_):
+        for connection in self.connections:
+            try:
+                connection.send(('stop', None))
+            except (BrokenPipeError, OSError):
+                pass
+            connection.close()
+        for process in self.processes:
+            process.join(timeout=None if exc_type is None else 5)
+            if process.is_alive():
+                process.terminate()
+
+    def step(self, centers):
+        """1 map-reduce iteration
+
+            :returns summed cluster sums, counts, inertia, # changed labels and the re-seeding candidates
+            :rtype tuple"""
+
+        for connection in self.connections:
+            connection.send(('step', centers))
+        sums = numpy.zeros_like(centers)
+        counts = numpy.zeros(len(centers), dtype=numpy.int64)
+        inertia, changed, costs, rows = 0.0, 0, [], []
+        for shard_sums, shard_counts, shard_inertia, shard_changed, (shard_costs, shard_rows) in self._receive():
+            centroids.add_sums(sums, shard_sums)
+            counts += shard_counts
+            inertia += shard_inertia
+            changed += shard_changed
+            costs.append(shard_costs)
+            rows.append(shard_rows)
+        return sums, counts, inertia, changed, (numpy.concatenate(costs), numpy.vstack(rows))
+
+    def labels(self, num_rows):
+        """cluster ids of the last iteration; None if the workers wrote them to the labels file"""
+
+        for connection in self.connections:
+            connection.send(('labels', None))
+        labels = None
+        for shard_labels in self._receive():
+            if shard_labels is None:
+                continue
+            if labels is None:
+                labels = numpy.empty(num_rows, dtype=numpy.int32)
+            for offset, piece_labels in shard_labels:
+                labels[offset:offset + len(piece_labels)] = piece_labels
+        return labels
+
+    def _receive(self):
+        replies = []
+        for connection in self.connections:
+            try:
+                status, payload = connection.recv()
+            except EOFError:
+                raise RuntimeError("sharded k-means worker exited unexpectedly")
+            if status == 'error':
+                raise RuntimeError("sharded k-means worker failed:\n{0}".format(payload))
+            replies.append(payload)
+        return replies
+
+
+def _work(connection, blocks, shard, spherical, labels_file):
+    """worker process loop: load the shard once, then answer step/labels requests until stopped"""
+
+    try:
+        worker = _Shard(blocks, shard, spherical)
+        connection.send(('ok', None))
+        while True:
+            command, payload = connection.recv()
+            if command == 'step':
+                connection.send(('ok', worker.step(payload)))
+            elif command == 'labels':
+                connection.send(('ok', worker.labels(labels_file)))
+            else:
+                break
+    except (EOFError, KeyboardInterrupt):
+        pass
+    except Exception:
+        connection.send(('error', traceback.format_exc()))
+    finally:
+        connection.close()
+
+
+class _Shard:
+    """rows of 1 worker: pieces of memory-mapped blocks(or in-memory rows), their norms and current cluster ids"""
+
+    def __init__(self, blocks, pieces, spherical):
+        self.spherical = spherical
+        self.sources = {}
+        self.pieces = []
+        for offset, source, start, stop in pieces:
+            if blocks is not None:
+                if source not in self.sources:
+                    self.sources[source] = blocks.block(source)
+                source = self.sources[source]
+            rows = source[start:stop]
+            self.pieces.append((offset, source, start, stop, centroids.row_norms(rows),
+                                numpy.full(stop - start, -1, dtype=numpy.int32)))
+
+    def step(self, centers):
+        """assign rows to their nearest centroids(map) and sum them up per cluster
+
+            :returns cluster sums, counts, inertia, # changed labels and the rows farthest from their centroids"""
+
+        num_clusters = len(centers)
+        sums = None
+        counts = numpy.zeros(num_clusters, dtype=numpy.int64)
+        inertia, changed, costs, candidates = 0.0, 0, [], []
+        for offset, source, start, stop, norms, labels in self.pieces:
+            rows = source[start:stop]
+            piece_labels, piece_costs, weights = _assign(rows, norms, centers, self.spherical)
+            changed += numpy.count_nonzero(labels != piece_labels)
+            labels[:] = piece_labels
+            piece_sums = centroids.cluster_sums(rows, piece_labels, weights, num_clusters)
+            if sums is None:
+                sums = numpy.zeros(centers.shape, dtype=numpy.float64)
+            centroids.add_sums(sums, piece_sums)
+            counts += numpy.bincount(piece_labels, minlength=num_clusters)
+            inertia += float(piece_costs.sum())
+            farthest = numpy.argsort(-piece_costs, kind='stable')[:num_clusters]
+            costs.append(piece_costs[farthest])
+            candidates.append(centroids.dense(rows[farthest]) * weights[farthest, numpy.newaxis])
+        costs, candidates = numpy.concatenate(costs), numpy.vstack(candidates)
+        farthest = numpy.argsort(-costs, kind='stable')[:num_clusters]
+        # sums of sparse rows are sent as sparse matrices; most terms occur in few clusters
+        return (sparse.csr_matrix(sums) if sparse.issparse(rows) else sums), counts, inertia, changed, \
+            (costs[farthest], candidates[farthest])
+
+    def labels(self, labels_file):
+        if not labels_file:
+            return [(offset, labels) for offset, _, _, _, _, labels in self.pieces]
+        output = numpy.memmap(labels_file, dtype=numpy.int32, mode='r+')
+        for offset, _, _, _, _, labels in self.pieces:
+            output[offset:offset + len(labels)] = labels
+        output.flush()
+        return None
+
+
+def _pieces(dataset, chunk_size):
+    """<row offset, source, start, stop> of row ranges of at most chunk_size rows. source is the block index of a
+    SparseBlocks dataset, None for an in-memory matrix
+
+        :rtype list"""
+
+    if hasattr(dataset, 'iter_blocks'):
+        sources = [(index, block['rows']) for index, block in enumerate(dataset.blocks)]
+    else:
+        sources = [(None, dataset.shape[0])]
+    pieces = []
+    offset = 0
+    for source, num_rows in sources:
+        for start in range(0, num_rows, chunk_size):
+            stop = min(start + chunk_size, num_rows)
+            pieces.append((offset + start, source, start, stop))
+        offset += num_rows
+    return pieces
+
+
+def _partition(pieces, num_rows, num_shards):
+    """split pieces into at most num_shards contiguous runs of roughly equal # of rows
+
+        :rtype list"""
+
+    shards = [[] for _ in range(num_shards)]
+    for piece in pieces:
+        offset, _, start, stop = piece
+        middle = offset + (stop - start) / 2.0
+        shards[min(int(middle * num_shards / num_rows), num_shards - 1)].append(piece)
+    return [shard for shard in shards if shard]
+
+
+def _source_rows(dataset, source):
+    return dataset if source is None else dataset.block(source)
+
+
+def _assign(rows, norms, centers, spherical):
+    """nearest centroid of each row
+
+        :returns cluster ids, distance of each row to its centroid(1 - cosine similarity if spherical) and the weights
+                 with which rows are added to cluster sums(inverse norms if spherical, so unit rows are summed)
+        :rtype tuple"""
+
+    if spherical:
+        weights = centroids.inverse_norms(norms)
+        labels, similarities = centroids.nearest_by_cosine(rows, weights, centers)
+        return labels, 1 - similarities, weights
+    weights = numpy.ones(len(norms))
+    distances = (norms ** 2)[:, numpy.newaxis] - 2 * centroids.dot(rows, centers) + (centers ** 2).sum(axis=1)
+    labels = distances.argmin(axis=1).astype(numpy.int32)
+    costs = numpy.maximum(distances[numpy.arange(len(labels)), labels], 0)
+    return labels, costs, weights
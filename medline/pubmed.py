@@ -2,22 +2,35 @@
 # date: 06-Feb-2017
 # top level script to initiate PubMed data processing
 
-from medline.data.load import loader
-from medline.data.extract import features
-from medline.model import cluster
-from medline.utils import input_parser, data_streamer
-from medline.utils.export_results import export_dataframe
-from medline.utils.collate_results import collate_
+from medline.utils import instrumentation
+from medline.utils.membership import MembershipStore
+from medline.utils.registry import BACKENDS, EXPORTERS, VECTORIZERS, LazyModule
+from medline.utils.run_manifest import RunManifest, MANIFEST_FILENAME
 from medline.utils.configuration import Config
 
 import logging
-import pandas
 import argparse
-import numpy
 import os
 import pickle
 from datetime import datetime
 
+# pipeline modules(and scikit-learn, nltk, pandas and numpy with them) are imported when a run first uses them, so
+# that argument parsing and validation do not pay for them; see benchmarks stage startup
+loader = LazyModule("medline.data.load.loader")
+features = LazyModule("medline.data.extract.features")
+dedup = LazyModule("medline.data.extract.dedup")
+sparse_store = LazyModule("medline.data.extract.sparse_store")
+cluster = LazyModule("medline.model.cluster")
+reduction = LazyModule("medline.model.reduction")
+bundle = LazyModule("medline.model.bundle")
+input_parser = LazyModule("medline.utils.input_parser")
+data_streamer = LazyModule("medline.utils.data_streamer")
+export_results = LazyModule("medline.utils.export_results")
+collate_results = LazyModule("medline.utils.collate_results")
+vector_cache = LazyModule("medline.utils.vector_cache")
+numpy = LazyModule("numpy")
+pandas = LazyModule("pandas")
+
 
 class PubMed:
     """cluster PubMed-Medline journals using k-means algorithm. Input data are PubMed abstracts in the form
@@ -34,7 +47,8 @@ class PubMed:
         logging.basicConfig(format='%(asctime)s::%(levelname)s::%(message)s', level=logging.INFO, filename=log_file)
 
     def process(self, input_file, in_format, output_file, out_format, vectorized_file, num_docs,
-                large_file, use_temp_files, collate, use_h2o, h2o_url):
+                large_file, use_temp_files, collate, use_h2o, h2o_url, save_model=None, membership_db=None,
+                resume=False, backend="sklearn"):
         """resembles a data processing pipeline.
             ->load input file into a pandas data frame (for file size < 2 GB)
             ->transform data into Tf-Idf or Hashing vector
@@ -50,113 +64,335 @@ class PubMed:
             collate: flag to indicate if output should be collated into 1 record per cluster
             use_h2o: flag to indicate if processing should be delegated to H2O server cluster
             h20_url: URL of H2O serve to connect to
+            save_model: fully qualified name of file to save fitted vectorizer and clustering model to; used by
+                        incremental updates(see update.py). default - None(not saved)
+            membership_db: fully qualified name of sqlite database to save cluster membership of every PMID to.
+                           default - None(not saved)
+            resume: flag to resume an interrupted large xml file run from its run manifest(see utils.run_manifest);
+                    verified temp files and completed stages are reused. default - False
+            backend: clustering backend - sklearn, sharded or h2o(same as use_h2o). default - sklearn
 
         :rtype None"""
 
+        # arguments and config are validated before any pipeline module is imported
+        BACKENDS.validate(backend)
+        EXPORTERS.validate(out_format)
+        VECTORIZERS.validate(self.config.VECTORIZER)
+        if use_h2o and backend not in ("sklearn", "h2o"):
+            raise ValueError("use_h2o can not be combined with the {0} backend".format(backend))
+        use_h2o = use_h2o or backend == "h2o"
+        backend = "h2o" if use_h2o else backend
+        if save_model and use_h2o:
+            raise ValueError("models clustered by H2O can not be saved. use scikit-learn to save a model")
+        if resume and not (large_file and in_format == "xml"):
+            raise ValueError("only large xml file runs can be resumed. set large_file")
+
+        # per-stage metrics are appended to the metrics file in the log directory; see utils.instrumentation
+        metrics_file = None
+        if self.config.METRICS_FILE != "none":
+            metrics_file = self.config.LOG_DIR + self.config.METRICS_FILE
+        recorder = instrumentation.Recorder(metrics_file,
+                                            profile_stage=None if self.config.PROFILE_STAGE == "none"
+                                            else self.config.PROFILE_STAGE,
+                                            profile_interval=self.config.PROFILE_INTERVAL_MS / 1000.0,
+                                            run_info={'input_file': input_file, 'large_file': large_file,
+                                                      'vectorizer': self.config.VECTORIZER, 'use_h2o': use_h2o,
+                                                      'backend': backend})
+        with recorder, instrumentation.stage("process") as record:
+            record.docs = self._process(input_file, in_format, output_file, out_format, vectorized_file, num_docs,
+                                        large_file, use_temp_files, collate, use_h2o, h2o_url, save_model=save_model,
+                                        membership_db=membership_db, resume=resume, backend=backend)
+
+    def _process(self, input_file, in_format, output_file, out_format, vectorized_file, num_docs, large_file,
+                 use_temp_files, collate, use_h2o, h2o_url, save_model=None, membership_db=None, resume=False,
+                 backend="sklearn"):
+        """create the loader for input_file and run the large or normal file pipeline; see process
+
+            :returns # documents clustered
+            :rtype int"""
+
         logging.info("Processing begins..initializing appropriate loader class")
         # create appropriate loader object
+        run_manifest = None
         if in_format == "xml":
             if large_file:
-                if use_temp_files and num_docs == 0:
-                    raise ValueError("param num_docs must be a non-zero value when use_temp_files flag is set to True")
                 data_loader = loader.AbstractsXmlSplitLoader(filename=input_file, config=self.config,
                                                              use_temp_files=use_temp_files, num_docs=num_docs)
+                if input_file != "NA":
+                    # progress of the run is recorded, so that it can be resumed if interrupted
+                    run_key = RunManifest.make_key(data_loader.input_manifest(), self.config)
+                    run_manifest = RunManifest(self.config.TEMP_DIR + MANIFEST_FILENAME, run_key, resume=resume)
+                    data_loader.run_manifest = run_manifest
             else:
-                data_loader = loader.AbstractsXmlLoader(filename=input_file, config=self.config)
+                data_loader = loader.get_xml_loader(input_file, config=self.config)
         else:
             custom_input_parser = input_parser.AbstractsParser()
-            data_loader = loader.AbstractsTextLoader(input_file, config=self.config, parser=custom_input_parser)
+            if large_file:
+                data_loader = loader.AbstractsTextSplitLoader(input_file, config=self.config,
+                                                              parser=custom_input_parser,
+                                                              use_temp_files=use_temp_files, num_docs=num_docs)
+            else:
+                data_loader = loader.AbstractsTextLoader(input_file, config=self.config, parser=custom_input_parser)
 
         if large_file:
-            self._process_large_file(data_loader, output_file, out_format, collate, vectorized_file, use_h2o, h2o_url)
-        else:
-            # smaller datasets can be processed using pandas data frame and any in-memory vectorizer
-            self._process_normal_file(data_loader, output_file, out_format, collate)
-
-    def _process_large_file(self, data_loader, output_file, out_format, collate, vectorized_file, use_h2o, h2o_url):
-        """stream data from temporary files to a hashing vectorizer to reduce memory overload
+            return self._process_large_file(data_loader, output_file, out_format, collate, vectorized_file, use_h2o,
+                                            h2o_url, save_model=save_model, membership_db=membership_db,
+                                            run_manifest=run_manifest, backend=backend)
+        # smaller datasets can be processed using pandas data frame and any in-memory vectorizer
+        return self._process_normal_file(data_loader, output_file, out_format, collate, save_model=save_model,
+                                         membership_db=membership_db, backend=backend, h2o_url=h2o_url)
+
+    def _process_large_file(self, data_loader, output_file, out_format, collate, vectorized_file, use_h2o, h2o_url,
+                            save_model=None, membership_db=None, run_manifest=None, backend="sklearn"):
+        """stream data from temporary files to a hashing vectorizer to reduce memory overload. with a run manifest,
+        vectorize and cluster results are checkpointed; stages completed by an interrupted run are skipped on resume
             Input:
                 :parameter data_loader: loader object
                 :parameter output_file: fully qualified path of output file
                 :parameter collate: flag to collate results
                 :parameter vectorized_file: file containing features extracted from source data
                 :parameter use_h2o: flag to indicate if processing should be delegated to H2O server cluster
+                :parameter save_model: fully qualified name of model file to be saved
+                :parameter membership_db: fully qualified name of cluster membership database to be saved
+                :parameter run_manifest: RunManifest of the run. default - None(no checkpoints)
+                :parameter backend: clustering backend, see process. default - sklearn
 
-            :rtype None"""
+            :returns # documents clustered
+            :rtype int"""
 
         cluster_kw = None
         vectorized_data_dict = {}
+        completed_run = run_manifest.completed_stage("export") if run_manifest else None
+        if completed_run and completed_run['output_file'] == output_file:
+            logging.info("run is already complete. see {0}".format(output_file))
+            return completed_run['num_docs']
+
         # form fully qualified path of feature_file
         if vectorized_file:
             vectorized_file_fullname = self.config.VECTORIZED_FILES_DIR + vectorized_file
             if os.path.lexists(vectorized_file_fullname):
                 # skip data loading and load pre-vectorized data and vectorizer
                 logging.info("skipping data loading and vectorizing steps")
-                with open(vectorized_file_fullname, 'rb') as filehandle:
-                    vectorized_data_dict = pickle.load(filehandle)
-                    vectorized_data = vectorized_data_dict['data']
-                    pmid_list = vectorized_data_dict['labels']
-                    feature_extractor = vectorized_data_dict['feature_extractor']
-                logging.info("loaded vectorized data from {0}".format(vectorized_file_fullname))
+                vectorized_data_dict = self._load_vectorized(vectorized_file_fullname)
+                vectorized_data = vectorized_data_dict['data']
+                pmid_list = vectorized_data_dict['labels']
+                feature_extractor = vectorized_data_dict['feature_extractor']
+                duplicates = vectorized_data_dict.get('duplicates')
         else:
-            # load and stream input data
-            logging.info("large file detected..streaming input data")
-            total_docs, temp_data_files = data_loader.load_(as_="files")
-            datastreamer_obj = data_streamer.DataStreamer(temp_data_files)
-            pmid_list = datastreamer_obj.doc_id_list
-
-            # use Hashing or tf-idf vectorizer to transform data
-            logging.info("transforming text - with {0} vectorizer".format(self.config.VECTORIZER))
-            feature_extractor = features.FeatureExtractor(vectorizer_type=self.config.VECTORIZER, config=self.config)
-            feature_extractor.vectorizer = self.config.VECTORIZER
-            vectorized_data = feature_extractor.vectorize_text([datastreamer_obj]*total_docs)
-
-            # pickle the vectorized data and vectorizer to be re-used
-            vectorized_file_fullname = self.config.VECTORIZED_FILES_DIR + \
-                                       "vectorized_{0}_".format(self.config.VECTORIZER) + \
-                                       str(datetime.now().time()).replace(":", ".")
-            vectorized_data_dict['data'] = vectorized_data
-            vectorized_data_dict['labels'] = pmid_list
-            vectorized_data_dict['feature_extractor'] = feature_extractor
-            with open(vectorized_file_fullname, 'wb') as filehandle:
-                pickle.dump(vectorized_data_dict, filehandle)
-            logging.info("saved vectorized data and vectorizer to {0}".format(vectorized_file_fullname))
-
-            # cluster transformed data
-        logging.info("clustering begins")
-        cluster_mgr = cluster.Cluster(config=self.config)
-        if use_h2o:
-            logging.info("clustering using H2O server")
-            # override H2O server URL in config
-            if h2o_url:
-                server_url = h2o_url
+            checkpoint = run_manifest.completed_stage("vectorize") if run_manifest else None
+            if checkpoint:
+                vectorized_file_fullname = checkpoint['vectorized_file']
+            else:
+                vectorized_file_fullname = self.config.VECTORIZED_FILES_DIR + \
+                                           "vectorized_{0}_".format(self.config.VECTORIZER) + \
+                                           str(datetime.now().time()).replace(":", ".")
+            cache = None
+            cached_data = None
+            if self.config.VECTOR_CACHE:
+                # vectorized data is cached by input data and feature extraction config
+                cache = vector_cache.VectorCache(self.config.VECTORIZED_FILES_DIR + "cache",
+                                                 budget=self.config.VECTOR_CACHE_MB * 1024 * 1024)
+                cache_key = cache.make_key(data_loader.manifest(), self.config)
+                cached_data = cache.get(cache_key)
+            elif checkpoint:
+                # vectorized data pickled by the interrupted run
+                cached_data = self._load_vectorized(vectorized_file_fullname)
+
+            if cached_data:
+                logging.info("skipping data loading and vectorizing steps")
+                vectorized_data = cached_data['data']
+                pmid_list = cached_data['labels']
+                feature_extractor = cached_data['feature_extractor']
+                duplicates = cached_data.get('duplicates')
             else:
-                server_url = self.config.H2O_SERVER_URL
-            cluster_ids = cluster_mgr.do_h2o_kmeans(vectorized_data, server_url=server_url)
+                vectorized_data, pmid_list, feature_extractor, duplicates = self._vectorize(data_loader,
+                                                                                            vectorized_file_fullname)
+                with instrumentation.stage("save_vectors"):
+                    if cache:
+                        cached_data = cache.put(cache_key, vectorized_data, pmid_list, feature_extractor,
+                                                duplicates=duplicates)
+                        vectorized_data = cached_data['data']
+                        pmid_list = cached_data['labels']
+                    else:
+                        # pickle the vectorized data and vectorizer to be re-used
+                        vectorized_data_dict['data'] = vectorized_data
+                        vectorized_data_dict['labels'] = pmid_list
+                        vectorized_data_dict['feature_extractor'] = feature_extractor
+                        vectorized_data_dict['duplicates'] = duplicates
+                        with open(vectorized_file_fullname, 'wb') as filehandle:
+                            pickle.dump(vectorized_data_dict, filehandle)
+                        logging.info("saved vectorized data and vectorizer to {0}".format(vectorized_file_fullname))
+
+            if run_manifest is not None and not checkpoint:
+                if cache:
+                    artifacts = [cache.entry_path(cache_key)]
+                else:
+                    artifacts = [vectorized_file_fullname]
+                    if isinstance(vectorized_data, sparse_store.SparseBlocks):
+                        artifacts.append(vectorized_data.directory)
+                run_manifest.complete_stage("vectorize", artifacts, vectorized_file=vectorized_file_fullname)
+
+        checkpoint = run_manifest.completed_stage("cluster") if run_manifest else None
+        if checkpoint:
+            cluster_ids, cluster_mgr = self._load_clusters(checkpoint['clusters_file'], checkpoint['cluster_ids_file'])
         else:
-            logging.info("clustering using scikit-learn")
-            cluster_ids = cluster_mgr.do_minibatch_kmeans(vectorized_data)
-        logging.info("clustering complete..gathering output")
-
-        # merge cluster id of each document with its permalink id
-        out_list = list(zip(cluster_ids, [pmid for pmid in pmid_list]))
-        output_df = pandas.DataFrame.from_records(out_list, index=numpy.arange(len(out_list)))
-        output_df.columns = ['cluster_id', 'permalink']
+            # cluster transformed data
+            logging.info("clustering begins")
+            cluster_mgr = cluster.Cluster(config=self.config)
+            vectorized_data = self._reduce(vectorized_data, cluster_mgr,
+                                           output_file=vectorized_file_fullname + "_reduced.npy")
+            # h2o_url overrides the H2O server URL in config
+            cluster_ids = BACKENDS.get(backend)(cluster_mgr, vectorized_data,
+                                                labels_file=vectorized_file_fullname + "_labels", large_file=True,
+                                                server_url=h2o_url)
+            logging.info("clustering complete..gathering output")
+
+            # cluster id of each document lines up with its permalink id in pmid_list; output is exported in chunks
+            cluster_ids = numpy.asarray(cluster_ids).ravel()
+            # models fitted by H2O live on the H2O server and can not be checkpointed
+            if run_manifest is not None and not use_h2o:
+                clusters_file = vectorized_file_fullname + "_clusters.pkl"
+                cluster_ids_file = vectorized_file_fullname + "_cluster_ids.npy"
+                self._save_clusters(clusters_file, cluster_ids_file, cluster_mgr, cluster_ids)
+                run_manifest.complete_stage("cluster", [clusters_file, cluster_ids_file], clusters_file=clusters_file,
+                                            cluster_ids_file=cluster_ids_file)
+        if duplicates is not None:
+            # near-duplicates removed before vectorizing join the cluster of their representative
+            pmid_list, cluster_ids = dedup.propagate_labels(pmid_list, cluster_ids, duplicates)
+        self._save_model(save_model, membership_db, feature_extractor, cluster_mgr, pmid_list, cluster_ids)
 
         if self.config.GEN_KW:
-            cluster_kw = cluster_mgr.get_top_cluster_terms(feature_extractor.get_features(),
-                                                           num_terms=self.config.NTERMS)
-        self._gen_output_file(output_file, output_df, out_format, keywords=cluster_kw, kw_df=self.config.GEN_KW,
-                              collate=collate)
+            with instrumentation.stage("keywords"):
+                cluster_kw = cluster_mgr.get_top_cluster_terms(feature_extractor.get_features(),
+                                                               num_terms=self.config.NTERMS)
+        self._gen_output_file(output_file, cluster_ids, pmid_list, out_format, keywords=cluster_kw,
+                              kw_df=self.config.GEN_KW, collate=collate)
+        if run_manifest is not None:
+            run_manifest.complete_stage("export", [output_file], output_file=output_file, num_docs=len(cluster_ids))
+        return len(cluster_ids)
+
+    @staticmethod
+    def _load_vectorized(filename):
+        """load vectorized data, PMIDs and vectorizer pickled by _process_large_file
 
-    def _process_normal_file(self, data_loader, output_file, out_format, collate):
+            :returns dict with keys data, labels, feature_extractor
+            :rtype dict"""
+
+        with open(filename, 'rb') as filehandle:
+            vectorized_data_dict = pickle.load(filehandle)
+        logging.info("loaded vectorized data from {0}".format(filename))
+        return vectorized_data_dict
+
+    def _save_clusters(self, clusters_file, cluster_ids_file, cluster_mgr, cluster_ids):
+        """checkpoint a fitted clustering model(and reducer) and the cluster id of each document"""
+
+        numpy.save(cluster_ids_file, cluster_ids)
+        with open(clusters_file, 'wb') as filehandle:
+            pickle.dump({'model': cluster_mgr.model, 'svd': cluster_mgr.svd}, filehandle)
+
+    def _load_clusters(self, clusters_file, cluster_ids_file):
+        """load a clustering checkpoint saved by _save_clusters
+
+            :returns cluster ids and Cluster object holding the fitted model and reducer
+            :rtype tuple"""
+
+        cluster_mgr = cluster.Cluster(config=self.config)
+        with open(clusters_file, 'rb') as filehandle:
+            checkpoint = pickle.load(filehandle)
+        cluster_mgr.model = checkpoint['model']
+        cluster_mgr.svd = checkpoint['svd']
+        logging.info("loaded clustering results from {0}".format(clusters_file))
+        return numpy.load(cluster_ids_file), cluster_mgr
+
+    @staticmethod
+    def _save_model(save_model, membership_db, feature_extractor, cluster_mgr, permalinks, cluster_ids):
+        """save fitted vectorizer and clustering model and/or cluster membership of each PMID, if requested"""
+
+        if save_model:
+            with instrumentation.stage("save_model"):
+                bundle.save_model(save_model, feature_extractor, cluster_mgr)
+            logging.info("saved model to {0}".format(save_model))
+        if membership_db:
+            with instrumentation.stage("save_membership") as record, MembershipStore(membership_db) as store:
+                num_pmids = store.assign(permalinks, cluster_ids)
+                if record:
+                    record.docs = num_pmids
+            logging.info("saved cluster membership of {0} PMIDs to {1}".format(num_pmids, membership_db))
+
+    @instrumentation.instrument("vectorize", count=lambda result: len(result[1]))
+    def _vectorize(self, data_loader, vectorized_file_fullname):
+        """load and stream input data to a vectorizer. if dedup is set, near-duplicate documents are removed before
+        vectorizing(see data.extract.dedup)
+            Input:
+                :parameter data_loader: loader object
+                :parameter vectorized_file_fullname: fully qualified path prefix of vectorized data files
+
+            :returns term document matrix(in-memory or vectorized blocks), PMIDs of its rows, feature extractor and
+                     removed duplicates(None if dedup is not set)
+            :rtype tuple"""
+
+        logging.info("large file detected..streaming input data")
+        _, temp_data_files = data_loader.load_(as_="files")
+        duplicates = None
+        if self.config.DEDUP:
+            with instrumentation.stage("dedup") as record:
+                deduplicator = dedup.Deduplicator(self.config, self.config.TEMP_DIR + "dedup")
+                temp_data_files, duplicates = deduplicator.deduplicate_shards(temp_data_files)
+                if record:
+                    record.docs = len(duplicates['positions'])
+
+        # use Hashing or tf-idf vectorizer to transform data
+        logging.info("transforming text - with {0} vectorizer".format(self.config.VECTORIZER))
+        feature_extractor = features.FeatureExtractor(vectorizer_type=self.config.VECTORIZER, config=self.config)
+        feature_extractor.vectorizer = self.config.VECTORIZER
+        if self.config.VECTORIZER in ("tfidf-streaming", "hashing"):
+            # vectorize temp files in parallel; term-document matrix is saved block by block next to the pickled
+            # vectorizer
+            vectorized_data = feature_extractor.vectorize_shards(temp_data_files,
+                                                                 output_dir=vectorized_file_fullname + "_blocks")
+            pmid_list = vectorized_data.labels
+        else:
+            datastreamer_obj = data_streamer.DataStreamer(temp_data_files, prefetch=self.config.STREAM_PREFETCH,
+                                                          memory_budget=self.config.STREAM_MEMORY_MB * 1024 * 1024)
+            pmid_list = datastreamer_obj.doc_id_list
+            vectorized_data = feature_extractor.vectorize_text(datastreamer_obj.texts())
+        return vectorized_data, pmid_list, feature_extractor, duplicates
+
+    def _reduce(self, vectorized_data, cluster_mgr, output_file=None):
+        """project vectorized data onto features.dimension dense columns(LSA) if features.reduction is set. the fitted
+        reducer is handed over to cluster_mgr so that cluster centroids can be mapped back to terms
+            Input:
+                :parameter vectorized_data: vectorized blocks or in-memory term document matrix
+                :parameter cluster_mgr: Cluster object
+                :parameter output_file: fully qualified name of .npy file to write the projection to
+
+            :returns reduced data or vectorized_data if reduction is disabled"""
+
+        if not self.config.REDUCTION:
+            return vectorized_data
+        logging.info("reducing vectorized data to {0} dimensions".format(self.config.DIM))
+        reducer = reduction.Reducer(self.config)
+        with instrumentation.stage("reduce") as record:
+            reduced_data = reducer.fit_transform(vectorized_data, output_file=output_file)
+            if record:
+                record.docs = reduced_data.shape[0]
+        cluster_mgr.svd = reducer
+        return reduced_data
+
+    def _process_normal_file(self, data_loader, output_file, out_format, collate, save_model=None, membership_db=None,
+                             backend="sklearn", h2o_url=None):
         """load data into pandas dataframe and use in-memory tf-idf vectorizer to process data
             Input:
                 :parameter data_loader: loader object
                 :parameter output_file: fully qualified path of output file
                 :parameter collate: flag to collate results
+                :parameter save_model: fully qualified name of model file to be saved
+                :parameter membership_db: fully qualified name of cluster membership database to be saved
+                :parameter backend: clustering backend, see process. default - sklearn
+                :parameter h2o_url: URL of the H2O server used by the h2o backend. default - None(h2o.server.url)
 
-            :rtype None"""
+            :returns # documents clustered
+            :rtype int"""
 
         cluster_kw = None
         # load input file into a pandas data frame
@@ -171,13 +407,15 @@ class PubMed:
         feature_extractor.vectorizer = self.config.VECTORIZER
         vectorized_data = feature_extractor.vectorize_text(input_dataframe['content'])
 
-        # write vectorized text to file
-        numpy.save(self.config.TEMP_DIR + "vectorized_text", vectorized_data.todense())
+        # write vectorized text to file as CSR components; see sparse_store.load_csr
+        with instrumentation.stage("save_vectors"):
+            sparse_store.save_csr(self.config.TEMP_DIR + "vectorized_text", vectorized_data)
+        logging.info("saved vectorized text to {0}".format(self.config.TEMP_DIR + "vectorized_text"))
 
         # cluster transformed data
         logging.info("clustering begins")
         cluster_mgr = cluster.Cluster(config=self.config)
-        cluster_ids = cluster_mgr.do_kmeans(vectorized_data)
+        cluster_ids = BACKENDS.get(backend)(cluster_mgr, self._reduce(vectorized_data, cluster_mgr), server_url=h2o_url)
         logging.info("clustering complete..gathering output")
 
         # extract clustering output
@@ -185,37 +423,57 @@ class PubMed:
         output_df = output_df.join(input_dataframe['permalink'])
         output_df.columns = ['cluster_id', 'permalink']
 
+        cluster_ids = output_df['cluster_id'].to_numpy()
+        permalinks = output_df['permalink'].to_numpy()
+        self._save_model(save_model, membership_db, feature_extractor, cluster_mgr, permalinks, cluster_ids)
+
         if self.config.GEN_KW:
-            cluster_kw = cluster_mgr.get_top_cluster_terms(feature_extractor.get_features(),
-                                                           num_terms=self.config.NTERMS)
-        self._gen_output_file(output_file, output_df, out_format, keywords=cluster_kw, kw_df=self.config.GEN_KW,
-                              collate=collate)
-
-    def _gen_output_file(self, output_file, output_df, out_format, keywords=None, kw_df=False, collate=False):
-        """generate output file by exporting dataframe(s)
-            cluster membership dataframe is exported by default. optionally cluster keywords dataframe is also exported
+            with instrumentation.stage("keywords"):
+                cluster_kw = cluster_mgr.get_top_cluster_terms(feature_extractor.get_features(),
+                                                               num_terms=self.config.NTERMS)
+        self._gen_output_file(output_file, cluster_ids, permalinks, out_format, keywords=cluster_kw,
+                              kw_df=self.config.GEN_KW, collate=collate)
+        return len(cluster_ids)
+
+    def _gen_output_file(self, output_file, cluster_ids, permalinks, out_format, keywords=None, kw_df=False,
+                         collate=False):
+        """generate output file by exporting cluster membership chunk by chunk(see export_results.export_chunks)
+            cluster membership is exported by default. optionally cluster keywords are also exported
             Input:
                 :parameter output_file: fully qualified path of output file
-                :parameter output_df: dataframe containing cluster membership
-                :parameter out_format: format of output file - csv or xlsx
+                :parameter cluster_ids: cluster id of each document
+                :parameter permalinks: permalink id(PMID) of each document
+                :parameter out_format: format of output file - csv, xlsx or parquet
                 :parameter keywords: list of cluster keywords(centroids)
                 :parameter kw_df: flag to indicate if cluster keyword dataframe should be exported
                 :parameter collate: flag to indicate if results should be collated
 
             :rtype None"""
 
-        if collate:
-            base_url = self.config.PERMALINK_URL
-            num_clusters = self.config.NCLUSTERS
-            output_df = collate_(output_df, base_url, num_clusters)
+        extra_sheets = []
         if kw_df:
             if not keywords:
                 raise ValueError("param keywords is None; required to generate top cluster keywords dataframe")
-            cluster_kw_df = pandas.DataFrame(keywords, columns=['cluster keywords'])
-            export_dataframe(output_file, output_df, cluster_kw_df, format=out_format,
-                             sheet_names=['clusters', 'cluster keywords'], indices=[False, False])
+            extra_sheets.append(('cluster keywords', pandas.DataFrame(keywords, columns=['cluster keywords'])))
+
+        if collate:
+            pages = collate_results.iter_collated(cluster_ids, permalinks, self.config.PERMALINK_URL,
+                                                  self.config.NCLUSTERS, page_size=self.config.COLLATE_PAGE_SIZE)
+            chunks = export_results.chunk_records(collate_results.COLLATED_COLUMNS, pages,
+                                                  chunk_size=self.config.EXPORT_CHUNK)
+            num_rows = None
         else:
-            export_dataframe(output_file, output_df, format=out_format, sheet_names=['clusters'], indices=[False])
+            chunks = export_results.chunk_arrays(['cluster_id', 'permalink'], [cluster_ids, permalinks],
+                                                 chunk_size=self.config.EXPORT_CHUNK)
+            num_rows = len(cluster_ids)
+        with instrumentation.stage("export") as record:
+            num_rows = export_results.export_chunks(output_file, chunks, out_format=out_format,
+                                                    partition_by='cluster_id' if self.config.PARTITION_CLUSTERS
+                                                    else None, num_rows=num_rows,
+                                                    overflow=self.config.XLSX_OVERFLOW, extra_sheets=extra_sheets)
+            if record:
+                record.docs = len(cluster_ids)
+        logging.info("exported {0} rows".format(num_rows))
         logging.info("Processing complete. check output file for clustering results")
 
 
@@ -226,9 +484,10 @@ if __name__ == "__main__":
     parser.add_argument('input_file', help="fully qualified name of file containing PubMed articles")
     parser.add_argument('output_file', help="fully qualified name of clustering output file(.xslx) to be generated")
     parser.add_argument('-i', required=True, help="file format - xml or txt", choices=['xml', 'txt'])
-    parser.add_argument('-o', required=True, help="file format - xlsx or csv", choices=['csv', 'xlsx'])
-    parser.add_argument('--num-docs', default=0, help="# of documents in input file. required if --use-temp-files flag "
-                                                      "is set or clustering should be restricted to subset of input")
+    parser.add_argument('-o', required=True, help="file format - xlsx, csv or parquet(requires pyarrow)",
+                        choices=EXPORTERS.names())
+    parser.add_argument('--num-docs', default=0, help="# of documents in input file. optional; only used to restrict "
+                                                      "clustering to a subset of input")
     parser.add_argument('--config-file', help="fully qualified path of config file")
     parser.add_argument('--vectorized-file', default=None, help="name of features file to be used as input to cluster")
     parser.add_argument('--large-file', action='store_true', default=False,
@@ -240,10 +499,20 @@ if __name__ == "__main__":
     parser.add_argument("--use-h2o", action='store_true', default=False,
                         help="set this flag if processing should be done using H2O server cluster")
     parser.add_argument("--h2o-url", default=None, help="URL of the H2O server to connect")
+    parser.add_argument("--backend", default="sklearn", choices=BACKENDS.names(),
+                        help="clustering backend - sklearn(in process), sharded(pool of worker processes; see "
+                             "sharded.process.count) or h2o(same as --use-h2o)")
+    parser.add_argument("--save-model", default=None,
+                        help="fully qualified name of file to save the fitted vectorizer and clustering model to")
+    parser.add_argument("--membership-db", default=None,
+                        help="fully qualified name of sqlite database to save cluster membership of PMIDs to")
+    parser.add_argument("--resume", action='store_true', default=False,
+                        help="set this flag to resume an interrupted --large-file run from its run manifest")
     args = parser.parse_args()
 
     pm_handler = PubMed(config_file=args.config_file)
     pm_handler.process(input_file=args.input_file, in_format=args.i, output_file=args.output_file, out_format=args.o,
                        num_docs=int(args.num_docs), vectorized_file=args.vectorized_file,
                        large_file=args.large_file, use_temp_files=args.use_temp_files, collate=args.collate,
-                       use_h2o=args.use_h2o, h2o_url=args.h2o_url)
+                       use_h2o=args.use_h2o, h2o_url=args.h2o_url, save_model=args.save_model,
+                       membership_db=args.membership_db, resume=args.resume, backend=args.backend)
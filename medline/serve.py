@@ -0,0 +1,183 @@
+# date: 17-Oct-2026
+# local HTTP service that classifies abstracts with a saved model
+
+from medline.model.classifier import ClusterClassifier
+from medline.utils.configuration import Config
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import argparse
+import json
+import logging
+import queue
+import socketserver
+import threading
+import time
+
+
+class MicroBatcher:
+    """run a batch function over items submitted by many threads. requests that arrive within max_delay(seconds) of
+    the first waiting request are merged into a single call of function, up to max_batch items; a request larger than
+    max_batch is run on its own"""
+
+    def __init__(self, function, max_batch=256, max_delay=0.005):
+        self.function = function
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.requests = queue.Queue()
+        self.worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self.worker.start()
+
+    def submit(self, items):
+        """run function over items as part of a batch; blocks until the batch is done
+
+            :returns results for items, in order
+            :rtype list"""
+
+        request = _Request(items)
+        self.requests.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def close(self):
+        self.requests.put(None)
+        self.worker.join()
+
+    def _run(self):
+        stopped = False
+        while not stopped:
+            request = self.requests.get()
+            if request is None:
+                break
+            batch = [request]
+            num_items = len(request.items)
+            deadline = time.monotonic() + self.max_delay
+            while num_items < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self.requests.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if request is None:
+                    stopped = True
+                    break
+                batch.append(request)
+                num_items += len(request.items)
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        try:
+            results = self.function([item for request in batch for item in request.items])
+            start = 0
+            for request in batch:
+                request.result = results[start:start + len(request.items)]
+                start += len(request.items)
+        except Exception as error:
+            for request in batch:
+                request.error = error
+        for request in batch:
+            request.done.set()
+
+
+class _Request:
+    def __init__(self, items):
+        self.items = items
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class ClassifyHandler(BaseHTTPRequestHandler):
+    """POST /classify with a json body {"texts": [abstract, ...]} or a MEDLINE xml body(Content-Type: application/xml
+    or text/xml); responds with {"results": [{"cluster_id", "terms"[, "pmid"]}, ...]}. GET /health responds with the
+    # of clusters. server.classifier and server.batcher are set by make_server"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path != "/health":
+            self._send_json(404, {'error': "not found"})
+            return
+        self._send_json(200, {'status': "ok", 'clusters': self.server.classifier.num_clusters})
+
+    def do_POST(self):
+        if self.path != "/classify":
+            self._send_json(404, {'error': "not found"})
+            return
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        try:
+            if self.headers.get('Content-Type', "").split(";")[0].strip() in ("application/xml", "text/xml"):
+                # xml documents are parsed by the handler thread; only vectorizing and prediction are batched
+                documents = list(self.server.classifier.xml_loader.iter_documents_from(body))
+                results = self.server.batcher.submit([document['content'] for document in documents])
+                for document, result in zip(documents, results):
+                    result['pmid'] = document.get('permalink')
+            else:
+                texts = json.loads(body.decode('utf-8'))['texts']
+                if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+                    raise ValueError("texts must be a list of strings")
+                results = self.server.batcher.submit(texts)
+        except (ValueError, KeyError, TypeError) as error:
+            self._send_json(400, {'error': str(error)})
+            return
+        self._send_json(200, {'results': results})
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', "application/json")
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.info("%s - %s", self.address_string(), format % args)
+
+
+class ClassifyServer(socketserver.ThreadingMixIn, HTTPServer):
+    """threading HTTP server(1 thread per request); holds the classifier and micro-batcher used by ClassifyHandler"""
+
+    daemon_threads = True
+    # default listen backlog(5) drops connections of concurrent clients, which then wait for a SYN retransmit(1s)
+    request_queue_size = 128
+
+
+def make_server(classifier, host, port, max_batch=256, max_delay=0.005):
+    """create a threading HTTP server around classifier; call serve_forever to start serving and server.batcher.close
+    after shutdown
+
+        :rtype ClassifyServer"""
+
+    server = ClassifyServer((host, port), ClassifyHandler)
+    server.classifier = classifier
+    server.batcher = MicroBatcher(classifier.classify, max_batch=max_batch, max_delay=max_delay)
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="classify abstracts with a saved model over HTTP",
+                                     usage="serve model_file [--host host] [--port #]")
+    parser.add_argument('model_file', help="fully qualified name of model file saved by pubmed --save-model")
+    parser.add_argument('--config-file', help="fully qualified path of config file")
+    parser.add_argument('--host', default="127.0.0.1", help="address to listen on. default - 127.0.0.1")
+    parser.add_argument('--port', type=int, default=None, help="port to listen on. default - service.port in config")
+    args = parser.parse_args()
+
+    config = Config(config_file=args.config_file)
+    logging.getLogger().handlers = []
+    logging.basicConfig(format='%(asctime)s::%(levelname)s::%(message)s', level=logging.INFO,
+                        filename=config.LOG_DIR + config.LOGFILE)
+
+    http_server = make_server(ClusterClassifier(args.model_file, config), args.host, args.port or config.SERVICE_PORT,
+                              max_batch=config.SERVICE_BATCH, max_delay=config.SERVICE_DELAY_MS / 1000.0)
+    logging.info("serving on {0}:{1}".format(*http_server.server_address))
+    try:
+        http_server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        http_server.server_close()
+        http_server.batcher.close()
@@ -0,0 +1,96 @@
+# date: 17-Oct-2026
+# incremental update: assign citations of PubMed update files to the clusters of a saved model
+
+from medline.data.load import loader
+from medline.model.bundle import load_model, save_model
+from medline.utils.configuration import Config
+from medline.utils.membership import MembershipStore
+
+import argparse
+import logging
+import time
+
+
+class PubMedUpdate:
+    """apply PubMed update files(updatefiles) to an existing clustering without re-clustering the corpus. new and
+    revised citations are vectorized with the saved feature extractor and assigned to the nearest cluster centroid;
+    deleted citations are removed from the membership store. the model and membership store are created by
+    pubmed.py --save-model --membership-db"""
+
+    def __init__(self, config_file):
+        # load configuration file
+        self.config = Config(config_file=config_file)
+
+        log_file = self.config.LOG_DIR + self.config.LOGFILE
+        logging.getLogger().handlers = []
+        logging.basicConfig(format='%(asctime)s::%(levelname)s::%(message)s', level=logging.INFO, filename=log_file)
+
+    def process(self, update_files, model_file, membership_db, partial_fit=False):
+        """apply update files in the given order
+            Parameters:
+                update_files: fully qualified names of update files(.xml or compressed .xml.gz)
+                model_file: fully qualified name of model file saved by pubmed.py --save-model
+                membership_db: fully qualified name of membership database saved by pubmed.py --membership-db
+                partial_fit: flag to move cluster centroids towards the new citations(mini-batch k-means models only);
+                             the updated model is saved back to model_file
+
+            :returns # of PMIDs assigned and # of PMIDs deleted
+            :rtype tuple"""
+
+        feature_extractor, cluster_mgr = load_model(model_file, self.config)
+        if partial_fit and not hasattr(cluster_mgr.model, 'partial_fit'):
+            raise ValueError("partial_fit is supported only by mini-batch k-means models")
+        logging.info("loaded model from {0}".format(model_file))
+
+        num_assigned, num_deleted = 0, 0
+        with MembershipStore(membership_db) as store:
+            for update_file in update_files:
+                start_time = time.time()
+                update_loader = loader.AbstractsXmlUpdateLoader(update_file, config=self.config)
+                batch = []
+                for _, document in update_loader.iter_documents():
+                    if document.get('permalink'):
+                        batch.append(document)
+                    if len(batch) >= self.config.BATCHSIZE:
+                        num_assigned += self._assign(batch, feature_extractor, cluster_mgr, store, partial_fit)
+                        batch = []
+                if batch:
+                    num_assigned += self._assign(batch, feature_extractor, cluster_mgr, store, partial_fit)
+                num_deleted += store.delete(update_loader.deleted_pmids())
+                logging.info("applied {0} in {1:.1f}s".format(update_file, time.time() - start_time))
+
+        if partial_fit:
+            save_model(model_file, feature_extractor, cluster_mgr)
+            logging.info("saved updated model to {0}".format(model_file))
+        logging.info("update complete. assigned {0} PMIDs, deleted {1} PMIDs".format(num_assigned, num_deleted))
+        return num_assigned, num_deleted
+
+    @staticmethod
+    def _assign(documents, feature_extractor, cluster_mgr, store, partial_fit):
+        """vectorize a batch of documents and assign them to their nearest clusters"""
+
+        vectorized_data = feature_extractor.transform_text([document['content'] for document in documents])
+        if cluster_mgr.svd is not None:
+            vectorized_data = cluster_mgr.svd.transform(vectorized_data)
+        if partial_fit:
+            cluster_mgr.model.partial_fit(vectorized_data)
+        cluster_ids = cluster_mgr.model.predict(vectorized_data)
+        return store.assign([document['permalink'] for document in documents], cluster_ids)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="assign citations of PubMed update files to existing clusters",
+                                     usage="update model_file membership_db update_file [update_file ...] "
+                                           "[--partial-fit]")
+    parser.add_argument('model_file', help="fully qualified name of model file saved by pubmed --save-model")
+    parser.add_argument('membership_db', help="fully qualified name of membership database saved by pubmed "
+                                              "--membership-db")
+    parser.add_argument('update_files', nargs='+', help="fully qualified names of update files, applied in order")
+    parser.add_argument('--config-file', help="fully qualified path of config file")
+    parser.add_argument('--partial-fit', action='store_true', default=False,
+                        help="set this flag to move cluster centroids towards new citations(mini-batch k-means only)")
+    args = parser.parse_args()
+
+    update_handler = PubMedUpdate(config_file=args.config_file)
+    update_handler.process(args.update_files, model_file=args.model_file, membership_db=args.membership_db,
+                           partial_fit=args.partial_fit)
@@ -2,24 +2,91 @@
 # date: 19-Feb-2017
 # collate documents per cluster and return a dataframe with 1 row per cluster
 
+import csv
+import urllib.parse
+
+import numpy
 import pandas
-import urllib
+
+COLLATED_COLUMNS = ['cluster_id', 'page', 'clickable content']
+
+
+def group_by_cluster(cluster_ids, num_clusters):
+    """group documents by cluster id in a single pass over the cluster labels
+        Input:
+            :parameter cluster_ids: cluster id of each document
+            :parameter num_clusters: # of clusters
+        Output:
+            :returns order, bounds - positions of the documents of cluster c are order[bounds[c]:bounds[c + 1]], in
+                     input order
+            :rtype tuple
+            :raises ValueError"""
+
+    cluster_ids = numpy.asarray(cluster_ids, dtype=numpy.int64)
+    if len(cluster_ids) and (cluster_ids.min() < 0 or cluster_ids.max() >= num_clusters):
+        raise ValueError("cluster ids must be in the range 0..{0}".format(num_clusters - 1))
+    order = numpy.argsort(cluster_ids, kind='stable')
+    bounds = numpy.zeros(num_clusters + 1, dtype=numpy.int64)
+    numpy.cumsum(numpy.bincount(cluster_ids, minlength=num_clusters), out=bounds[1:])
+    return order, bounds
+
+
+def iter_collated(cluster_ids, permalinks, base_url, num_clusters, page_size=200):
+    """yield collated cluster output one page at a time. the PMIDs of each cluster are split into pages of at most
+    page_size PMIDs; each page is a single NCBI search URL. clusters without documents get 1 page with no search terms
+        Input:
+            :parameter cluster_ids: cluster id of each document
+            :parameter permalinks: PMID of each document; missing PMIDs are skipped
+            :parameter base_url: NCBI search URL
+            :parameter num_clusters: # of clusters
+            :parameter page_size: max # of PMIDs per search URL
+        Output:
+            :returns <cluster_id, page, url> tuples ordered by cluster id and page
+            :rtype generator
+            :raises ValueError"""
+
+    if page_size < 1:
+        raise ValueError("invalid page size. must be a positive integer")
+    num_clusters = int(num_clusters)
+    permalinks = numpy.asarray(permalinks, dtype=object)
+    order, bounds = group_by_cluster(cluster_ids, num_clusters)
+    for cluster_id in range(num_clusters):
+        members = permalinks[order[bounds[cluster_id]:bounds[cluster_id + 1]]]
+        search_terms = [str(pmid) for pmid in members[pandas.notna(members)]]
+        if not search_terms:
+            yield cluster_id, 0, base_url
+            continue
+        for page, start in enumerate(range(0, len(search_terms), page_size)):
+            yield cluster_id, page, base_url + urllib.parse.quote(" ".join(search_terms[start:start + page_size]))
+
+
+def write_collated(filename, cluster_ids, permalinks, base_url, num_clusters, page_size=200):
+    """stream collated cluster output to a .csv file, 1 row per page; see iter_collated
+        Output:
+            :returns # of rows written
+            :rtype int"""
+
+    num_rows = 0
+    with open(filename, 'w', newline='') as filehandle:
+        writer = csv.writer(filehandle)
+        writer.writerow(COLLATED_COLUMNS)
+        for row in iter_collated(cluster_ids, permalinks, base_url, num_clusters, page_size=page_size):
+            writer.writerow(row)
+            num_rows += 1
+    return num_rows
 
 
-def collate_(input_df, base_url, num_clusters):
-    """collate documents per cluster and return a dataframe with 1 row per cluster
+def collate_(input_df, base_url, num_clusters, page_size=200):
+    """collate documents per cluster and return a dataframe with 1 row per page of each cluster; see iter_collated
         Input:
             :parameter input_df: dataframe containing uncollated cluster output
             :parameter base_url: NCBI search URL
             :parameter num_clusters: # of clusters
+            :parameter page_size: max # of PMIDs per search URL
         Output:
             :returns pandas Dataframe
             :rtype pandas.Dataframe"""
 
-    cluster_urls = []
-    for cluster_id in range(int(num_clusters)):
-        search_terms = pandas.Series(input_df[input_df['cluster_id'] == cluster_id]['permalink']).tolist()
-        full_url = base_url + urllib.parse.quote(" ".join(search_terms))
-        cluster_urls.append(full_url)
-        full_url = ""
-    return pandas.DataFrame(cluster_urls, columns=['clickable content'])
+    return pandas.DataFrame.from_records(iter_collated(input_df['cluster_id'].to_numpy(),
+                                                       input_df['permalink'].to_numpy(), base_url, num_clusters,
+                                                       page_size=page_size), columns=COLLATED_COLUMNS)
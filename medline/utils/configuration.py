@@ -24,6 +24,12 @@ class Config:
         self.MAXDF = None
         self.VERBOSITY = None
         self.INIT_PCNT = None
+        self.STREAM_CLUSTERING = None
+        self.KMEANS_ENGINE = None
+        self.SPHERICAL_TOL = None
+        self.SPHERICAL_CHUNK = None
+        self.SHARDED_PCNT = None
+        self.SHARDED_TOL = None
 
         # feature extraction config params
         self.VECTORIZER = None
@@ -32,6 +38,19 @@ class Config:
         self.DIM = None
         self.NORM = None
         self.VECTORIZED_FILES_DIR = None
+        self.MAX_FEATURES = None
+        self.VECTORIZER_PCNT = None
+        self.STEMMING = None
+        self.STEM_CACHE_SIZE = None
+        self.REDUCTION = None
+        self.REDUCTION_SAMPLE = None
+        self.VECTOR_CACHE = None
+        self.VECTOR_CACHE_MB = None
+        self.DEDUP = None
+        self.DEDUP_PERMUTATIONS = None
+        self.DEDUP_BANDS = None
+        self.DEDUP_SHINGLE_SIZE = None
+        self.DEDUP_SIMILARITY = None
 
         # framework config params
         self.LOG_DIR = None
@@ -40,7 +59,27 @@ class Config:
         self.INFILE_TYPE = None
         self.RECORD_SEP = None
         self.TEMP_DIR = None
+        self.INGEST_PCNT = None
         self.H2O_SERVER_URL = None
+        self.XML_PARSER = None
+        self.THREADED_DECOMPRESSION = None
+        self.TEMP_FILE_FORMAT = None
+        self.STREAM_PREFETCH = None
+        self.STREAM_MEMORY_MB = None
+        self.COLLATE_PAGE_SIZE = None
+        self.SERVICE_PORT = None
+        self.SERVICE_BATCH = None
+        self.SERVICE_DELAY_MS = None
+        self.EXPORT_CHUNK = None
+        self.PARTITION_CLUSTERS = None
+        self.XLSX_OVERFLOW = None
+        self.METRICS_FILE = None
+        self.PROFILE_STAGE = None
+        self.PROFILE_INTERVAL_MS = None
+        self.TEXT_BATCH_SIZE = None
+        self.H2O_EXCHANGE_DIR = None
+        self.H2O_EXPORT_PCNT = None
+        self.H2O_CHUNK = None
 
         # load all config params
         self._load_params()
@@ -84,3 +123,42 @@ class Config:
         self.INIT_PCNT = int(self.cfg_mgr.get('clustering', 'init.process.count'))
         self.VECTORIZED_FILES_DIR = self.cfg_mgr.get('feature-extraction', 'features.pickled.files.directory')
         self.H2O_SERVER_URL = self.cfg_mgr.get('framework', 'h2o.server.url')
+        self.INGEST_PCNT = int(self.cfg_mgr.get('input', 'ingest.process.count'))
+        self.XML_PARSER = self.cfg_mgr.get('input', 'xml.parser.engine')
+        self.THREADED_DECOMPRESSION = bool(int(self.cfg_mgr.get('input', 'decompression.threaded')))
+        self.TEMP_FILE_FORMAT = self.cfg_mgr.get('input', 'temp.file.format')
+        self.STREAM_PREFETCH = int(self.cfg_mgr.get('input', 'streamer.prefetch.count'))
+        self.STREAM_MEMORY_MB = int(self.cfg_mgr.get('input', 'streamer.memory.budget.mb'))
+        self.MAX_FEATURES = int(self.cfg_mgr.get('feature-extraction', 'features.max.count'))
+        self.VECTORIZER_PCNT = int(self.cfg_mgr.get('feature-extraction', 'vectorizer.process.count'))
+        self.STEMMING = bool(int(self.cfg_mgr.get('feature-extraction', 'vectorizer.stemming')))
+        self.STEM_CACHE_SIZE = int(self.cfg_mgr.get('feature-extraction', 'stem.cache.size'))
+        self.STREAM_CLUSTERING = bool(int(self.cfg_mgr.get('clustering', 'clustering.streaming')))
+        self.REDUCTION = bool(int(self.cfg_mgr.get('feature-extraction', 'features.reduction')))
+        self.REDUCTION_SAMPLE = int(self.cfg_mgr.get('feature-extraction', 'reduction.sample.size'))
+        self.COLLATE_PAGE_SIZE = int(self.cfg_mgr.get('output', 'collate.page.size'))
+        self.VECTOR_CACHE = bool(int(self.cfg_mgr.get('feature-extraction', 'vector.cache')))
+        self.VECTOR_CACHE_MB = int(self.cfg_mgr.get('feature-extraction', 'vector.cache.budget.mb'))
+        self.SERVICE_PORT = int(self.cfg_mgr.get('framework', 'service.port'))
+        self.SERVICE_BATCH = int(self.cfg_mgr.get('framework', 'service.batch.size'))
+        self.SERVICE_DELAY_MS = int(self.cfg_mgr.get('framework', 'service.batch.delay.ms'))
+        self.EXPORT_CHUNK = int(self.cfg_mgr.get('output', 'output.chunk.size'))
+        self.PARTITION_CLUSTERS = bool(int(self.cfg_mgr.get('output', 'output.partition.clusters')))
+        self.XLSX_OVERFLOW = self.cfg_mgr.get('output', 'output.xlsx.overflow')
+        self.METRICS_FILE = self.cfg_mgr.get('logging', 'metrics.file')
+        self.PROFILE_STAGE = self.cfg_mgr.get('logging', 'profile.stage')
+        self.PROFILE_INTERVAL_MS = int(self.cfg_mgr.get('logging', 'profile.interval.ms'))
+        self.TEXT_BATCH_SIZE = int(self.cfg_mgr.get('input', 'text.parse.batch.size'))
+        self.DEDUP = bool(int(self.cfg_mgr.get('feature-extraction', 'dedup')))
+        self.DEDUP_PERMUTATIONS = int(self.cfg_mgr.get('feature-extraction', 'dedup.permutations'))
+        self.DEDUP_BANDS = int(self.cfg_mgr.get('feature-extraction', 'dedup.bands'))
+        self.DEDUP_SHINGLE_SIZE = int(self.cfg_mgr.get('feature-extraction', 'dedup.shingle.size'))
+        self.DEDUP_SIMILARITY = float(self.cfg_mgr.get('feature-extraction', 'dedup.similarity'))
+        self.KMEANS_ENGINE = self.cfg_mgr.get('clustering', 'kmeans.engine')
+        self.SPHERICAL_TOL = float(self.cfg_mgr.get('clustering', 'spherical.tolerance'))
+        self.SPHERICAL_CHUNK = int(self.cfg_mgr.get('clustering', 'spherical.chunk.size'))
+        self.SHARDED_PCNT = int(self.cfg_mgr.get('clustering', 'sharded.process.count'))
+        self.SHARDED_TOL = float(self.cfg_mgr.get('clustering', 'sharded.tolerance'))
+        self.H2O_EXCHANGE_DIR = self.cfg_mgr.get('framework', 'h2o.exchange.directory')
+        self.H2O_EXPORT_PCNT = int(self.cfg_mgr.get('framework', 'h2o.export.process.count'))
+        self.H2O_CHUNK = int(self.cfg_mgr.get('framework', 'h2o.chunk.size'))
@@ -2,34 +2,120 @@
 # date: 16-Feb-2017
 # stream data from temporary files
 
-import pickle
 import queue
 import logging
+import threading
+
+from medline.data.load import shard
 
 
 class DataStreamer:
-    """stream data from pickled temporary files for use by Hashing vectorizer"""
-
-    def __init__(self, files):
-        DataStreamer.files = files
-        DataStreamer.docs_queue = queue.deque([])
-        DataStreamer.file_queue = queue.deque(files)
-        # logging.basicConfig(format='%(asctime)s::%(levelname)s::%(message)s', level=logging.INFO)
-        DataStreamer.doc_id_list = []
-
-    @staticmethod
-    def read():
-        if not DataStreamer.docs_queue:
-            DataStreamer.docs_queue = queue.deque(list(DataStreamer._load_next_batch()))
-        data = DataStreamer.docs_queue.popleft()
-        DataStreamer.doc_id_list.append(data[0].split("\\")[-1])
-        return data[1]
-
-    @staticmethod
-    def _load_next_batch():
-        file = DataStreamer.file_queue.popleft()
-        logging.info("loading temp file: {0}".format(file))
-        with open(file, 'rb') as filehandle:
-            doc_dict = pickle.load(filehandle)
-            for doc_id, doc in doc_dict.items():
-                yield doc['permalink'], doc['content']
+    """stream data from temporary files(columnar or pickled). iterating over a DataStreamer yields a <pmid, content>
+    tuple per document, in file order. a background thread loads the next shard(s) while the current one is being
+    consumed; # of shards waiting to be consumed is bounded by prefetch and their combined size by memory_budget(bytes),
+    plus the one shard the background thread is loading"""
+
+    # rough per-document overhead of a loaded <pmid, content> tuple; used to estimate the memory footprint of a shard
+    doc_overhead = 128
+
+    def __init__(self, files, prefetch=2, memory_budget=1024*1024*1024):
+        if prefetch < 1:
+            raise ValueError("invalid prefetch count. must be a positive integer")
+        self.files = list(files)
+        self.prefetch = prefetch
+        self.memory_budget = memory_budget
+        self.doc_id_list = []
+
+    def __iter__(self):
+        return self._stream()
+
+    def texts(self):
+        """yield content of each document and record its pmid in doc_id_list, so that rows of a term-document matrix
+        built from this generator line up with doc_id_list. missing content is yielded as an empty string"""
+
+        del self.doc_id_list[:]
+        for pmid, content in self:
+            self.doc_id_list.append(pmid)
+            yield content or ""
+
+    def count_documents(self):
+        """total # of documents across all files; read from shard headers for columnar files"""
+
+        return sum(len(shard.open_shard(file)) for file in self.files)
+
+    def _stream(self):
+        loaded = queue.Queue(maxsize=self.prefetch)
+        budget = _MemoryBudget(self.memory_budget)
+        stop = threading.Event()
+        loader_thread = threading.Thread(target=self._load_files, args=(loaded, budget, stop), name="data-streamer",
+                                         daemon=True)
+        loader_thread.start()
+        try:
+            while True:
+                item = loaded.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                documents, size = item
+                for document in documents:
+                    yield document
+                budget.release(size)
+        finally:
+            stop.set()
+            budget.close()
+            # unblock the loader thread if it is waiting on a full queue
+            while loader_thread.is_alive():
+                try:
+                    loaded.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            loader_thread.join()
+
+    def _load_files(self, loaded, budget, stop):
+        """loader thread: read shards in order and hand them over to the consuming thread. None marks the end of data;
+        exceptions are handed over and re-raised by the consumer"""
+
+        try:
+            for file in self.files:
+                if stop.is_set():
+                    return
+                logging.info("loading temp file: {0}".format(file))
+                documents = list(shard.open_shard(file).iter_documents(columns=('permalink', 'content')))
+                size = sum(len(content or "") + self.doc_overhead for _, content in documents)
+                if not budget.acquire(size):
+                    return
+                loaded.put((documents, size))
+            loaded.put(None)
+        except Exception as error:
+            loaded.put(error)
+
+
+class _MemoryBudget:
+    """bytes of loaded but not yet consumed shards. acquire blocks while the budget is exhausted; a single shard larger
+    than the budget is still let through when nothing else is held, so that streaming can not deadlock"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.used = 0
+        self.closed = False
+        self.condition = threading.Condition()
+
+    def acquire(self, size):
+        with self.condition:
+            while not self.closed and self.used and self.used + size > self.limit:
+                self.condition.wait()
+            if self.closed:
+                return False
+            self.used += size
+            return True
+
+    def release(self, size):
+        with self.condition:
+            self.used -= size
+            self.condition.notify_all()
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
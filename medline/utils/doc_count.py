@@ -2,9 +2,10 @@
 # date: 22-Mar-2017
 
 import argparse
-import pickle
 import os
 
+from medline.data.load import shard
+
 
 if __name__ == "__main__":
     arg_parser = argparse.ArgumentParser(usage="doc_count.py temp_dir", description="count PubMed articles")
@@ -12,11 +13,9 @@ if __name__ == "__main__":
     args = arg_parser.parse_args()
 
     num_articles = 0
-    pickled_dict = {}
     for filename in os.listdir(args.temp_dir):
-        with open(args.temp_dir + filename, 'rb') as file:
-            pickled_dict = pickle.load(file)
-            num_articles += len(pickled_dict)
-            print("# articles counted so far: {0}".format(num_articles))
+        # columnar shards are counted from their header; pickled shards have to be loaded
+        num_articles += len(shard.open_shard(args.temp_dir + filename))
+        print("# articles counted so far: {0}".format(num_articles))
 
     print("PubMed articles #: {0}".format(num_articles))
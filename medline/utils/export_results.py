@@ -2,11 +2,23 @@
 # date: 15-02-2017
 # export processing results to file or DB. results cane be a pandas dataframe or any other supported datastructure
 
+import importlib
+import os
+
 import pandas
 
+from medline.utils.registry import EXPORTERS, LazyModule
+
+# writers import their file format library when output of that format is selected
+xlsxwriter = LazyModule("xlsxwriter")
+
+# rows per worksheet, including the header row
+XLSX_MAX_ROWS = 1048576
+
 
 def export_dataframe(filename, *dataframes, **fileparams):
     """helper function to export multiple pandas dataframes to a .xlsx or .csv file.
+    a .csv file holds a single dataframe; 2nd and later dataframes are exported to <filename>_<sheet name>.csv
 
     Parameters:
         :parameter filename: name of the .xlsx or .csv file to be saved
@@ -15,20 +27,251 @@ def export_dataframe(filename, *dataframes, **fileparams):
             format: output file format. default: xlsx
             sheetnames: list of 1 or more sheet name corresponding to each dataframe
             indices: list of 1 or more boolean values that indicate if index of corresponding dataframe should be
-                     exported"""
+                     exported
+        :raises ValueError"""
 
     file_format = fileparams['format']
 
     if file_format == 'xlsx':
-        writer = pandas.ExcelWriter(filename)
+        for dataframe in dataframes:
+            if len(dataframe) >= XLSX_MAX_ROWS:
+                raise ValueError("{0} rows do not fit in a .xlsx worksheet(max {1}). use export_chunks or csv "
+                                 "format".format(len(dataframe), XLSX_MAX_ROWS - 1))
+        writer = pandas.ExcelWriter(filename, engine='xlsxwriter')
         for ind, dataframe in enumerate(dataframes):
             sheet_name = fileparams['sheet_names'][ind]
             keep_index = fileparams['indices'][ind]
-            dataframe.to_excel(writer, sheet_name=sheet_name, engine='xlsxwriter', index=keep_index)
-        writer.save()
+            dataframe.to_excel(writer, sheet_name=sheet_name, index=keep_index)
         writer.close()
 
     elif file_format == 'csv':
         for ind, dataframe in enumerate(dataframes):
             keep_index = fileparams['indices'][ind]
-            dataframe.to_csv(filename, index=keep_index)
+            if ind == 0:
+                dataframe.to_csv(filename, index=keep_index)
+            else:
+                dataframe.to_csv(_sibling_file(filename, fileparams['sheet_names'][ind]), index=keep_index)
+
+
+def export_chunks(filename, chunks, out_format='csv', partition_by=None, num_rows=None, overflow='split',
+                  sheet_name='clusters', extra_sheets=()):
+    """export an iterator of dataframe chunks incrementally; only 1 chunk is held in memory at a time
+        Parameters:
+            :parameter filename: name of output file. with partition_by, name of a directory that receives 1 file per
+                                 value of the partition column - <column>=<value>.<format>
+            :parameter chunks: iterable of pandas dataframes with identical columns
+            :parameter out_format: csv, parquet(requires pyarrow) or xlsx
+            :parameter partition_by: name of column to partition output by(e.g. cluster_id). default - None
+            :parameter num_rows: total # of rows, if known. used to refuse xlsx output up front
+            :parameter overflow: what to do when rows do not fit in a .xlsx worksheet - split(continue on a new
+                                 worksheet) or refuse(raise ValueError)
+            :parameter sheet_name: name of the (1st) .xlsx worksheet
+            :parameter extra_sheets: list of <name, dataframe> exported after the chunks - as further worksheets of a
+                                     .xlsx file, otherwise as <filename>_<name>.<format> files
+        Output:
+            :returns # of rows exported, extra sheets excluded
+            :rtype int
+            :raises ValueError"""
+
+    # writers are registered in utils.registry.EXPORTERS
+    writer_class = EXPORTERS.get(out_format)
+    if out_format == 'xlsx' and overflow not in ('split', 'refuse'):
+        raise ValueError("unsupported xlsx overflow. value must be one of split, refuse")
+    if out_format == 'parquet' and _pyarrow() is None:
+        raise ValueError("parquet output requires pyarrow. install pyarrow or use csv format")
+    if out_format == 'xlsx' and overflow == 'refuse' and num_rows is not None and num_rows >= XLSX_MAX_ROWS:
+        raise ValueError("{0} rows do not fit in a .xlsx worksheet(max {1})".format(num_rows, XLSX_MAX_ROWS - 1))
+
+    def open_writer(path):
+        if out_format == 'xlsx':
+            return writer_class(path, sheet_name=sheet_name, overflow=overflow)
+        return writer_class(path)
+
+    num_exported = 0
+    writers = {}
+    try:
+        if partition_by:
+            os.makedirs(filename, exist_ok=True)
+        else:
+            writers[None] = open_writer(filename)
+        for chunk in chunks:
+            if partition_by:
+                for value, partition in chunk.groupby(partition_by, sort=False):
+                    if value not in writers:
+                        writers[value] = open_writer(os.path.join(filename, "{0}={1}.{2}".format(partition_by, value,
+                                                                                               out_format)))
+                    writers[value].write(partition)
+            else:
+                writers[None].write(chunk)
+            num_exported += len(chunk)
+
+        for name, dataframe in extra_sheets:
+            if out_format == 'xlsx' and not partition_by:
+                writers[None].add_sheet(name, dataframe)
+            else:
+                if partition_by:
+                    path = os.path.join(filename, "{0}.{1}".format(name.replace(" ", "_"), out_format))
+                else:
+                    path = _sibling_file(filename, name)
+                with open_writer(path) as writer:
+                    writer.write(dataframe)
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return num_exported
+
+
+def chunk_arrays(columns, arrays, chunk_size=100000):
+    """split equally long arrays(or lists) into dataframe chunks
+        Parameters:
+            :parameter columns: column names
+            :parameter arrays: 1 array per column
+            :parameter chunk_size: max # of rows per chunk
+        Output:
+            :returns generator of pandas dataframes"""
+
+    num_rows = len(arrays[0]) if arrays else 0
+    for start in range(0, num_rows, chunk_size):
+        yield pandas.DataFrame({column: array[start:start + chunk_size] for column, array in zip(columns, arrays)},
+                               columns=columns)
+
+
+def chunk_records(columns, records, chunk_size=100000):
+    """group an iterable of row tuples into dataframe chunks of at most chunk_size rows"""
+
+    rows = []
+    for record in records:
+        rows.append(record)
+        if len(rows) >= chunk_size:
+            yield pandas.DataFrame.from_records(rows, columns=columns)
+            rows = []
+    if rows:
+        yield pandas.DataFrame.from_records(rows, columns=columns)
+
+
+class CsvChunkWriter:
+    """append dataframe chunks to a .csv file; the header is written with the 1st chunk"""
+
+    def __init__(self, filename):
+        self.filehandle = open(filename, 'w', newline='')
+        self.header = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, dataframe):
+        dataframe.to_csv(self.filehandle, header=self.header, index=False)
+        self.header = False
+
+    def close(self):
+        self.filehandle.close()
+
+
+class ParquetChunkWriter:
+    """append dataframe chunks to a .parquet file as row groups. schema is taken from the 1st chunk"""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, dataframe):
+        pyarrow = _pyarrow()
+        table = pyarrow.Table.from_pandas(dataframe, preserve_index=False)
+        if self.writer is None:
+            # columns without any value(e.g. all PMIDs missing) are inferred as null typed; store them as strings
+            schema = pyarrow.schema([field.with_type(pyarrow.string()) if pyarrow.types.is_null(field.type) else field
+                                     for field in table.schema])
+            self.writer = pyarrow.parquet.ParquetWriter(self.filename, schema)
+        self.writer.write_table(table.cast(self.writer.schema))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+class XlsxChunkWriter:
+    """write dataframe chunks row by row to a .xlsx file without holding the workbook in memory. when a worksheet is
+    full, rows continue on a new worksheet(<sheet_name> 2, <sheet_name> 3, ...) or ValueError is raised, depending on
+    overflow"""
+
+    def __init__(self, filename, sheet_name='clusters', overflow='split'):
+        self.workbook = xlsxwriter.Workbook(filename, {'constant_memory': True})
+        self.sheet_name = sheet_name
+        self.overflow = overflow
+        self.worksheet = None
+        self.num_sheets = 0
+        self.row = 0
+        self.columns = None
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, dataframe):
+        if self.worksheet is None:
+            self.columns = list(dataframe.columns)
+            self._new_worksheet()
+        for values in _to_rows(dataframe):
+            if self.row >= XLSX_MAX_ROWS:
+                if self.overflow != 'split':
+                    raise ValueError("rows do not fit in a .xlsx worksheet(max {0})".format(XLSX_MAX_ROWS - 1))
+                self._new_worksheet()
+            self.worksheet.write_row(self.row, 0, values)
+            self.row += 1
+
+    def add_sheet(self, name, dataframe):
+        """write a dataframe to a worksheet of its own; the worksheet receiving chunks is closed"""
+
+        worksheet = self.workbook.add_worksheet(name)
+        worksheet.write_row(0, 0, list(dataframe.columns))
+        for row, values in enumerate(_to_rows(dataframe), start=1):
+            worksheet.write_row(row, 0, values)
+
+    def _new_worksheet(self):
+        self.num_sheets += 1
+        name = self.sheet_name if self.num_sheets == 1 else "{0} {1}".format(self.sheet_name, self.num_sheets)
+        self.worksheet = self.workbook.add_worksheet(name)
+        self.worksheet.write_row(0, 0, self.columns)
+        self.row = 1
+
+    def close(self):
+        if not self.closed:
+            if self.worksheet is None and not self.workbook.worksheets():
+                self.workbook.add_worksheet(self.sheet_name)
+            self.workbook.close()
+            self.closed = True
+
+
+def _to_rows(dataframe):
+    """rows of dataframe as lists of python values; missing values become None(blank cells)"""
+
+    values = dataframe.astype(object).where(dataframe.notna(), None)
+    return values.values.tolist()
+
+
+def _pyarrow():
+    """pyarrow module with its parquet submodule; None if pyarrow is not installed(parquet output is optional)"""
+
+    try:
+        importlib.import_module("pyarrow.parquet")
+        return importlib.import_module("pyarrow")
+    except ImportError:
+        return None
+
+
+def _sibling_file(filename, name):
+    root, extension = os.path.splitext(filename)
+    return "{0}_{1}{2}".format(root, name.replace(" ", "_"), extension)
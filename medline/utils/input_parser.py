@@ -6,6 +6,8 @@ import configparser
 import os
 import re
 
+PMID_PATTERN = re.compile(r"PMID\:\s+(\d{8})")
+
 
 class InputParser:
     """abstract base class for pubmed data parsers"""
@@ -24,7 +26,8 @@ class DefaultParser(InputParser):
 
 class AbstractsParser(InputParser):
     """parse PubMed abstract text files. Abstracts are made up of several sections typically delimited by \n\n.
-    With use of regualr expressions, each abstract is parsed and its contents stored section-wise in a python dict"""
+    With use of regualr expressions, each abstract is parsed and its contents stored section-wise in a python dict.
+    section indices and record separator are read from config once, when the parser is created"""
 
     def __init__(self):
         self.cfg_mgr = configparser.ConfigParser()
@@ -32,14 +35,17 @@ class AbstractsParser(InputParser):
 
         # load config file
         self._load_config()
+        self.content_ind = int(self.cfg_mgr.get('input', 'abstracts.parser.content.index'))
+        self.permalink_ind = int(self.cfg_mgr.get('input', 'abstracts.parser.permalink.index'))
+        self.title_ind = int(self.cfg_mgr.get('input', 'abstracts.parser.title.index'))
+        self.record_sep = self.cfg_mgr.get('input', 'abstracts.record.separator')
 
     def _load_config(self):
         self.cfg_mgr.read(os.path.abspath(os.path.join(self.script_dir, "..", "config", "default.cfg")))
 
     def _extract_pmid(self, data):
-        pattern = re.compile("PMID\:\s+(\d{8})")
         try:
-            pmid = re.search(pattern, data).groups()[0]
+            pmid = PMID_PATTERN.search(data).groups()[0]
         except AttributeError:
             pmid = None
         return pmid
@@ -48,16 +54,11 @@ class AbstractsParser(InputParser):
         """parse collated input data and filter unwanted data"""
 
         parsed_text = {}
-        content_ind = int(self.cfg_mgr.get('input', 'abstracts.parser.content.index'))
-        permalink_ind = int(self.cfg_mgr.get('input', 'abstracts.parser.permalink.index'))
-        title_ind = int(self.cfg_mgr.get('input', 'abstracts.parser.title.index'))
-        record_sep = self.cfg_mgr.get('input', 'abstracts.record.separator')
-
         try:
-            data_split = data.split(record_sep)
-            parsed_text["content"] = data_split[content_ind]
-            parsed_text["title"] = data_split[title_ind]
-            parsed_text["permalink"] = self._extract_pmid(data_split[permalink_ind])
+            data_split = data.split(self.record_sep)
+            parsed_text["content"] = data_split[self.content_ind]
+            parsed_text["title"] = data_split[self.title_ind]
+            parsed_text["permalink"] = self._extract_pmid(data_split[self.permalink_ind])
         except IndexError:
             print("Invalid record format")
         return parsed_text
@@ -0,0 +1,284 @@
+# date: 17-Oct-2026
+# per-stage wall time, cpu time, throughput, IO and peak memory of pipeline runs, with an optional sampling profiler
+
+import collections
+import functools
+import json
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+
+# recorder of the running pipeline; stages started while no recorder is active are not measured
+_active = None
+
+
+class StageRecord:
+    """measurements of 1 stage. code running inside a stage may set docs(# documents processed) and add entries to
+    extra; both are written to the metrics file"""
+
+    def __init__(self, name, parent=None):
+        self.name = name
+        self.path = name if parent is None else parent.path + "/" + name
+        self.parent = parent
+        self.docs = None
+        self.extra = {}
+        self.peak_rss = 0
+        self._start = None
+
+    def begin(self):
+        self._start = _snapshot()
+        return self
+
+    def end(self):
+        """measurements since begin
+            :rtype dict"""
+
+        start, end = self._start, _snapshot()
+        wall = end['wall'] - start['wall']
+        self.peak_rss = max(self.peak_rss, end['peak_rss'])
+        metrics = collections.OrderedDict([
+            ('stage', self.path),
+            ('wall_seconds', wall),
+            ('cpu_seconds', end['cpu'] - start['cpu']),
+            ('children_cpu_seconds', end['children_cpu'] - start['children_cpu']),
+            ('docs', self.docs),
+            ('docs_per_sec', self.docs / wall if self.docs is not None and wall > 0 else None),
+            ('read_bytes', end['read_bytes'] - start['read_bytes']),
+            ('written_bytes', end['written_bytes'] - start['written_bytes']),
+            ('peak_rss_mb', self.peak_rss / 2 ** 20),
+            ('children_peak_rss_mb', end['children_peak_rss'] / 2 ** 20)])
+        metrics.update(self.extra)
+        return metrics
+
+
+class Recorder:
+    """measure nested stages of a pipeline run and append 1 JSON record per finished stage to metrics_file(JSON lines).
+    a record is written as soon as its stage ends, so the metrics of a run that fails or is killed are kept up to the
+    failing stage
+
+    peak RSS is measured per stage on Linux(the kernel's high water mark is reset when a stage begins); elsewhere it is
+    the peak of the process so far. CPU time and peak RSS of worker processes are reported separately(children_*);
+    bytes read/written count the IO of this process only
+
+    if profile_stage is set, the stage of that name is sampled every profile_interval seconds by a background thread
+    and the sampled call stacks are written to <metrics_file>.<stage>.folded - 1 line per distinct stack with its
+    sample count, in the folded format read by flame graph tools"""
+
+    def __init__(self, metrics_file, profile_stage=None, profile_interval=0.005, run_info=None):
+        self.metrics_file = metrics_file
+        self.profile_stage = profile_stage
+        self.profile_interval = profile_interval
+        self.run_info = run_info or {}
+        self.run_id = time.strftime("%Y%m%dT%H%M%S") + "-{0}".format(os.getpid())
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        global _active
+        self._previous = _active
+        _active = self
+        return self
+
+    def __exit__(self, *exc_info):
+        global _active
+        _active = self._previous
+
+    def stage(self, name):
+        return _Stage(self, name)
+
+    def _current(self):
+        return getattr(self._local, 'current', None)
+
+    def _begin(self, name):
+        parent = self._current()
+        if parent is not None:
+            # the high water mark is about to be reset; fold what the parent stage has reached so far into its peak
+            parent.peak_rss = max(parent.peak_rss, _peak_rss())
+        _reset_peak_rss()
+        record = StageRecord(name, parent).begin()
+        self._local.current = record
+        return record
+
+    def _end(self, record, error=None):
+        metrics = record.end()
+        self._local.current = record.parent
+        if record.parent is not None:
+            record.parent.peak_rss = max(record.parent.peak_rss, record.peak_rss)
+        metrics['run_id'] = self.run_id
+        metrics['time'] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        if error is not None:
+            metrics['error'] = "{0}: {1}".format(type(error).__name__, error)
+        if record.parent is None:
+            metrics.update(self.run_info)
+        self._write(metrics)
+        logging.info("stage {0}: {1:.2f}s wall, {2:.2f}s cpu, {3} docs, peak rss {4:.0f} MB".format(
+            metrics['stage'], metrics['wall_seconds'], metrics['cpu_seconds'], metrics['docs'],
+            metrics['peak_rss_mb']))
+
+    def _write(self, metrics):
+        if not self.metrics_file:
+            return
+        with self._lock:
+            with open(self.metrics_file, 'a') as filehandle:
+                filehandle.write(json.dumps(metrics) + "\n")
+
+
+class _Stage:
+    """context manager around 1 stage; yields its StageRecord(or None if no recorder is active)"""
+
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+        self.record = None
+        self.profiler = None
+
+    def __enter__(self):
+        if self.recorder is None:
+            return None
+        self.record = self.recorder._begin(self.name)
+        if self.recorder.profile_stage == self.name:
+            self.profiler = SamplingProfiler(self.recorder.profile_interval).start()
+        return self.record
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.record is None:
+            return
+        if self.profiler is not None:
+            self.profiler.stop()
+            if self.recorder.metrics_file:
+                filename = "{0}.{1}.folded".format(self.recorder.metrics_file, self.name)
+                self.profiler.save(filename)
+                self.record.extra['profile'] = filename
+            self.record.extra['profile_samples'] = self.profiler.num_samples
+        self.recorder._end(self.record, error=exc_value)
+
+
+def stage(name):
+    """measure a block of code as a stage of the active recorder; a no-op when no recorder is active
+
+        with instrumentation.stage("vectorize") as record:
+            ...
+            if record:
+                record.docs = num_docs"""
+
+    return _Stage(_active, name)
+
+
+def instrument(name, count=None):
+    """decorator that measures each call of a function as a stage
+        input:
+            :parameter name: stage name
+            :parameter count: function that returns the # of documents processed, given the return value of the
+                              decorated function. default - None(not counted)"""
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with stage(name) as record:
+                result = function(*args, **kwargs)
+                if record is not None and count is not None:
+                    record.docs = count(result)
+                return result
+        return wrapper
+    return decorator
+
+
+def num_rows(result):
+    """# rows of a matrix, dataframe or list"""
+
+    return result.shape[0] if hasattr(result, 'shape') else len(result)
+
+
+class SamplingProfiler:
+    """sample the call stack of the thread that starts the profiler every interval seconds"""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.num_samples = 0
+        self._thread_id = None
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def start(self):
+        self._thread_id = threading.get_ident()
+        self._sampler = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._sampler.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._sampler.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append("{0} ({1}:{2})".format(code.co_name, os.path.basename(code.co_filename),
+                                                    code.co_firstlineno))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+            self.num_samples += 1
+
+    def save(self, filename):
+        with open(filename, 'w') as filehandle:
+            for stack, num_samples in self.stacks.most_common():
+                filehandle.write("{0} {1}\n".format(stack, num_samples))
+
+
+def _snapshot():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    read_bytes, written_bytes = _io_counters(usage)
+    return {'wall': time.perf_counter(), 'cpu': usage.ru_utime + usage.ru_stime,
+            'children_cpu': children.ru_utime + children.ru_stime, 'read_bytes': read_bytes,
+            'written_bytes': written_bytes, 'peak_rss': _peak_rss(usage),
+            'children_peak_rss': _maxrss_bytes(children.ru_maxrss)}
+
+
+def _io_counters(usage):
+    """bytes read and written by this process. /proc/self/io counts every read/write call(including data served from
+    the page cache); elsewhere only blocks read from/written to disk are available"""
+
+    try:
+        with open("/proc/self/io") as filehandle:
+            counters = dict(line.split(": ") for line in filehandle.read().splitlines())
+        return int(counters['rchar']), int(counters['wchar'])
+    except (OSError, KeyError, ValueError):
+        return usage.ru_inblock * 512, usage.ru_oublock * 512
+
+
+def _peak_rss(usage=None):
+    """peak resident set size(bytes) since the last _reset_peak_rss; since process start where it can't be reset"""
+
+    try:
+        with open("/proc/self/status") as filehandle:
+            for line in filehandle:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    usage = usage or resource.getrusage(resource.RUSAGE_SELF)
+    return _maxrss_bytes(usage.ru_maxrss)
+
+
+def _reset_peak_rss():
+    """reset the peak RSS(VmHWM) of this process to its current RSS; Linux only"""
+
+    try:
+        with open("/proc/self/clear_refs", 'w') as filehandle:
+            filehandle.write("5")
+    except OSError:
+        pass
+
+
+def _maxrss_bytes(maxrss):
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
@@ -0,0 +1,65 @@
+# date: 17-Oct-2026
+# persistent PMID -> cluster id membership store(sqlite)
+
+import sqlite3
+
+
+class MembershipStore:
+    """cluster membership of every clustered PMID, kept in a sqlite database so that daily updates can add, move and
+    remove PMIDs without rewriting the full clustering output"""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.connection = sqlite3.connect(filename)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS membership "
+                                "(pmid TEXT PRIMARY KEY, cluster_id INTEGER NOT NULL)")
+        self.connection.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM membership").fetchone()[0]
+
+    def assign(self, pmids, cluster_ids):
+        """add PMIDs to clusters; PMIDs that are already members of a cluster are moved
+
+            :returns # of PMIDs assigned
+            :rtype int"""
+
+        # missing PMIDs(None or NaN) are skipped
+        rows = [(str(pmid), int(cluster_id)) for pmid, cluster_id in zip(pmids, cluster_ids)
+                if pmid is not None and pmid == pmid]
+        with self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO membership (pmid, cluster_id) VALUES (?, ?)", rows)
+        return len(rows)
+
+    def delete(self, pmids):
+        """remove PMIDs from their clusters
+
+            :returns # of PMIDs removed
+            :rtype int"""
+
+        with self.connection:
+            cursor = self.connection.executemany("DELETE FROM membership WHERE pmid = ?",
+                                                 [(str(pmid),) for pmid in pmids])
+        return cursor.rowcount
+
+    def cluster_of(self, pmid):
+        """cluster id of pmid; None if pmid is not a member of any cluster"""
+
+        row = self.connection.execute("SELECT cluster_id FROM membership WHERE pmid = ?", (str(pmid),)).fetchone()
+        return row[0] if row else None
+
+    def cluster_sizes(self):
+        """# of PMIDs per cluster id
+
+            :rtype dict"""
+
+        return dict(self.connection.execute("SELECT cluster_id, COUNT(*) FROM membership GROUP BY cluster_id"))
+
+    def close(self):
+        self.connection.close()
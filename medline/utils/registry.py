@@ -0,0 +1,76 @@
+# date: 17-Oct-2026
+# registries of pluggable implementations - clustering backends, vectorizers and output exporters - by name. the
+# module of an implementation is imported the first time it is looked up, so names can be listed and validated(e.g.
+# by argument parsing) without importing scikit-learn, pandas or h2o, and a run imports only what it selects
+
+import importlib
+
+
+class Registry:
+    """named implementations, registered as "module:attribute" paths"""
+
+    def __init__(self, kind, entries=()):
+        self.kind = kind
+        self._paths = dict(entries)
+
+    def register(self, name, path):
+        """add or replace an implementation
+            input:
+                :parameter name: name by which the implementation is selected
+                :parameter path: "module:attribute" path of the implementation"""
+
+        self._paths[name] = path
+
+    def names(self):
+        return tuple(self._paths)
+
+    def __contains__(self, name):
+        return name in self._paths
+
+    def validate(self, name):
+        """:raises ValueError if name is not registered"""
+
+        if name not in self._paths:
+            raise ValueError("unsupported {0}. value must be one of {1}".format(self.kind, ", ".join(self._paths)))
+
+    def get(self, name):
+        """implementation registered as name; its module is imported on first use
+            :raises ValueError"""
+
+        self.validate(name)
+        module_name, attribute = self._paths[name].split(":")
+        return getattr(importlib.import_module(module_name), attribute)
+
+
+class LazyModule:
+    """stand-in for a module that is imported on first attribute access"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attribute):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attribute)
+
+
+# clustering backends(pubmed --backend). a backend is called as
+#   backend(cluster_mgr, dataset, labels_file=None, large_file=False, server_url=None)
+# with a model.cluster.Cluster and the vectorized data, and returns 1 cluster id per row(see model.cluster)
+BACKENDS = Registry("clustering backend", [
+    ('sklearn', 'medline.model.cluster:sklearn_backend'),
+    ('sharded', 'medline.model.cluster:sharded_backend'),
+    ('h2o', 'medline.model.cluster:h2o_backend')])
+
+# vectorizer types(feature-extraction/vectorizer) and the functions that create them from a Config
+VECTORIZERS = Registry("vectorizer type", [
+    ('tfidf', 'medline.data.extract.features:tfidf_vectorizer'),
+    ('hashing', 'medline.data.extract.features:hashing_vectorizer'),
+    ('tfidf-streaming', 'medline.data.extract.features:streaming_tfidf_vectorizer')])
+
+# output formats and the writers that export cluster membership chunk by chunk
+EXPORTERS = Registry("output format", [
+    ('csv', 'medline.utils.export_results:CsvChunkWriter'),
+    ('parquet', 'medline.utils.export_results:ParquetChunkWriter'),
+    ('xlsx', 'medline.utils.export_results:XlsxChunkWriter')])
@@ -0,0 +1,182 @@
+# date: 17-Oct-2026
+# run manifest of large-file runs - completed temp file shards and pipeline stages with checksums - used to resume a
+# run that crashed or was killed
+
+import hashlib
+import json
+import logging
+import os
+import time
+
+MANIFEST_VERSION = 1
+
+# name of the manifest file in the temp directory
+MANIFEST_FILENAME = "run_manifest.json"
+
+# config sections that determine the shards and stage artifacts of a run
+_KEY_SECTIONS = ('input', 'feature-extraction', 'clustering')
+
+
+class RunManifest:
+    """JSON file that records the progress of a large-file run:
+        shards - temp files written by the loader, in order, with # documents, index of their last article, size and
+                 checksum
+        parse_complete - flag set once the whole input file has been split into shards
+        stages - completed pipeline stages, in completion order, with the checksums of their artifacts(files or
+                 directories) and the state needed to reload them
+    the manifest is rewritten atomically after every update. a run can be resumed only with the manifest of the same
+    input and config(see make_key). a resumed run keeps the leading shards and stages whose artifacts still match their
+    checksums; the first missing or modified artifact and everything recorded after it are redone"""
+
+    def __init__(self, filename, run_key, resume=False):
+        self.filename = filename
+        self.run_key = run_key
+        self.resuming = False
+        self.state = {'version': MANIFEST_VERSION, 'run_key': run_key, 'shards': [], 'parse_complete': False,
+                      'num_docs_processed': 0, 'stages': []}
+        if resume and os.path.exists(filename):
+            with open(filename, 'r') as filehandle:
+                state = json.load(filehandle)
+            if state.get('version') != MANIFEST_VERSION or state.get('run_key') != run_key:
+                raise ValueError("run manifest {0} belongs to a different input file or config. run without resume or "
+                                 "remove the manifest to start over".format(filename))
+            self.state = state
+            self.resuming = True
+            logging.info("resuming run: {0} shards, stages completed: {1}".format(
+                len(self.state['shards']), [stage['name'] for stage in self.state['stages']] or "none"))
+        elif resume:
+            logging.info("run manifest {0} not found. starting run from scratch".format(filename))
+        self.save()
+
+    @staticmethod
+    def make_key(input_manifest, config):
+        """identity of a run - input files and the config sections that determine shards and stage artifacts
+            input:
+                :parameter input_manifest: description of the input data, see Loader.manifest
+                :parameter config: Config object
+            output:
+                :returns hex digest
+                :rtype str"""
+
+        settings = {section: sorted(config.cfg_mgr.items(section)) for section in _KEY_SECTIONS}
+        payload = json.dumps({'version': MANIFEST_VERSION, 'manifest': input_manifest, 'settings': settings},
+                             sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def save(self):
+        temp_filename = "{0}.tmp{1}".format(self.filename, os.getpid())
+        with open(temp_filename, 'w') as filehandle:
+            json.dump(self.state, filehandle, indent=1)
+        os.replace(temp_filename, self.filename)
+
+    @property
+    def parse_complete(self):
+        return self.state['parse_complete']
+
+    @property
+    def num_docs_processed(self):
+        return self.state['num_docs_processed']
+
+    def add_shard(self, filename, num_docs, last_index):
+        """record a completely written shard
+            input:
+                :parameter filename: fully qualified name of shard file
+                :parameter num_docs: # documents in shard
+                :parameter last_index: index of the last input article covered by the shard"""
+
+        self.state['shards'].append({'file': filename, 'num_docs': num_docs, 'last_index': last_index,
+                                     'size': os.path.getsize(filename), 'checksum': file_checksum(filename)})
+        self.save()
+
+    def complete_parse(self, num_docs_processed):
+        self.state['parse_complete'] = True
+        self.state['num_docs_processed'] = num_docs_processed
+        self.save()
+
+    def verified_shards(self):
+        """leading shards whose files still match their size and checksum. the first missing, partial or modified
+        shard and all shards after it are dropped from the manifest, as are all stages(they were computed from the
+        dropped shards)
+
+            :returns list of shard entries(dicts)
+            :rtype list"""
+
+        shards = self.state['shards']
+        for position, entry in enumerate(shards):
+            if not os.path.exists(entry['file']) or os.path.getsize(entry['file']) != entry['size'] or \
+                    file_checksum(entry['file']) != entry['checksum']:
+                logging.warning("shard {0} is missing or does not match its checksum. re-creating it and the {1} "
+                                "shard(s) after it".format(entry['file'], len(shards) - position - 1))
+                del shards[position:]
+                self.state['parse_complete'] = False
+                self.state['stages'] = []
+                self.save()
+                break
+        return list(shards)
+
+    def complete_stage(self, name, artifacts=(), **state):
+        """record a completed stage. stages recorded after an earlier run of the same stage are dropped, since they
+        depend on it
+            input:
+                :parameter name: stage name
+                :parameter artifacts: files or directories written by the stage
+                :parameter state: JSON serializable values needed to reload the stage's results"""
+
+        self._drop_stage(name)
+        self.state['stages'].append({'name': name, 'completed': time.strftime("%Y-%m-%dT%H:%M:%S"),
+                                     'artifacts': {path: tree_checksums(path) for path in artifacts},
+                                     'state': state})
+        self.save()
+
+    def completed_stage(self, name):
+        """state of a completed stage if resuming and all of its artifacts match their checksums. a stage that fails
+        verification is dropped with the stages recorded after it
+
+            :returns state recorded by complete_stage; None if the stage has to be run
+            :rtype dict"""
+
+        if not self.resuming:
+            return None
+        for stage in self.state['stages']:
+            if stage['name'] != name:
+                continue
+            for path, checksums in stage['artifacts'].items():
+                if not os.path.exists(path) or tree_checksums(path) != checksums:
+                    logging.warning("artifact {0} of stage {1} is missing or modified. re-running the stage"
+                                    .format(path, name))
+                    self._drop_stage(name)
+                    self.save()
+                    return None
+            logging.info("stage {0} completed {1}. skipping it".format(name, stage['completed']))
+            return stage['state']
+        return None
+
+    def _drop_stage(self, name):
+        names = [stage['name'] for stage in self.state['stages']]
+        if name in names:
+            del self.state['stages'][names.index(name):]
+
+
+def file_checksum(filename, chunk_size=1024 * 1024):
+    """sha256 hex digest of a file"""
+
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as filehandle:
+        for chunk in iter(lambda: filehandle.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def tree_checksums(path):
+    """checksum of a file, or {relative path: checksum} of every file under a directory
+
+        :rtype str or dict"""
+
+    if not os.path.isdir(path):
+        return file_checksum(path)
+    checksums = {}
+    for root, _, files in os.walk(path):
+        for file in files:
+            filename = os.path.join(root, file)
+            checksums[os.path.relpath(filename, path)] = file_checksum(filename)
+    return checksums
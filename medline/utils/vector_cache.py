@@ -0,0 +1,172 @@
+# date: 17-Oct-2026
+# cache of vectorized data(term-document matrix, PMIDs and fitted feature extractor) keyed by the data that was
+# vectorized and the feature extraction config
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import shutil
+import time
+
+import numpy
+
+from medline.data.extract.sparse_store import SparseBlocks, save_csr, load_csr, save_labels, load_labels
+
+# bump to invalidate all existing cache entries when the entry layout changes
+CACHE_FORMAT_VERSION = 1
+
+# feature-extraction keys that do not change vectorized data; changing them must not invalidate the cache
+_IGNORED_KEYS = frozenset(['features.pickled.files.directory', 'vectorizer.process.count', 'vectorizer.features.avail',
+                           'features.dimension', 'features.reduction', 'reduction.sample.size', 'vector.cache',
+                           'vector.cache.budget.mb'])
+
+
+class VectorCache:
+    """directory of vectorized data, 1 sub-directory(entry) per key:
+        entry.json - key, size in bytes and format of data
+        data/ - term-document matrix; vectorized blocks(SparseBlocks) or CSR components(see sparse_store)
+        labels.npy - PMIDs of matrix rows
+        feature_extractor.pkl - pickled FeatureExtractor
+        duplicates.npz - near-duplicate documents removed before vectorizing(see data.extract.dedup); if any
+    entries are written to a temporary directory and renamed into place, so a partial entry is never read. total size
+    of entries is kept under budget(bytes) by evicting least recently used entries"""
+
+    entry_file = "entry.json"
+
+    def __init__(self, directory, budget):
+        self.directory = directory
+        self.budget = budget
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(manifest, config):
+        """cache key of vectorized data
+            input:
+                :parameter manifest: description of the input data, see Loader.manifest
+                :parameter config: Config object; the feature-extraction section is part of the key
+            output:
+                :returns hex digest
+                :rtype str"""
+
+        settings = sorted((key, value) for key, value in config.cfg_mgr.items('feature-extraction')
+                          if key not in _IGNORED_KEYS)
+        payload = json.dumps({'version': CACHE_FORMAT_VERSION, 'manifest': manifest, 'settings': settings},
+                             sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def entry_path(self, key):
+        return os.path.join(self.directory, key)
+
+    def get(self, key, mmap=True):
+        """load a cache entry
+            input:
+                :parameter key: cache key, see make_key
+                :parameter mmap: flag to memory-map matrix and PMIDs
+            output:
+                :returns dict with keys data, labels, feature_extractor, duplicates; None if key is not cached
+                :rtype dict"""
+
+        path = self.entry_path(key)
+        if not os.path.exists(os.path.join(path, self.entry_file)):
+            self.misses += 1
+            logging.info("vector cache miss: {0}".format(key))
+            return None
+
+        cached = self._load(path, mmap=mmap)
+        # mark entry as recently used
+        os.utime(os.path.join(path, self.entry_file))
+        self.hits += 1
+        logging.info("vector cache hit: {0} ({1} documents)".format(key, len(cached['labels'])))
+        return cached
+
+    def _load(self, path, mmap=True):
+        """load the cache entry in directory path; hit/miss counters and recency are left to the caller"""
+
+        with open(os.path.join(path, self.entry_file), 'r') as filehandle:
+            entry = json.load(filehandle)
+        if entry['format'] == 'blocks':
+            data = SparseBlocks.load(os.path.join(path, "data"))
+        else:
+            data = load_csr(os.path.join(path, "data"), mmap=mmap)
+        with open(os.path.join(path, "feature_extractor.pkl"), 'rb') as filehandle:
+            feature_extractor = pickle.load(filehandle)
+        labels = load_labels(os.path.join(path, "labels.npy"), mmap=mmap)
+        duplicates = None
+        if os.path.exists(os.path.join(path, "duplicates.npz")):
+            with numpy.load(os.path.join(path, "duplicates.npz")) as arrays:
+                duplicates = dict(arrays)
+        return {'data': data, 'labels': labels, 'feature_extractor': feature_extractor, 'duplicates': duplicates}
+
+    def put(self, key, data, labels, feature_extractor, duplicates=None):
+        """add vectorized data to the cache and evict least recently used entries if the cache is over budget.
+        vectorized blocks are moved into the cache; in-memory matrices are saved as CSR components
+            input:
+                :parameter key: cache key, see make_key
+                :parameter data: SparseBlocks or sparse term-document matrix
+                :parameter labels: PMIDs of matrix rows
+                :parameter feature_extractor: fitted FeatureExtractor
+                :parameter duplicates: dict of arrays describing removed near-duplicates. default - None
+            output:
+                :returns cached entry, loaded as by get(not counted as a hit)
+                :rtype dict"""
+
+        path = self.entry_path(key)
+        temp_path = "{0}.tmp{1}".format(path, os.getpid())
+        shutil.rmtree(temp_path, ignore_errors=True)
+        os.makedirs(temp_path)
+
+        if isinstance(data, SparseBlocks):
+            data.save()
+            shutil.move(data.directory, os.path.join(temp_path, "data"))
+            data_format = 'blocks'
+        else:
+            save_csr(os.path.join(temp_path, "data"), data)
+            data_format = 'csr'
+        save_labels(os.path.join(temp_path, "labels.npy"), labels)
+        with open(os.path.join(temp_path, "feature_extractor.pkl"), 'wb') as filehandle:
+            pickle.dump(feature_extractor, filehandle)
+        if duplicates is not None:
+            numpy.savez(os.path.join(temp_path, "duplicates.npz"), **duplicates)
+        entry = {'key': key, 'format': data_format, 'created': time.time(), 'size': _disk_usage(temp_path)}
+        with open(os.path.join(temp_path, self.entry_file), 'w') as filehandle:
+            json.dump(entry, filehandle)
+
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(temp_path, path)
+        logging.info("added {0} to vector cache({1:.1f} MB)".format(key, entry['size'] / (1024 * 1024)))
+        self.evict(keep=key)
+        return self._load(path)
+
+    def evict(self, keep=None):
+        """remove least recently used entries until total size is within budget. the entry keep is never removed
+
+            :returns keys of removed entries
+            :rtype list"""
+
+        entries = []
+        for name in os.listdir(self.directory) if os.path.isdir(self.directory) else []:
+            entry_file = os.path.join(self.directory, name, self.entry_file)
+            if os.path.exists(entry_file):
+                with open(entry_file, 'r') as filehandle:
+                    size = json.load(filehandle)['size']
+                entries.append((os.stat(entry_file).st_mtime, name, size))
+
+        total_size = sum(size for _, _, size in entries)
+        evicted = []
+        for _, name, size in sorted(entries):
+            if total_size <= self.budget:
+                break
+            if name == keep:
+                continue
+            shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+            total_size -= size
+            evicted.append(name)
+            logging.info("evicted {0} from vector cache".format(name))
+        return evicted
+
+
+def _disk_usage(directory):
+    return sum(os.path.getsize(os.path.join(root, file)) for root, _, files in os.walk(directory) for file in files)
@@ -2,23 +2,86 @@
 # date: 22-Mar-2017
 
 import argparse
+import os
 import pickle
+
 import numpy
 
+from medline.data.extract.sparse_store import SparseBlocks, load_csr
+
+
+def load_vectors(path):
+    """load vectorized data without densifying it. path can be a pickled vectorized file(see pubmed --vectorized-file),
+    a directory of vectorized blocks or a directory of CSR components(see sparse_store.save_csr)
+        input:
+            :parameter path: fully qualified path of vectorized file or directory
+        output:
+            :returns term document matrix(sparse matrix or SparseBlocks) and PMIDs of its rows(None if unknown)
+            :rtype tuple"""
+
+    if os.path.isdir(path):
+        if os.path.exists(os.path.join(path, SparseBlocks.manifest_name)):
+            vectors = SparseBlocks.load(path)
+            return vectors, vectors.labels
+        return load_csr(path), None
+    with open(path, 'rb') as input_file:
+        vectorized_data = pickle.load(input_file)
+    return vectorized_data['data'], vectorized_data['labels']
+
+
+def iter_rows(vectors, chunk_size=1000):
+    """yield CSR row slices of at most chunk_size rows"""
+
+    blocks = vectors.iter_blocks() if isinstance(vectors, SparseBlocks) else [vectors]
+    for block in blocks:
+        for start in range(0, block.shape[0], chunk_size):
+            yield block[start:start + chunk_size]
+
+
+def export_vectors(vectors, output_file, labels=None, out_format="dense", chunk_size=1000):
+    """write vectors to a text file, 1 line per document. only chunk_size rows are densified at a time
+        input:
+            :parameter vectors: sparse term document matrix or SparseBlocks
+            :parameter output_file: fully qualified name of output file
+            :parameter labels: PMIDs of rows; used as svmlight labels. default - row #
+            :parameter out_format: dense(tab separated values) or svmlight(label index:value ...)
+            :parameter chunk_size: # of rows converted at a time
+        output:
+            :returns # of rows written
+            :rtype int
+            :raises ValueError"""
+
+    if out_format not in ("dense", "svmlight"):
+        raise ValueError("unsupported format. value must be one of dense, svmlight")
+    num_rows = 0
+    with open(output_file, 'a') as filehandle:
+        for chunk in iter_rows(vectors, chunk_size=chunk_size):
+            if out_format == "dense":
+                for vector in chunk.toarray():
+                    filehandle.write("\t".join(map(repr, vector.tolist())))
+                    filehandle.write("\n")
+            else:
+                for row in range(chunk.shape[0]):
+                    start, end = chunk.indptr[row], chunk.indptr[row + 1]
+                    label = labels[num_rows + row] if labels is not None else num_rows + row
+                    pairs = ["{0}:{1!r}".format(index, value) for index, value in
+                             zip(chunk.indices[start:end].tolist(), chunk.data[start:end].tolist())]
+                    filehandle.write(" ".join([str(label)] + pairs))
+                    filehandle.write("\n")
+            num_rows += chunk.shape[0]
+    return num_rows
+
 
 if __name__ == "__main__":
     arg_parser = argparse.ArgumentParser()
-    arg_parser.add_argument("input")
+    arg_parser.add_argument("input", help="pickled vectorized file, vectorized blocks directory or CSR directory")
     arg_parser.add_argument("output")
+    arg_parser.add_argument("--format", default="dense", choices=["dense", "svmlight"],
+                            help="dense - tab separated values; svmlight - sparse label index:value pairs")
+    arg_parser.add_argument("--chunk-size", type=int, default=1000, help="# of rows converted at a time")
     args = arg_parser.parse_args()
 
-    vectorized_data = {}
-    vectors = []
-    with open(args.input, 'rb') as input_file:
-        vectorized_data = pickle.load(input_file)
-        vectors = vectorized_data['data']
-    with open(args.output, 'a') as output_file:
-        for vector in vectors:
-            print(vector)
-            output_file.write("\t".join(vector))
-            output_file.write("\n")
+    vectors, labels = load_vectors(args.input)
+    if labels is not None:
+        labels = numpy.asarray(labels)
+    export_vectors(vectors, args.output, labels=labels, out_format=args.format, chunk_size=args.chunk_size)